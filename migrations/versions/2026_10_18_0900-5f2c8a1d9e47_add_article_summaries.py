@@ -0,0 +1,56 @@
+"""Add article summaries
+
+Revision ID: 5f2c8a1d9e47
+Revises: 158c4487d39e
+Create Date: 2026-10-18 09:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "5f2c8a1d9e47"
+down_revision = "158c4487d39e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "article_summaries",
+        sa.Column("article_id", sa.Integer(), nullable=False),
+        sa.Column("tags", postgresql.ARRAY(sa.String(length=32)), nullable=False),
+        sa.Column("language_variants", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("likes", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["article_id"], ["articles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("article_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO article_summaries (article_id, tags, language_variants, likes)
+        SELECT
+            articles.id,
+            ARRAY(
+                SELECT tags.name
+                FROM tags JOIN articles_to_tags ON articles_to_tags.tag_id = tags.id
+                WHERE articles_to_tags.article_id = articles.id
+                ORDER BY tags.name DESC
+            ),
+            (
+                SELECT jsonb_object_agg(generic_articles.language, generic_articles.slug)
+                FROM articles AS generic_articles
+                WHERE generic_articles.generic_id = articles.generic_id AND generic_articles.id != articles.id
+            ),
+            (
+                SELECT coalesce(sum(CASE WHEN article_likes.is_positive THEN 1 ELSE -1 END), 0)
+                FROM article_likes
+                WHERE article_likes.article_id = articles.id
+            )
+        FROM articles
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("article_summaries")
@@ -0,0 +1,40 @@
+"""Add article counters
+
+Revision ID: a3d91b6c2f08
+Revises: 5f2c8a1d9e47
+Create Date: 2026-10-18 09:30:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "a3d91b6c2f08"
+down_revision = "5f2c8a1d9e47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "article_counters",
+        sa.Column(
+            "language",
+            postgresql.ENUM("en", "ru", name="languagetype", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("is_draft", sa.Boolean(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("language", "is_draft", name="_language_is_draft_key"),
+    )
+    op.execute(
+        """
+        INSERT INTO article_counters (language, is_draft, count)
+        SELECT language, is_draft, count(*) FROM articles GROUP BY language, is_draft
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("article_counters")
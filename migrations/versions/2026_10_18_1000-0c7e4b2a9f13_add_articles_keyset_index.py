@@ -0,0 +1,22 @@
+"""Add articles keyset index
+
+Revision ID: 0c7e4b2a9f13
+Revises: a3d91b6c2f08
+Create Date: 2026-10-18 10:00:00.000000+00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0c7e4b2a9f13"
+down_revision = "a3d91b6c2f08"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_articles_language_created_at_id", "articles", ["language", "created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_articles_language_created_at_id", table_name="articles")
@@ -0,0 +1,33 @@
+"""Add article summary versions
+
+Revision ID: 7b4e1f9c2d35
+Revises: 0c7e4b2a9f13
+Create Date: 2026-10-18 11:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7b4e1f9c2d35"
+down_revision = "0c7e4b2a9f13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("article_summaries", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+    op.add_column(
+        "article_summaries",
+        sa.Column(
+            "updated_at",
+            sa.Integer(),
+            server_default=sa.text("extract(epoch from now())::integer"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("article_summaries", "updated_at")
+    op.drop_column("article_summaries", "version")
@@ -0,0 +1,33 @@
+"""Add comment likes counter
+
+Revision ID: 3d9a6c1e8f47
+Revises: 7b4e1f9c2d35
+Create Date: 2026-10-18 12:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3d9a6c1e8f47"
+down_revision = "7b4e1f9c2d35"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("comments", sa.Column("likes", sa.Integer(), server_default="0", nullable=False))
+    op.execute(
+        """
+        UPDATE comments SET likes = counted.likes
+        FROM (
+            SELECT comment_id, sum(CASE WHEN is_positive THEN 1 ELSE -1 END) AS likes
+            FROM comment_likes GROUP BY comment_id
+        ) AS counted
+        WHERE comments.id = counted.comment_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("comments", "likes")
@@ -0,0 +1,29 @@
+"""Add comment thread indexes
+
+Revision ID: 5e2b8d4a7c19
+Revises: 3d9a6c1e8f47
+Create Date: 2026-10-18 13:00:00.000000+00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5e2b8d4a7c19"
+down_revision = "3d9a6c1e8f47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_comments_article_id_parent_comment_id_id",
+        "comments",
+        ["article_id", "parent_comment_id", "id"],
+        unique=False,
+    )
+    op.create_index("ix_comments_parent_comment_id_id", "comments", ["parent_comment_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_comments_parent_comment_id_id", table_name="comments")
+    op.drop_index("ix_comments_article_id_parent_comment_id_id", table_name="comments")
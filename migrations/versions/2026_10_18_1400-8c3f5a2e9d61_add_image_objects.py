@@ -0,0 +1,33 @@
+"""Add image objects
+
+Revision ID: 8c3f5a2e9d61
+Revises: 5e2b8d4a7c19
+Create Date: 2026-10-18 14:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c3f5a2e9d61"
+down_revision = "5e2b8d4a7c19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "image_objects",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("object_name", sa.String(length=512), nullable=False),
+        sa.Column("content_type", sa.String(length=32), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.Integer(), nullable=False),
+        sa.Column("used_at", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash"),
+        sa.UniqueConstraint("object_name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("image_objects")
@@ -0,0 +1,27 @@
+"""Add image derivatives
+
+Revision ID: 4a7d2c9e1b58
+Revises: 8c3f5a2e9d61
+Create Date: 2026-10-18 15:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "4a7d2c9e1b58"
+down_revision = "8c3f5a2e9d61"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "image_objects",
+        sa.Column("derivatives", postgresql.JSONB(astext_type=sa.Text()), server_default="{}", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("image_objects", "derivatives")
@@ -0,0 +1,43 @@
+"""Add article image references
+
+Revision ID: b7e3f1a9c205
+Revises: 4a7d2c9e1b58
+Create Date: 2026-10-18 16:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7e3f1a9c205"
+down_revision = "4a7d2c9e1b58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "articles_to_images",
+        sa.Column("article_id", sa.Integer(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.ForeignKeyConstraint(["article_id"], ["articles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("content_hash", "article_id", name="_image_article_ids_key"),
+    )
+    op.create_index("ix_articles_to_images_article_id", "articles_to_images", ["article_id"])
+    op.create_index("ix_image_objects_used_at", "image_objects", ["used_at"])
+    # the same hashes as `utils.get_image_hashes` finds on the article save
+    op.execute(
+        """
+        INSERT INTO articles_to_images (article_id, content_hash)
+        SELECT DISTINCT articles.id, hashes.content_hash[1]
+        FROM articles, regexp_matches(
+            concat_ws(' ', articles.cover_image, articles.preview_image, articles.content), '[0-9a-f]{64}', 'g'
+        ) AS hashes(content_hash)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_image_objects_used_at", table_name="image_objects")
+    op.drop_index("ix_articles_to_images_article_id", table_name="articles_to_images")
+    op.drop_table("articles_to_images")
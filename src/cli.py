@@ -9,7 +9,8 @@ from src.core.config import create_settings
 from src.core.persistence import create_new_pg_session_maker
 from src.core.persistence.redis import create_redis_connection_pool
 from src.domains import UserDomain, create_user_domain
-from src.lib import schemas
+from src.domains.user import PermissionCache
+from src.lib import schemas, security
 from src.lib.logger import setup_logging
 
 logger = logging.getLogger(__name__)
@@ -45,11 +46,22 @@ async def cli() -> None:
     )
     pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
     redis_connection_pool = create_redis_connection_pool(connection_url=settings.redis.connection_url)
+    permission_cache = PermissionCache(
+        connection_pool=redis_connection_pool,
+        channel=settings.redis.permission_cache_channel,
+        ttl=settings.redis.permission_cache_ttl,
+        max_size=settings.redis.permission_cache_max_size,
+    )
+    permission_matrix = security.IAMPermissionMatrix.from_graph_data(
+        graph_data_path=settings.redis.graph_data_path, graph_name=settings.redis.iam_graph_name
+    )
     user_domain: UserDomain = create_user_domain(
         pg_session_manager=pg_session_manager,
         pwd_context=pwd_context,
         iam_graph_name=settings.redis.iam_graph_name,
         redis_connection_pool=redis_connection_pool,
+        permission_cache=permission_cache,
+        permission_matrix=permission_matrix,
     )
     user = await user_domain.controller.create(
         item=schemas.UserCreate(
@@ -1,15 +1,18 @@
 import abc
+import logging
 from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Generic, Self, TypeVar
+from typing import Any, AsyncGenerator, ClassVar, Generic, Self, TypeVar
 
-from botocore.client import BaseClient as S3Client
 from pydantic import BaseModel as PydanticBaseModel
 from redis import asyncio as aioredis
 from redis.asyncio.client import Pipeline as RedisPipeline
 from redis.commands.graph import Graph
-from sqlalchemy import func, select, update
+from redis.commands.graph.query_result import QueryResult
+from sqlalchemy import exc, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.core.persistence.replicas import ReplicaRouter
+from src.core.persistence.s3 import AsyncS3Client
 from src.lib import errors, models, pagination, schemas
 from src.lib.schemas import BaseModelWithCount as PydanticBaseModelWithCount
 
@@ -20,29 +23,30 @@ PydanticModelWithCountType = TypeVar("PydanticModelWithCountType", bound=Pydanti
 PydanticModelCreateType = TypeVar("PydanticModelCreateType", bound=PydanticBaseModel)
 PydanticModelUpdateType = TypeVar("PydanticModelUpdateType", bound=PydanticBaseModel)
 
+logger = logging.getLogger(__name__)
+
 
 class BaseRepository(abc.ABC):  # noqa: B024
     pass
 
 
 class BaseS3Repository(BaseRepository, abc.ABC):
-    def __init__(self, session: S3Client) -> None:
-        self._session = session
+    def __init__(self, client: AsyncS3Client) -> None:
+        self._client = client
 
 
 class BaseRedisRepository(BaseRepository, abc.ABC):
     def __init__(self, connection_pool: aioredis.ConnectionPool) -> None:
         self._connection_pool = connection_pool
+        self._client: "aioredis.Redis[Any]" = aioredis.Redis(connection_pool=connection_pool)
 
     @asynccontextmanager
     async def create_session(self) -> AsyncGenerator["aioredis.Redis[Any]", Any]:
-        session: "aioredis.Redis[Any]" = aioredis.Redis(connection_pool=self._connection_pool)
-        try:
-            async with session.client() as conn:
-                yield conn
-        finally:
-            await session.close()
-            await session.connection_pool.disconnect()
+        """Get the client of the shared connection pool.
+
+        Every command borrows a connection from the pool and returns it back, the pool is closed on app shutdown only.
+        """
+        yield self._client
 
     @asynccontextmanager
     async def create_transaction_pipe(
@@ -53,6 +57,10 @@ class BaseRedisRepository(BaseRepository, abc.ABC):
 
 
 class BaseGraphRepository(BaseRedisRepository, abc.ABC):
+    # Cypher templates by name, the values are passed as the `CYPHER` parameters and never interpolated,
+    # so the query text stays the same and its plan is cached by RedisGraph
+    query_templates: ClassVar[dict[str, str]] = {}
+
     def __init__(self, graph_name: str, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.graph_name = graph_name
@@ -61,6 +69,13 @@ class BaseGraphRepository(BaseRedisRepository, abc.ABC):
         graph: Graph = session.graph(self.graph_name)
         return graph
 
+    async def execute_query(
+        self, session: "aioredis.Redis[Any]", name: str, read_only: bool = False, **params: Any
+    ) -> QueryResult:
+        graph = self.get_graph(session=session)
+        result: QueryResult = await graph.query(q=self.query_templates[name], params=params, read_only=read_only)
+        return result
+
     @classmethod
     def create_instance(cls, connection_pool: aioredis.ConnectionPool, graph_name: str) -> Self:
         return cls(
@@ -70,10 +85,58 @@ class BaseGraphRepository(BaseRedisRepository, abc.ABC):
 
 
 class BaseAsyncDBRepository(BaseRepository, abc.ABC):
-    def __init__(self, session_manager: async_sessionmaker[AsyncSession]) -> None:
+    """Repository of the Postgres data.
+
+    The public read and the admin write paths may have their own connection pools,
+    so a burst on one of them does not starve the other. They fall back to the main pool if not set.
+    The reads are routed to the replicas if `replica_router` is set.
+    """
+
+    def __init__(
+        self,
+        session_manager: async_sessionmaker[AsyncSession],
+        read_session_manager: async_sessionmaker[AsyncSession] | None = None,
+        admin_session_manager: async_sessionmaker[AsyncSession] | None = None,
+        replica_router: ReplicaRouter | None = None,
+    ) -> None:
         self._session_manager = session_manager
+        self._read_session_manager = read_session_manager or session_manager
+        self._admin_session_manager = admin_session_manager or session_manager
+        self._replica_router = replica_router
 
     @asynccontextmanager
     async def get_session(self) -> AsyncGenerator[AsyncSession, Any]:
         async with self._session_manager() as session:
             yield session
+
+    @asynccontextmanager
+    async def get_read_session(self, sticky_key: str | None = None) -> AsyncGenerator[AsyncSession, Any]:
+        """Get the session of the public read path, on a replica if there is a healthy one.
+
+        :param sticky_key: the reads of a key marked as written recently are served by the primary
+        """
+        replica = await self._replica_router.choose(sticky_key=sticky_key) if self._replica_router is not None else None
+        if replica is not None:
+            async with replica() as session:
+                try:
+                    # connect before the queries are run, so an unavailable replica is replaced by the primary
+                    await session.connection()
+                except (OSError, exc.DBAPIError, exc.TimeoutError) as error:
+                    logger.warning(f"Read replica is unavailable, the primary is used instead: {error}")
+                    self._replica_router.mark_unhealthy(replica)  # type: ignore[union-attr]
+                else:
+                    yield session
+                    return
+        async with self._read_session_manager() as session:
+            yield session
+
+    async def mark_written(self, sticky_key: str) -> None:
+        """Serve the reads of the key by the primary until the replicas catch up with the write."""
+        if self._replica_router is not None:
+            await self._replica_router.mark_written(sticky_key=sticky_key)
+
+    @asynccontextmanager
+    async def get_admin_session(self) -> AsyncGenerator[AsyncSession, Any]:
+        """Get the session of the admin write path."""
+        async with self._admin_session_manager() as session:
+            yield session
@@ -2,14 +2,36 @@ import celery
 
 from src.core.config.config import RedisSettings
 
-redis_url = RedisSettings().connection_url
+redis_settings = RedisSettings()
+redis_url = redis_settings.connection_url
 
-celery_app = celery.Celery("tasks", broker=redis_url, backend=redis_url)
+celery_app = celery.Celery(
+    "tasks",
+    broker=redis_url,
+    backend=redis_url,
+    include=["src.core.celery_app.tasks.article", "src.core.celery_app.tasks.image"],
+)
 
 
 celery_app.conf.update(
     worker_prefetch_multiplier=1, task_remote_tracebacks=True, broker_connection_retry_on_startup=True
 )
+# the images are processed by a separate worker of a bounded concurrency (`-Q previews,images -c N`),
+# so the slow renders do not delay the other tasks
+celery_app.conf.task_routes = {
+    "articles.generate_preview": {"queue": "previews"},
+    "images.generate_derivatives": {"queue": "images"},
+}
+celery_app.conf.beat_schedule = {
+    "reconcile-article-counters": {
+        "task": "articles.reconcile_counters",
+        "schedule": 60 * 60,
+    },
+    "flush-likes": {
+        "task": "articles.flush_likes",
+        "schedule": redis_settings.like_buffer_flush_interval,
+    },
+}
 
 if __name__ == "__main__":
     celery_app.start()
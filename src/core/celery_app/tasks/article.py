@@ -0,0 +1,116 @@
+from itertools import islice
+from typing import Awaitable, Callable
+
+from src.core.celery_app.celery import celery_app
+from src.core.celery_app.utils import (
+    get_pg_session_maker,
+    get_preview_renderer,
+    get_redis_connection_pool,
+    get_s3_client,
+    run_async,
+)
+from src.core.config.config import RedisSettings, S3Settings
+from src.domains.article.like_buffer import LikeBuffer, LikeTarget
+from src.domains.article.preview_cache import ArticlePreviewCache
+from src.domains.article.repository import ArticleDBRepository
+from src.domains.article.response_cache import ArticleResponseCache
+from src.lib import schemas
+
+# amount of the like states stored in one transaction
+LIKES_FLUSH_BATCH_SIZE = 1000
+PREVIEW_FOLDER = "articles/previews"
+PREVIEW_MAX_RETRIES = 3
+
+
+async def _reconcile_article_counters() -> None:
+    db_repo = ArticleDBRepository(session_manager=get_pg_session_maker())
+    async with db_repo.get_session() as session, session.begin():
+        await db_repo.reconcile_counters(session=session)
+        await db_repo.reconcile_like_counters(session=session)
+
+
+@celery_app.task(name="articles.reconcile_counters")
+def reconcile_article_counters() -> None:
+    run_async(_reconcile_article_counters())
+
+
+async def _flush_likes() -> None:
+    db_repo = ArticleDBRepository(session_manager=get_pg_session_maker())
+    # the buffer is flushed even if it is disabled, so the likes buffered before are not lost
+    like_buffer = LikeBuffer(
+        connection_pool=get_redis_connection_pool(), is_enabled=RedisSettings().like_buffer_enabled
+    )
+    appliers: dict[LikeTarget, Callable[..., Awaitable[dict[int, int]]]] = {
+        "article": db_repo.apply_likes,
+        "comment": db_repo.apply_comment_likes,
+    }
+    for target, apply in appliers.items():
+        async with like_buffer.flush(target=target, timeout=60) as states:
+            if not states:
+                continue
+            items = iter(states.items())
+            while batch := dict(islice(items, LIKES_FLUSH_BATCH_SIZE)):
+                async with db_repo.get_session() as session, session.begin():
+                    deltas = await apply(session=session, states=batch)
+                # the committed batch is not taken again if a later one fails
+                await like_buffer.drop_flushed(target=target, states=batch, deltas=deltas)
+
+
+@celery_app.task(name="articles.flush_likes")
+def flush_likes() -> None:
+    run_async(_flush_likes())
+
+
+async def _get_preview_source(slug: str) -> schemas.ArticlePreviewSource | None:
+    db_repo = ArticleDBRepository(session_manager=get_pg_session_maker())
+    async with db_repo.get_session() as session:
+        return await db_repo.get_preview_source(session=session, slug=slug)
+
+
+async def _set_article_preview(slug: str, preview_image: str) -> None:
+    db_repo = ArticleDBRepository(session_manager=get_pg_session_maker())
+    async with db_repo.get_session() as session, session.begin():
+        is_changed = await db_repo.set_preview_image(session=session, slug=slug, preview_image=preview_image)
+    if is_changed:
+        settings = RedisSettings()
+        response_cache = ArticleResponseCache(
+            connection_pool=get_redis_connection_pool(),
+            ttl=settings.article_cache_ttl,
+            lock_timeout=settings.article_cache_lock_timeout,
+        )
+        await response_cache.invalidate(f"article:{slug}")
+
+
+@celery_app.task(
+    name="articles.generate_preview",
+    autoretry_for=(Exception,),
+    max_retries=PREVIEW_MAX_RETRIES,
+    retry_backoff=True,
+    acks_late=True,
+)
+def generate_article_preview(slug: str) -> None:
+    """Render the preview of the current state of the article and set it, the renders of the same inputs are reused."""
+    source = run_async(_get_preview_source(slug=slug))
+    if source is None:
+        return
+    renderer = get_preview_renderer()
+    s3_settings = S3Settings()
+    preview_cache = ArticlePreviewCache(
+        connection_pool=get_redis_connection_pool(), ttl=RedisSettings().article_preview_cache_ttl
+    )
+    key = preview_cache.make_key(
+        template=renderer.template, title=source.title, label=source.label, cover_image=source.cover_image
+    )
+    object_name = run_async(preview_cache.get(key))
+    if object_name is None:
+        image = renderer.render(source)
+        object_name = f"{PREVIEW_FOLDER}/{key}.png"
+        get_s3_client().put_object(
+            Bucket=s3_settings.bucket, Key=object_name, Body=image, ACL="public-read", ContentType="image/png"
+        )
+        run_async(preview_cache.set(key, object_name))
+
+    bucket = schemas.S3Bucket(
+        name=s3_settings.bucket, endpoint=s3_settings.endpoint, replace_domain=s3_settings.replace_domain
+    )
+    run_async(_set_article_preview(slug=slug, preview_image=bucket.make_object_url(object_name)))
@@ -0,0 +1,62 @@
+from src.core.celery_app.celery import celery_app
+from src.core.celery_app.utils import (
+    get_pg_session_maker,
+    get_s3_client,
+    run_async,
+)
+from src.core.config.config import ImageSettings, S3Settings
+from src.domains.image.derivatives import create_derivatives, get_mime_type
+from src.domains.image.repository import ImageDBRepository
+from src.lib import utils
+
+DERIVATIVE_MAX_RETRIES = 3
+
+
+async def _set_derivatives(object_name: str, derivatives: dict[str, str]) -> None:
+    db_repo = ImageDBRepository(session_manager=get_pg_session_maker())
+    async with db_repo.get_session() as session, session.begin():
+        await db_repo.set_derivatives(session=session, object_name=object_name, derivatives=derivatives)
+
+
+@celery_app.task(
+    name="images.generate_derivatives",
+    autoretry_for=(Exception,),
+    max_retries=DERIVATIVE_MAX_RETRIES,
+    retry_backoff=True,
+    acks_late=True,
+)
+def generate_image_derivatives(object_name: str) -> None:
+    """Create the resized copies of the uploaded image under the names known by `utils.get_derivative_names`.
+
+    The stored copies are recorded on the image by their actual srcset descriptors, so only they are returned.
+    """
+    s3_settings, settings = S3Settings(), ImageSettings()
+    client = get_s3_client()
+    # the uploads are limited by `S3Settings.max_upload_size`, so the original is read into memory
+    content = client.get_object(Bucket=s3_settings.bucket, Key=object_name)["Body"].read()
+    derivatives = create_derivatives(
+        content,
+        widths=settings.derivative_widths,
+        image_format=settings.derivative_format,
+        quality=settings.derivative_quality,
+        thumbnail_size=settings.thumbnail_size,
+    )
+    names = utils.get_derivative_names(
+        object_name,
+        widths=settings.derivative_widths,
+        image_format=settings.derivative_format,
+        thumbnail_size=settings.thumbnail_size,
+    )
+    stored: dict[str, str] = {}
+    for descriptor, (srcset_descriptor, body) in derivatives.items():
+        client.put_object(
+            Bucket=s3_settings.bucket,
+            Key=names[descriptor],
+            Body=body,
+            ACL="public-read",
+            ContentType=get_mime_type(settings.derivative_format),
+            # the name of the original is unique, so the copies never change
+            CacheControl="public, max-age=31536000, immutable",
+        )
+        stored[srcset_descriptor] = names[descriptor]
+    run_async(_set_derivatives(object_name=object_name, derivatives=stored))
@@ -0,0 +1,91 @@
+import asyncio
+import functools
+from typing import Any, Coroutine, TypeVar
+
+from botocore.client import BaseClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config.config import (
+    AssetPathSettings,
+    DBSettings,
+    PreviewSettings,
+    RedisSettings,
+    S3Settings,
+)
+from src.core.persistence.db import create_new_pg_session_maker
+from src.core.persistence.redis import (
+    MeasuredConnectionPool,
+    create_redis_connection_pool,
+)
+from src.core.persistence.s3 import create_s3_client
+from src.domains.article.preview_renderer import (
+    PreviewRenderer,
+    create_preview_renderer,
+)
+
+ResultType = TypeVar("ResultType")
+
+
+@functools.cache
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop of the worker process.
+
+    Celery tasks are synchronous, so the async code is run in one loop per worker process
+    to keep the connection pools (bound to the loop) alive between the tasks.
+    """
+    return asyncio.new_event_loop()
+
+
+def run_async(coroutine: Coroutine[Any, Any, ResultType]) -> ResultType:
+    return get_event_loop().run_until_complete(coroutine)
+
+
+@functools.cache
+def get_pg_session_maker() -> async_sessionmaker[AsyncSession]:
+    settings = DBSettings()
+    return create_new_pg_session_maker(
+        db_url=settings.pg_connection_url,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        statement_cache_size=settings.statement_cache_size,
+        command_timeout=settings.command_timeout,
+    )
+
+
+@functools.cache
+def get_redis_connection_pool() -> MeasuredConnectionPool:
+    settings = RedisSettings()
+    return create_redis_connection_pool(
+        connection_url=settings.connection_url,
+        max_connections=settings.max_connections,
+        timeout=settings.pool_timeout,
+        socket_timeout=settings.socket_timeout,
+        socket_connect_timeout=settings.socket_connect_timeout,
+        health_check_interval=settings.health_check_interval,
+    )
+
+
+@functools.cache
+def get_s3_client() -> BaseClient:
+    """S3 client of the worker process, the tasks are synchronous, so it is called directly."""
+    settings = S3Settings()
+    return create_s3_client(
+        region=settings.region,
+        endpoint=settings.endpoint,
+        access_key=settings.access_key,
+        secret_key=settings.secret_key,
+        max_pool_connections=settings.max_pool_connections,
+        max_attempts=settings.max_attempts,
+        retry_mode=settings.retry_mode,
+        connect_timeout=settings.connect_timeout,
+        read_timeout=settings.read_timeout,
+    )
+
+
+@functools.cache
+def get_preview_renderer() -> PreviewRenderer:
+    """Renderer of the article previews, the template and fonts are loaded once per worker process."""
+    return create_preview_renderer(engine=PreviewSettings().engine, templates_path=AssetPathSettings().templates)
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import Field, PostgresDsn, RedisDsn, field_validator
 from pydantic_core.core_schema import FieldValidationInfo
@@ -23,6 +23,25 @@ class DBSettings(BaseEnvSettings):
     pg_db: str = Field(validation_alias="POSTGRES_DB")
     pg_connection_url: str | None = Field(default=None)
     migrations_path: str = Field(default="migrations")
+    pool_size: int = Field(default=10, validation_alias="POSTGRES_POOL_SIZE")
+    max_overflow: int = Field(default=10, validation_alias="POSTGRES_MAX_OVERFLOW")
+    pool_timeout: float = Field(default=30.0, validation_alias="POSTGRES_POOL_TIMEOUT")
+    pool_recycle: int = Field(default=1800, validation_alias="POSTGRES_POOL_RECYCLE")
+    pool_pre_ping: bool = Field(default=True, validation_alias="POSTGRES_POOL_PRE_PING")
+    statement_cache_size: int = Field(default=100, validation_alias="POSTGRES_STATEMENT_CACHE_SIZE")
+    command_timeout: float | None = Field(default=60.0, validation_alias="POSTGRES_COMMAND_TIMEOUT")
+    # the separate pools are not created if the size is 0, the main pool is used instead
+    public_read_pool_size: int = Field(default=0, validation_alias="POSTGRES_PUBLIC_READ_POOL_SIZE")
+    admin_write_pool_size: int = Field(default=0, validation_alias="POSTGRES_ADMIN_WRITE_POOL_SIZE")
+    # the public reads are served by the primary if there are no replicas
+    replica_urls: list[str] = Field(default=[], validation_alias="POSTGRES_REPLICA_URLS")
+    replica_weights: list[float] = Field(default=[], validation_alias="POSTGRES_REPLICA_WEIGHTS")
+    replica_policy: Literal["weighted", "least_loaded"] = Field(
+        default="weighted", validation_alias="POSTGRES_REPLICA_POLICY"
+    )
+    replica_pool_size: int = Field(default=10, validation_alias="POSTGRES_REPLICA_POOL_SIZE")
+    replica_sticky_seconds: float = Field(default=5.0, validation_alias="POSTGRES_REPLICA_STICKY_SECONDS")
+    replica_retry_seconds: float = Field(default=30.0, validation_alias="POSTGRES_REPLICA_RETRY_SECONDS")
 
     @field_validator("pg_connection_url", mode="after")
     def assemble_db_connection(cls, value: str | None, info: FieldValidationInfo) -> Any:
@@ -45,8 +64,25 @@ class RedisSettings(BaseEnvSettings):
     host: str = Field(validation_alias="REDIS_HOST")
     port: int = Field(validation_alias="REDIS_PORT")
     connection_url: str | None = Field(default=None)
+    max_connections: int = Field(default=50, validation_alias="REDIS_MAX_CONNECTIONS")
+    pool_timeout: float = Field(default=5.0, validation_alias="REDIS_POOL_TIMEOUT")
+    socket_timeout: float | None = Field(default=5.0, validation_alias="REDIS_SOCKET_TIMEOUT")
+    socket_connect_timeout: float | None = Field(default=5.0, validation_alias="REDIS_SOCKET_CONNECT_TIMEOUT")
+    health_check_interval: int = Field(default=30, validation_alias="REDIS_HEALTH_CHECK_INTERVAL")
     iam_graph_name: str = Field(validation_alias="IAM_GRAPH_NAME")
     graph_data_path: str = Field(validation_alias="GRAPH_DATA_PATH")
+    permission_cache_ttl: float = Field(default=60.0, validation_alias="IAM_PERMISSION_CACHE_TTL")
+    permission_cache_max_size: int = Field(default=10000, validation_alias="IAM_PERMISSION_CACHE_MAX_SIZE")
+    permission_cache_channel: str = Field(
+        default="iam:permissions:invalidate", validation_alias="IAM_PERMISSION_CACHE_CHANNEL"
+    )
+    # the responses of the public article endpoints are not cached if the TTL is 0
+    article_cache_ttl: int = Field(default=60, validation_alias="ARTICLE_RESPONSE_CACHE_TTL")
+    article_cache_lock_timeout: float = Field(default=5.0, validation_alias="ARTICLE_RESPONSE_CACHE_LOCK_TIMEOUT")
+    # the likes are buffered in Redis and flushed to the database by the Celery beat task
+    like_buffer_enabled: bool = Field(default=False, validation_alias="LIKE_BUFFER_ENABLED")
+    like_buffer_flush_interval: float = Field(default=10.0, validation_alias="LIKE_BUFFER_FLUSH_INTERVAL")
+    article_preview_cache_ttl: int = Field(default=30 * 24 * 60 * 60, validation_alias="ARTICLE_PREVIEW_CACHE_TTL")
 
     @field_validator("connection_url", mode="after")
     def assemble_db_connection(cls, value: str | None, info: FieldValidationInfo) -> Any:
@@ -69,6 +105,31 @@ class S3Settings(BaseEnvSettings):
     access_key: str = Field(validation_alias="S3_ACCESS_KEY")
     secret_key: str = Field(validation_alias="S3_SECRET_KEY")
     region: str = Field(validation_alias="S3_REGION")
+    max_pool_connections: int = Field(default=10, validation_alias="S3_MAX_POOL_CONNECTIONS")
+    # the blocking S3 calls are run in the pool of this size
+    max_workers: int = Field(default=10, validation_alias="S3_MAX_WORKERS")
+    max_attempts: int = Field(default=3, validation_alias="S3_MAX_ATTEMPTS")
+    retry_mode: Literal["legacy", "standard", "adaptive"] = Field(default="standard", validation_alias="S3_RETRY_MODE")
+    connect_timeout: float = Field(default=5.0, validation_alias="S3_CONNECT_TIMEOUT")
+    read_timeout: float = Field(default=60.0, validation_alias="S3_READ_TIMEOUT")
+    multipart_threshold: int = Field(default=8 * 1024 * 1024, validation_alias="S3_MULTIPART_THRESHOLD")
+    multipart_chunk_size: int = Field(default=8 * 1024 * 1024, validation_alias="S3_MULTIPART_CHUNK_SIZE")
+    multipart_concurrency: int = Field(default=4, validation_alias="S3_MULTIPART_CONCURRENCY")
+    max_upload_size: int = Field(default=10 * 1024 * 1024, validation_alias="S3_MAX_UPLOAD_SIZE")
+    # the signed URLs are cached in the worker until `presigned_url_refresh_margin` seconds before they expire
+    presigned_url_expiration: int = Field(default=3600, validation_alias="S3_PRESIGNED_URL_EXPIRATION")
+    presigned_url_refresh_margin: int = Field(default=300, validation_alias="S3_PRESIGNED_URL_REFRESH_MARGIN")
+    presigned_url_cache_size: int = Field(default=10000, validation_alias="S3_PRESIGNED_URL_CACHE_SIZE")
+
+
+class ImageSettings(BaseEnvSettings):
+    # the uploaded images are resized to these widths (not upscaled) and converted to the format
+    derivative_widths: list[int] = Field(default=[320, 640, 1280], validation_alias="IMAGE_DERIVATIVE_WIDTHS")
+    # AVIF is not supported, the Pillow before 11.2 cannot encode it
+    derivative_format: Literal["webp"] = Field(default="webp", validation_alias="IMAGE_DERIVATIVE_FORMAT")
+    derivative_quality: int = Field(default=80, validation_alias="IMAGE_DERIVATIVE_QUALITY")
+    # side of the square thumbnail, 0 disables it
+    thumbnail_size: int = Field(default=200, validation_alias="IMAGE_THUMBNAIL_SIZE")
 
 
 class CORSSettings(BaseEnvSettings):
@@ -95,6 +156,36 @@ class ConfigPathSettings(BaseEnvSettings):
     logger: str = Field(default="configs/logger.json")
 
 
+class AssetPathSettings(BaseEnvSettings):
+    templates: str = Field(default="assets/templates", validation_alias="ASSET_TEMPLATES_PATH")
+
+
+class PreviewSettings(BaseEnvSettings):
+    # "html" renders the template by wkhtmltoimage, "pillow" composes the layout in the worker process
+    engine: Literal["html", "pillow"] = Field(default="html", validation_alias="ARTICLE_PREVIEW_ENGINE")
+
+
+class StartupSettings(BaseEnvSettings):
+    # key of the Postgres advisory lock the workers take to run the migrations and the graph sync one at a time
+    lock_key: int = Field(default=428_571_001, validation_alias="STARTUP_LOCK_KEY")
+    lock_timeout: float = Field(default=600.0, validation_alias="STARTUP_LOCK_TIMEOUT")
+    # the failed startup is retried with an exponential backoff, then the worker is stopped
+    max_attempts: int = Field(default=3, validation_alias="STARTUP_MAX_ATTEMPTS")
+    retry_delay: float = Field(default=5.0, validation_alias="STARTUP_RETRY_DELAY")
+
+
+class HTTPLoggingSettings(BaseEnvSettings):
+    max_request_body_size: int = Field(default=4096, validation_alias="HTTP_LOG_MAX_REQUEST_BODY_SIZE")
+    max_response_body_size: int = Field(default=4096, validation_alias="HTTP_LOG_MAX_RESPONSE_BODY_SIZE")
+    # the requests are not logged by default, the middleware is added only if some of them are sampled
+    sample_rate: float = Field(default=0.0, validation_alias="HTTP_LOG_SAMPLE_RATE")
+    route_sample_rates: dict[str, float] = Field(default={}, validation_alias="HTTP_LOG_ROUTE_SAMPLE_RATES")
+    # the passwords and the issued tokens are never logged
+    body_excluded_paths: list[str] = Field(
+        default=["/v1/oauth", "/v1/users", "/v1/admin/users"], validation_alias="HTTP_LOG_BODY_EXCLUDED_PATHS"
+    )
+
+
 class SentrySettings(BaseEnvSettings):
     dsn: str | None = Field(default=None, validation_alias="SENTRY_DSN")
     traces_sample_rate: float = Field(default=1.0, validation_alias="TRACES_SAMPLE_RATE")
@@ -130,10 +221,15 @@ class MainSettings(BaseEnvSettings):
     db: DBSettings
     redis: RedisSettings
     s3: S3Settings
+    image: ImageSettings
     cors: CORSSettings
     environment: EnvironmentSettings
     security: SecuritySettings
     config_path: ConfigPathSettings
+    asset_path: AssetPathSettings
+    preview: PreviewSettings
+    startup: StartupSettings
+    http_logging: HTTPLoggingSettings
     sentry: SentrySettings
     sso: SSOSettings
 
@@ -145,7 +241,11 @@ class TestSettings(BaseEnvSettings):
     security: SecuritySettings
     db: DBSettings
     redis: RedisSettings
+    s3: S3Settings
+    image: ImageSettings
     config_path: ConfigPathSettings
+    startup: StartupSettings
+    http_logging: HTTPLoggingSettings
 
 
 def create_settings() -> MainSettings:
@@ -153,10 +253,15 @@ def create_settings() -> MainSettings:
         admin=AdminSettings(),
         db=DBSettings(),
         s3=S3Settings(),
+        image=ImageSettings(),
         cors=CORSSettings(),
         environment=EnvironmentSettings(),
         security=SecuritySettings(),
         config_path=ConfigPathSettings(),
+        asset_path=AssetPathSettings(),
+        preview=PreviewSettings(),
+        startup=StartupSettings(),
+        http_logging=HTTPLoggingSettings(),
         redis=RedisSettings(),
         sentry=SentrySettings(),
         sso=SSOSettings(),
@@ -176,5 +281,9 @@ def create_test_settings() -> TestSettings:
             secret_key="superultratestsecretpassword",
         ),
         config_path=ConfigPathSettings(),
+        startup=StartupSettings(),
+        http_logging=HTTPLoggingSettings(),
         redis=RedisSettings(),
+        s3=S3Settings(),
+        image=ImageSettings(),
     )
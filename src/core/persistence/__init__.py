@@ -1,6 +1,13 @@
-from .db import create_new_pg_session_maker, create_new_test_pg_session_maker, clean_db, run_pg_migrations
-from .redis import sync_redis_graph, create_redis_connection_pool
-from .s3 import create_s3_client
+from .db import (
+    create_new_pg_session_maker,
+    create_new_test_pg_session_maker,
+    clean_db,
+    run_pg_migrations,
+    MeasuredQueuePool,
+)
+from .redis import sync_redis_graph, create_redis_connection_pool, check_redis_connection, MeasuredConnectionPool
+from .replicas import ReplicaRouter
+from .s3 import create_s3_client, AsyncS3Client, S3UrlSigner
 
 
 __all__ = [
@@ -11,4 +18,10 @@ __all__ = [
     "sync_redis_graph",
     "run_pg_migrations",
     "create_redis_connection_pool",
+    "check_redis_connection",
+    "MeasuredConnectionPool",
+    "MeasuredQueuePool",
+    "ReplicaRouter",
+    "AsyncS3Client",
+    "S3UrlSigner",
 ]
@@ -1,20 +1,88 @@
+import time
+from typing import Any
+
 import sqlalchemy
 from alembic import command
 from alembic.config import Config
-from sqlalchemy import pool
+from sqlalchemy import exc, pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import ConnectionPoolEntry
 
+from src.lib import schemas
 from src.lib.models import PgBaseModel
 
 
-def create_new_pg_session_maker(*, db_url: str) -> async_sessionmaker[AsyncSession]:
-    """Create database session factory from url."""
-    engine = create_async_engine(url=db_url, future=True)
+class MeasuredQueuePool(pool.AsyncAdaptedQueuePool):
+    """Queue pool measuring how long the checkouts wait for a connection.
+
+    The wait includes opening a new connection when the pool is not full yet.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start_time = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        wait_seconds = time.perf_counter() - start_time
+        self.checkouts += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        return connection
+
+    def get_metrics(self, name: str) -> schemas.DBPoolMetrics:
+        return schemas.DBPoolMetrics(
+            name=name,
+            size=self.size(),
+            checked_out=self.checkedout(),
+            overflow=max(self.overflow(), 0),
+            checkouts=self.checkouts,
+            timeouts=self.timeouts,
+            wait_seconds_total=self.wait_seconds_total,
+            wait_seconds_max=self.wait_seconds_max,
+        )
+
+
+def create_new_pg_session_maker(
+    *,
+    db_url: str,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30,
+    pool_recycle: int = -1,
+    pool_pre_ping: bool = False,
+    statement_cache_size: int = 100,
+    command_timeout: float | None = None,
+) -> async_sessionmaker[AsyncSession]:
+    """Create database session factory from url.
+
+    :param statement_cache_size: size of the asyncpg prepared statements cache of each connection
+    :param command_timeout: default timeout of the queries in seconds
+    """
+    engine = create_async_engine(
+        url=db_url,
+        future=True,
+        poolclass=MeasuredQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+        connect_args={"statement_cache_size": statement_cache_size, "command_timeout": command_timeout},
+    )
     async_session_maker = async_sessionmaker(bind=engine, future=True, expire_on_commit=False, autoflush=False)
     return async_session_maker
 
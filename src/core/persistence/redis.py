@@ -1,15 +1,81 @@
 import glob
 import os
+from typing import Any
 
 from redis import asyncio as aioredis
+from redis.asyncio.connection import Connection
 
+from src.lib import schemas
 from src.lib.errors import RGGraphAlreadyExistsError
 from src.lib.utils.redisgraph.bulk_insert import bulk_insert
 from src.lib.utils.redisgraph.bulk_update import bulk_update
 
 
-def create_redis_connection_pool(*, connection_url: str) -> aioredis.ConnectionPool:
-    return aioredis.ConnectionPool.from_url(url=connection_url, db=0, encoding="utf-8", decode_responses=True)
+class MeasuredConnectionPool(aioredis.BlockingConnectionPool):
+    """Connection pool of the fixed size counting the checkouts and the opened connections.
+
+    The commands wait up to `timeout` seconds for a free connection instead of opening more than `max_connections`.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.created_connections = 0
+
+    def make_connection(self) -> Connection:
+        self.created_connections += 1
+        connection: Connection = super().make_connection()
+        return connection
+
+    async def get_connection(self, command_name: str, *keys: Any, **options: Any) -> Connection:
+        connection: Connection = await super().get_connection(command_name, *keys, **options)
+        self.checkouts += 1
+        return connection
+
+    def get_metrics(self) -> schemas.RedisPoolMetrics:
+        # the queue holds both the idle connections and the placeholders of the ones not opened yet
+        in_use = self.max_connections - self.pool.qsize()
+        return schemas.RedisPoolMetrics(
+            max_connections=self.max_connections,
+            connections=len(self._connections),
+            in_use_connections=in_use,
+            checkouts=self.checkouts,
+            created_connections=self.created_connections,
+        )
+
+
+def create_redis_connection_pool(
+    *,
+    connection_url: str,
+    max_connections: int = 50,
+    timeout: float = 5,
+    socket_timeout: float | None = None,
+    socket_connect_timeout: float | None = None,
+    health_check_interval: int = 0,
+) -> MeasuredConnectionPool:
+    """Create the connection pool shared by all the Redis repositories of the application.
+
+    :param health_check_interval: seconds a connection may stay idle before it is checked with `PING` on checkout
+    """
+    pool: MeasuredConnectionPool = MeasuredConnectionPool.from_url(
+        url=connection_url,
+        db=0,
+        encoding="utf-8",
+        decode_responses=True,
+        max_connections=max_connections,
+        timeout=timeout,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=socket_connect_timeout,
+        socket_keepalive=True,
+        health_check_interval=health_check_interval,
+    )
+    return pool
+
+
+async def check_redis_connection(*, connection_pool: aioredis.ConnectionPool) -> None:
+    """Open the first connection of the pool and check that Redis responds."""
+    client: "aioredis.Redis[Any]" = aioredis.Redis(connection_pool=connection_pool)
+    await client.ping()
 
 
 async def sync_redis_graph(*, connection_url: str, graph_data_path: str) -> None:
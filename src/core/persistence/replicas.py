@@ -0,0 +1,85 @@
+import logging
+import random
+import time
+from typing import Any, Literal
+
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+ReplicaPolicy = Literal["weighted", "least_loaded"]
+STICKY_KEY_PREFIX = "replicas:sticky"
+
+
+class ReplicaRouter:
+    """Choose the read replica for a session.
+
+    The replicas are chosen at random by weight (`weighted`) or by the fewest checked out connections
+    per weight (`least_loaded`). A replica failing to connect is skipped for `retry_seconds`.
+    The reads of a sticky key (e.g. a resource written a moment ago) go to the primary for `sticky_seconds`
+    after the write, so they are not served by a replica lagging behind. The sticky keys are kept in Redis,
+    so the reads handled by the other workers after the write go to the primary too.
+    """
+
+    def __init__(
+        self,
+        *,
+        connection_pool: aioredis.ConnectionPool,
+        replicas: list[async_sessionmaker[AsyncSession]],
+        weights: list[float] | None = None,
+        policy: ReplicaPolicy = "weighted",
+        sticky_seconds: float = 5.0,
+        retry_seconds: float = 30.0,
+    ) -> None:
+        if weights and len(weights) != len(replicas):
+            raise ValueError("The number of the replica weights does not match the number of the replicas.")
+        self._connection_pool = connection_pool
+        self._replicas = replicas
+        self._weights = weights or [1.0] * len(replicas)
+        self._policy = policy
+        self._sticky_seconds = sticky_seconds
+        self._retry_seconds = retry_seconds
+        self._unhealthy_until: dict[int, float] = {}
+
+    @property
+    def replicas(self) -> list[async_sessionmaker[AsyncSession]]:
+        return self._replicas
+
+    async def choose(self, sticky_key: str | None = None) -> async_sessionmaker[AsyncSession] | None:
+        """Get the replica to read from, `None` means the primary should be used."""
+        now = time.monotonic()
+        candidates = [
+            (replica, weight)
+            for index, (replica, weight) in enumerate(zip(self._replicas, self._weights))
+            if weight > 0 and self._unhealthy_until.get(index, 0) <= now
+        ]
+        if not candidates or (sticky_key is not None and await self._is_sticky(sticky_key)):
+            return None
+        if self._policy == "least_loaded":
+            return min(candidates, key=lambda candidate: candidate[0].kw["bind"].pool.checkedout() / candidate[1])[0]
+        return random.choices(  # noqa: S311
+            [replica for replica, _ in candidates], weights=[weight for _, weight in candidates]
+        )[0]
+
+    async def _is_sticky(self, sticky_key: str) -> bool:
+        client: "aioredis.Redis[Any]" = aioredis.Redis(connection_pool=self._connection_pool)
+        try:
+            return bool(await client.exists(f"{STICKY_KEY_PREFIX}:{sticky_key}"))
+        except aioredis.RedisError as error:
+            # the write may be recent, so the primary is the safe choice
+            logger.warning(f"Sticky reads are not checked, the primary is used: {error}")
+            return True
+
+    async def mark_written(self, sticky_key: str) -> None:
+        if not self._replicas or self._sticky_seconds <= 0:
+            return
+        client: "aioredis.Redis[Any]" = aioredis.Redis(connection_pool=self._connection_pool)
+        try:
+            await client.set(f"{STICKY_KEY_PREFIX}:{sticky_key}", 1, px=int(self._sticky_seconds * 1000))
+        except aioredis.RedisError as error:
+            # the write is committed already, so it is not failed, the reads may lag for a moment
+            logger.warning(f"Sticky reads are not marked for {sticky_key}: {error}")
+
+    def mark_unhealthy(self, replica: async_sessionmaker[AsyncSession]) -> None:
+        self._unhealthy_until[self._replicas.index(replica)] = time.monotonic() + self._retry_seconds
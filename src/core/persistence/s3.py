@@ -1,14 +1,294 @@
+import asyncio
+import contextlib
+import datetime
+import functools
+import hashlib
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, AsyncIterable, Callable, Literal, TypeVar
+from urllib.parse import quote
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import BaseClient
 from botocore.client import Config as S3Config
 
+from src.lib import schemas
+
+ResultType = TypeVar("ResultType")
+# S3 rejects the parts smaller than 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+RetryMode = Literal["legacy", "standard", "adaptive"]
+
+
+class AsyncS3Client:
+    """Shared boto3 S3 client called in a bounded thread pool, so the requests do not block the event loop.
+
+    The boto3 clients are thread-safe. The amount of the workers should not exceed `max_pool_connections`
+    of the client, otherwise the workers wait for the HTTP connections.
+    The files larger than `multipart_threshold` are uploaded in parts, up to `multipart_concurrency` at a time.
+    """
+
+    def __init__(
+        self,
+        client: BaseClient,
+        *,
+        max_workers: int = 10,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunk_size: int = 8 * 1024 * 1024,
+        multipart_concurrency: int = 4,
+    ) -> None:
+        self.client = client
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3")
+        self._transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunk_size,
+            max_concurrency=multipart_concurrency,
+        )
+        # the transfer callbacks are called from the threads of the parts
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.failed_uploads = 0
+        self.uploaded_bytes = 0
+        self.upload_seconds_total = 0.0
+
+    async def run(self, function: Callable[..., ResultType], /, *args: Any, **kwargs: Any) -> ResultType:
+        """Call the blocking function (e.g. a method of `client`) in the thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(function, *args, **kwargs)
+        )
+
+    async def upload_fileobj(
+        self, fileobj: IO[bytes], *, bucket: str, key: str, extra_args: dict[str, Any] | None = None
+    ) -> None:
+        start_time = time.perf_counter()
+        try:
+            await self.run(
+                self.client.upload_fileobj,  # type: ignore
+                fileobj,
+                bucket,
+                key,
+                ExtraArgs=extra_args,
+                Callback=self._count_uploaded_bytes,
+                Config=self._transfer_config,
+            )
+        except Exception:
+            self.record_upload(seconds=time.perf_counter() - start_time, is_failed=True)
+            raise
+        self.record_upload(seconds=time.perf_counter() - start_time)
+
+    async def upload_stream(
+        self, chunks: AsyncIterable[bytes], *, bucket: str, key: str, extra_args: dict[str, Any] | None = None
+    ) -> int:
+        """Upload the stream of chunks without buffering the whole object.
+
+        The chunks are joined to parts of `multipart_chunk_size` uploaded up to `multipart_concurrency` at a time,
+        the stream is not read while all of them are in flight, so at most `multipart_concurrency + 1` parts
+        are kept in memory. A stream smaller than one part is uploaded with one request.
+        The multipart upload is aborted if reading the stream or uploading a part fails.
+
+        :return: size of the uploaded object
+        """
+        start_time = time.perf_counter()
+        part_size = max(self._transfer_config.multipart_chunksize, MIN_PART_SIZE)
+        semaphore = asyncio.Semaphore(self._transfer_config.max_concurrency)
+        buffer, size = bytearray(), 0
+        upload_id: str | None = None
+        parts: list[asyncio.Task[dict[str, Any]]] = []
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                size += len(chunk)
+                while len(buffer) >= part_size:
+                    if upload_id is None:
+                        response = await self.run(
+                            self.client.create_multipart_upload,  # type: ignore
+                            Bucket=bucket,
+                            Key=key,
+                            **(extra_args or {}),
+                        )
+                        upload_id = response["UploadId"]
+                    await semaphore.acquire()
+                    self._raise_failed_part(parts)
+                    body = bytes(buffer[:part_size])
+                    del buffer[:part_size]
+                    parts.append(
+                        asyncio.create_task(self._upload_part(semaphore, bucket, key, upload_id, len(parts) + 1, body))
+                    )
+
+            if upload_id is None:
+                await self.run(
+                    self.client.put_object,  # type: ignore
+                    Bucket=bucket,
+                    Key=key,
+                    Body=bytes(buffer),
+                    **(extra_args or {}),
+                )
+            else:
+                if buffer:
+                    await semaphore.acquire()
+                    parts.append(
+                        asyncio.create_task(
+                            self._upload_part(semaphore, bucket, key, upload_id, len(parts) + 1, bytes(buffer))
+                        )
+                    )
+                    buffer.clear()
+                uploaded_parts = await asyncio.gather(*parts)
+                await self.run(
+                    self.client.complete_multipart_upload,  # type: ignore
+                    Bucket=bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": uploaded_parts},
+                )
+        except BaseException:
+            for part in parts:
+                part.cancel()
+            await asyncio.gather(*parts, return_exceptions=True)
+            if upload_id is not None:
+                with contextlib.suppress(Exception):
+                    await self.run(
+                        self.client.abort_multipart_upload,  # type: ignore
+                        Bucket=bucket,
+                        Key=key,
+                        UploadId=upload_id,
+                    )
+            self.record_upload(seconds=time.perf_counter() - start_time, is_failed=True)
+            raise
+        self.record_upload(seconds=time.perf_counter() - start_time, size=size)
+        return size
+
+    async def _upload_part(
+        self, semaphore: asyncio.Semaphore, bucket: str, key: str, upload_id: str, number: int, body: bytes
+    ) -> dict[str, Any]:
+        try:
+            response = await self.run(
+                self.client.upload_part,  # type: ignore
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=number,
+                Body=body,
+            )
+        finally:
+            semaphore.release()
+        return {"ETag": response["ETag"], "PartNumber": number}
+
+    @staticmethod
+    def _raise_failed_part(parts: list[asyncio.Task[dict[str, Any]]]) -> None:
+        """Stop reading the stream as soon as an upload of a part has failed."""
+        for part in parts:
+            if part.done() and not part.cancelled() and part.exception() is not None:
+                part.result()
+
+    def _count_uploaded_bytes(self, amount: int) -> None:
+        with self._lock:
+            self.uploaded_bytes += amount
+
+    def record_upload(self, seconds: float, size: int = 0, is_failed: bool = False) -> None:
+        """Count the upload in the metrics, `size` is the amount of the bytes not counted by the transfer."""
+        with self._lock:
+            self.uploads += 1
+            self.failed_uploads += is_failed
+            self.uploaded_bytes += size
+            self.upload_seconds_total += seconds
+
+    def get_metrics(self) -> schemas.S3Metrics:
+        return schemas.S3Metrics(
+            max_workers=self._max_workers,
+            uploads=self.uploads,
+            failed_uploads=self.failed_uploads,
+            uploaded_bytes=self.uploaded_bytes,
+            upload_seconds_total=self.upload_seconds_total,
+            upload_bytes_per_second=self.uploaded_bytes / self.upload_seconds_total if self.upload_seconds_total else 0,
+        )
+
+    async def close(self) -> None:
+        """Wait for the running calls and stop the workers."""
+        await asyncio.to_thread(self._executor.shutdown)
+
+
+class S3UrlSigner:
+    """Offline signer of the pre-signed GET URLs (AWS Signature Version 4, query string auth).
+
+    Signing is a couple of HMACs with the signing key derived from the secret key once a day,
+    unlike `generate_presigned_url` of boto3, which builds and signs a whole request every time.
+    The URLs use the virtual-hosted style, as the client does.
+    """
+
+    algorithm = "AWS4-HMAC-SHA256"
+
+    def __init__(self, *, region: str, endpoint: str, access_key: str, secret_key: str) -> None:
+        self._region = region
+        self._endpoint = endpoint
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._signing_keys: dict[str, bytes] = {}
+
+    def _get_signing_key(self, date: str) -> bytes:
+        signing_key = self._signing_keys.get(date)
+        if signing_key is None:
+            signing_key = f"AWS4{self._secret_key}".encode()
+            for part in (date, self._region, "s3", "aws4_request"):
+                signing_key = hmac.digest(signing_key, part.encode(), "sha256")
+            # the keys of the previous days are not used anymore
+            self._signing_keys = {date: signing_key}
+        return signing_key
+
+    def presign_get(self, *, bucket: str, key: str, expiration: int, now: datetime.datetime | None = None) -> str:
+        """Build the URL to get the object for `expiration` seconds since `now` (the current time by default)."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        timestamp, date = now.strftime("%Y%m%dT%H%M%SZ"), now.strftime("%Y%m%d")
+        scope = f"{date}/{self._region}/s3/aws4_request"
+        host, path = f"{bucket}.{self._endpoint}", "/" + quote(key, safe="/~")
+        query = "&".join(
+            f"{name}={quote(value, safe='~')}"
+            for name, value in (
+                ("X-Amz-Algorithm", self.algorithm),
+                ("X-Amz-Credential", f"{self._access_key}/{scope}"),
+                ("X-Amz-Date", timestamp),
+                ("X-Amz-Expires", str(expiration)),
+                ("X-Amz-SignedHeaders", "host"),
+            )
+        )
+        canonical_request = f"GET\n{path}\n{query}\nhost:{host}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign = "\n".join(
+            (self.algorithm, timestamp, scope, hashlib.sha256(canonical_request.encode()).hexdigest())
+        )
+        signature = hmac.new(self._get_signing_key(date), string_to_sign.encode(), "sha256").hexdigest()
+        return f"https://{host}{path}?{query}&X-Amz-Signature={signature}"
+
+
+def create_s3_client(
+    *,
+    region: str,
+    endpoint: str,
+    access_key: str,
+    secret_key: str,
+    max_pool_connections: int = 10,
+    max_attempts: int = 3,
+    retry_mode: RetryMode = "standard",
+    connect_timeout: float = 5,
+    read_timeout: float = 60,
+) -> BaseClient:
+    """Create the S3 client.
 
-def create_s3_client(*, region: str, endpoint: str, access_key: str, secret_key: str) -> BaseClient:
+    :param max_attempts: attempts of a request including the first one, the failed ones are retried with a backoff
+    """
     return boto3.client(
         "s3",
         region_name=region,
         endpoint_url=f"https://{endpoint}",
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
-        config=S3Config(s3={"addressing_style": "virtual"}),
+        config=S3Config(
+            s3={"addressing_style": "virtual"},
+            max_pool_connections=max_pool_connections,
+            retries={"max_attempts": max_attempts, "mode": retry_mode},
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        ),
     )
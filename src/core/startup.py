@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import logging
+import os
+import signal
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from redis import asyncio as aioredis
+from sqlalchemy import func, pool, select
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src.lib import schemas
+
+logger = logging.getLogger(__name__)
+
+LOCK_PHASE = "lock"
+LOCK_POLL_INTERVAL = 0.5
+FINGERPRINT_KEY_PREFIX = "startup:fingerprint"
+
+
+@dataclass(frozen=True)
+class StartupPhase:
+    name: str
+    run: Callable[[], Awaitable[None]]
+    # the phase is skipped if its last run stored the same fingerprint, e.g. of the data it loads
+    fingerprint: str | None = None
+
+
+def get_files_fingerprint(path: str) -> str:
+    """Hash the names and the contents of the files in the directory tree."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, "rb") as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+class StartupPipeline:
+    """Startup work shared by the workers, e.g. the migrations, run by one worker at a time.
+
+    Every worker takes the Postgres advisory lock before the phases, the first one runs them and the others wait
+    for the lock, so they start after the work is done. The phases must be idempotent: the migrations are up to date
+    after the first run, the phases with a fingerprint are skipped while the fingerprint stored in Redis matches.
+    The lock is released with the connection if the worker dies, then the next one runs the phases again.
+    A failed startup is retried with an exponential backoff, then the worker is stopped by `on_failure` (SIGTERM
+    by default), so it is restarted by the process manager instead of reporting that it is not ready forever.
+    """
+
+    def __init__(
+        self,
+        *,
+        db_url: str,
+        redis_connection_pool: aioredis.ConnectionPool,
+        phases: list[StartupPhase],
+        lock_key: int,
+        lock_timeout: float = 600,
+        max_attempts: int = 3,
+        retry_delay: float = 5,
+        on_failure: Callable[[], None] | None = None,
+    ) -> None:
+        self._db_url = db_url
+        self._redis_connection_pool = redis_connection_pool
+        self._phases = phases
+        self._lock_key = lock_key
+        self._lock_timeout = lock_timeout
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._on_failure = on_failure or self._stop_process
+        self._statuses = {
+            name: schemas.StartupPhaseStatus(name=name) for name in (LOCK_PHASE, *(phase.name for phase in phases))
+        }
+        self._task: asyncio.Task[None] | None = None
+        self.is_ready = False
+        self.is_leader: bool | None = None
+        self.seconds: float | None = None
+
+    def start(self) -> None:
+        """Run the phases in the background, the application reports the progress while they run."""
+        self._task = asyncio.create_task(self._run_logged())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run_logged(self) -> None:
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                await self.run()
+                return
+            except Exception:
+                logger.exception("Startup attempt %s of %s failed", attempt, self._max_attempts)
+            if attempt < self._max_attempts:
+                await asyncio.sleep(self._retry_delay * 2 ** (attempt - 1))
+        logger.critical("Startup failed, the worker is stopped")
+        self._on_failure()
+
+    @staticmethod
+    def _stop_process() -> None:
+        # the server shuts down gracefully on SIGTERM, as on a deploy
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    async def run(self) -> None:
+        start_time = time.perf_counter()
+        engine = create_async_engine(self._db_url, poolclass=pool.NullPool)
+        try:
+            # the lock is held while the phases run, so its connection must not stay idle in a transaction
+            async with engine.connect() as connection:
+                connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+                await self._run_phase(self._statuses[LOCK_PHASE], lambda: self._acquire_lock(connection))
+                try:
+                    for phase in self._phases:
+                        await self._run_phase(self._statuses[phase.name], phase.run, fingerprint=phase.fingerprint)
+                finally:
+                    await connection.execute(select(func.pg_advisory_unlock(self._lock_key)))
+        finally:
+            await engine.dispose()
+        self.seconds = time.perf_counter() - start_time
+        self.is_ready = True
+        logger.info("Startup finished in %.3f s as the %s", self.seconds, "leader" if self.is_leader else "follower")
+
+    async def _acquire_lock(self, connection: AsyncConnection) -> None:
+        deadline = time.monotonic() + self._lock_timeout
+        while not await connection.scalar(select(func.pg_try_advisory_lock(self._lock_key))):
+            if self.is_leader is None:
+                logger.info("Waiting for the startup of another worker")
+            self.is_leader = False
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Startup lock is not released in {self._lock_timeout} s")
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+        if self.is_leader is None:
+            self.is_leader = True
+
+    async def _run_phase(
+        self, status: schemas.StartupPhaseStatus, run: Callable[[], Awaitable[Any]], fingerprint: str | None = None
+    ) -> None:
+        status.state = "running"
+        start_time = time.perf_counter()
+        client: "aioredis.Redis[Any]" = aioredis.Redis(connection_pool=self._redis_connection_pool)
+        key = f"{FINGERPRINT_KEY_PREFIX}:{status.name}"
+        try:
+            if fingerprint is not None and await client.get(key) == fingerprint:
+                status.state = "skipped"
+            else:
+                await run()
+                if fingerprint is not None:
+                    await client.set(key, fingerprint)
+                status.state = "done"
+        except BaseException:
+            status.state = "failed"
+            raise
+        finally:
+            status.seconds = time.perf_counter() - start_time
+        logger.info("Startup phase %s is %s in %.3f s", status.name, status.state, status.seconds)
+
+    def get_status(self) -> schemas.StartupStatus:
+        return schemas.StartupStatus(
+            ready=self.is_ready,
+            is_leader=self.is_leader,
+            seconds=self.seconds,
+            phases=[status.model_copy() for status in self._statuses.values()],
+        )
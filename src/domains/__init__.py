@@ -2,6 +2,7 @@ from .image import ImageDomain, create_image_domain
 from .oauth import OauthDomain, create_oauth_domain
 from .user import UserDomain, create_user_domain
 from .article import ArticleDomain, create_article_domain
+from .stats import StatsDomain, create_stats_domain
 
 
 __all__ = [
@@ -9,8 +10,10 @@ __all__ = [
     "UserDomain",
     "OauthDomain",
     "ArticleDomain",
+    "StatsDomain",
     "create_user_domain",
     "create_article_domain",
     "create_oauth_domain",
     "create_image_domain",
+    "create_stats_domain",
 ]
@@ -1 +1,4 @@
 from .domain_builder import ArticleDomain, create_article_domain
+from .like_buffer import LikeBuffer
+from .preview_cache import ArticlePreviewCache
+from .response_cache import ArticleResponseCache
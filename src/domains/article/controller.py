@@ -1,66 +1,169 @@
-import io
+import functools
 import uuid
-from typing import Literal
-from urllib.parse import urljoin, urlparse
+from typing import Literal, Sequence
 
-import aiofiles
-import imgkit
-from fastapi import BackgroundTasks, Depends, Request, UploadFile
+from fastapi import BackgroundTasks, Depends, Query, Request
 from slugify import slugify
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.datastructures import Headers
+from starlette.responses import Response
 
-from src.lib import errors, pagination, providers, schemas, utils
+from src.core.celery_app.celery import celery_app
+from src.lib import enums, errors, pagination, providers, schemas, utils
 
+from .like_buffer import LikeBuffer, LikeTarget
 from .repository import ArticleDBRepository
+from .response_cache import ArticleResponseCache, Validators
 
 
 # TODO: split into smaller parts
 class ArticleController:
-    def __init__(self, db_repo: ArticleDBRepository) -> None:
+    # fields of the update deciding if the article is listed and where
+    _LISTING_FIELDS = frozenset(("is_draft", "is_main", "language", "generic_id"))
+    # fields of the update the preview is rendered from
+    _PREVIEW_FIELDS = frozenset(("title", "label", "cover_image"))
+
+    def __init__(
+        self, db_repo: ArticleDBRepository, response_cache: ArticleResponseCache, like_buffer: LikeBuffer
+    ) -> None:
         self._db_repo = db_repo
+        self._response_cache = response_cache
+        self._like_buffer = like_buffer
+
+    async def _mark_article_written(self, slug: str) -> None:
+        # the article and the lists are read from the primary until the replicas catch up
+        await self._db_repo.mark_written(sticky_key=f"article:{slug}")
+        await self._db_repo.mark_written(sticky_key="articles")
 
-    async def retrieve(self, request: Request, slug: str) -> schemas.Article:
+    async def _get_list_validators(
+        self,
+        key: str,
+        language: enums.LanguageType,
+        pagination_body: schemas.PaginationBody | None = None,
+        is_main: bool = False,
+    ) -> Validators:
         session: AsyncSession
-        async with self._db_repo.get_session() as session:
-            result: schemas.Article = await self._db_repo.get(
-                session=session,
-                slug=slug,
-                language=utils.i18n.get_accept_language_best_match(request.headers.get("accept-language")),
+        async with self._db_repo.get_read_session(sticky_key="articles") as session:
+            versions = await self._db_repo.get_all_versions(
+                session=session, language=language, pagination_body=pagination_body, is_main=is_main
             )
-            return result
+        # the buffered likes are not stored yet, so they change the list without changing the versions
+        deltas = await self._like_buffer.get_deltas(target="article", target_ids=[item.id for item in versions.items])
+        etag = utils.make_etag(
+            key,
+            versions.count,
+            [
+                (item.id, item.updated_at, item.version, item.summary_updated_at, deltas.get(item.id, 0))
+                for item in versions.items
+            ],
+        )
+        # the removal of an article from the list does not change the modification time of the others,
+        # so the list is validated by `ETag` only
+        return etag, None
+
+    @staticmethod
+    def _get_items_tags(
+        result: schemas.ArticlesResponse | schemas.PaginationResponse[schemas.ArticleShort],
+    ) -> list[str]:
+        return [f"article:{item.slug}" for item in result.items]
 
-    async def list_main_only(self, request: Request) -> schemas.ArticlesResponse:
+    async def _add_buffered_likes(
+        self, target: LikeTarget, items: Sequence[schemas.ArticleShort] | Sequence[schemas.Comment]
+    ) -> None:
+        deltas = await self._like_buffer.get_deltas(target=target, target_ids=[item.id for item in items])
+        for item in items:
+            item.likes += deltas.get(item.id, 0)
+
+    async def retrieve(self, request: Request, slug: str) -> Response:
+        language = utils.i18n.get_accept_language_best_match(request.headers.get("accept-language"))
+        return await self._response_cache.get_or_create(
+            key=self._response_cache.make_key(route="retrieve", language=str(language), params={"slug": slug}),
+            # the language variants of the article are changed when an article is created or deleted
+            tags=["articles", f"article:{slug}"],
+            create=functools.partial(self._retrieve, slug=slug, language=language),
+            get_validators=functools.partial(self._get_article_validators, slug=slug, language=language),
+            request_headers=request.headers,
+        )
+
+    async def _get_article_validators(self, slug: str, language: enums.LanguageType) -> Validators | None:
         session: AsyncSession
-        async with self._db_repo.get_session() as session:
-            result = await self._db_repo.get_all(
-                session=session,
-                language=utils.i18n.get_accept_language_best_match(request.headers.get("accept-language")),
-                is_main=True,
-            )
+        async with self._db_repo.get_read_session(sticky_key=f"article:{slug}") as session:
+            version = await self._db_repo.get_version(session=session, slug=slug, language=language)
+        if version is None:
+            return None
+        deltas = await self._like_buffer.get_deltas(target="article", target_ids=[version.id])
+        etag = utils.make_etag(
+            str(language),
+            version.id,
+            version.updated_at,
+            version.version,
+            version.summary_updated_at,
+            deltas.get(version.id, 0),
+        )
+        # the buffered likes do not change the modification time, so the article is validated by `ETag` only
+        return etag, None if deltas else version.last_modified
+
+    async def _retrieve(self, slug: str, language: enums.LanguageType) -> schemas.Article:
+        session: AsyncSession
+        async with self._db_repo.get_read_session(sticky_key=f"article:{slug}") as session:
+            result: schemas.Article = await self._db_repo.get(session=session, slug=slug, language=language)
+        await self._add_buffered_likes(target="article", items=[result])
+        return result
+
+    async def list_main_only(self, request: Request) -> Response:
+        language = utils.i18n.get_accept_language_best_match(request.headers.get("accept-language"))
+        key = self._response_cache.make_key(route="list-main", language=str(language))
+        return await self._response_cache.get_or_create(
+            key=key,
+            tags=["articles"],
+            create=functools.partial(self._list_main_only, language=language),
+            get_item_tags=self._get_items_tags,
+            get_validators=functools.partial(self._get_list_validators, key=key, language=language, is_main=True),
+            request_headers=request.headers,
+        )
+
+    async def _list_main_only(self, language: enums.LanguageType) -> schemas.ArticlesResponse:
+        session: AsyncSession
+        async with self._db_repo.get_read_session(sticky_key="articles") as session:
+            result = await self._db_repo.get_all(session=session, language=language, is_main=True)
+        await self._add_buffered_likes(target="article", items=result.items)
 
         return schemas.ArticlesResponse(items=result.items)
 
-    @pagination.paginated
     async def list(
         self,
         request: Request,
         pagination_body: schemas.PaginationBody = Depends(),
+    ) -> Response:
+        language = utils.i18n.get_accept_language_best_match(request.headers.get("accept-language"))
+        key = self._response_cache.make_key(
+            route="list", language=str(language), params=pagination_body.model_dump(mode="json")
+        )
+        return await self._response_cache.get_or_create(
+            key=key,
+            tags=["articles"],
+            create=functools.partial(self._list, language=language, pagination_body=pagination_body),
+            get_item_tags=self._get_items_tags,
+            get_validators=functools.partial(
+                self._get_list_validators, key=key, language=language, pagination_body=pagination_body
+            ),
+            request_headers=request.headers,
+        )
+
+    @pagination.paginated("created_at", "id")
+    async def _list(
+        self, language: enums.LanguageType, pagination_body: schemas.PaginationBody
     ) -> schemas.PaginationResponse[schemas.ArticleShort]:
         session: AsyncSession
-        async with self._db_repo.get_session() as session:
-            result = await self._db_repo.get_all(
-                session=session,
-                pagination_body=pagination_body,
-                language=utils.i18n.get_accept_language_best_match(request.headers.get("accept-language")),
-            )
+        async with self._db_repo.get_read_session(sticky_key="articles") as session:
+            result = await self._db_repo.get_all(session=session, pagination_body=pagination_body, language=language)
+        await self._add_buffered_likes(target="article", items=result.items)
 
         return schemas.PaginationResponse(
             items=result.items,
             total_items=result.count,
         )
 
-    @pagination.paginated
+    @pagination.paginated("created_at", "id")
     async def list_editor(
         self,
         request: Request,
@@ -84,92 +187,153 @@ class ArticleController:
         request: Request,
         item: schemas.ArticleCreate,
         background_tasks: BackgroundTasks,
-        domain_holder: providers.DomainHolderRequired,
         settings: providers.MainSettingsRequired,
     ) -> schemas.ArticleCreateResponse:
         data = item.model_dump()
         data["slug"] = slugify(f"{item.title}-{utils.get_current_timestamp()}")
         data["generic_id"] = data["generic_id"] or uuid.uuid4()
-        async with self._db_repo.get_session() as session, session.begin():
+        async with self._db_repo.get_admin_session() as session, session.begin():
             result = await self._db_repo.create(session=session, item=schemas.InnerArticleCreate(**data))
-            if not settings.environment.is_testing:
-                background_tasks.add_task(
-                    self.generate_preview_article,
-                    item=result,
-                    domain_holder=domain_holder,
-                    settings=settings,
-                    request=request,
-                )
-            return result
+        await self._mark_article_written(slug=result.slug)
+        if not settings.environment.is_testing:
+            self._schedule_preview(background_tasks=background_tasks, slug=result.slug)
+        await self._response_cache.invalidate("articles")
+        return result
 
-    async def update(self, request: Request, slug: str, item: schemas.ArticleUpdate) -> schemas.Article:
+    @staticmethod
+    def _schedule_preview(background_tasks: BackgroundTasks, slug: str) -> None:
+        # the task is sent after the response, the background tasks run the sync calls in the thread pool
+        background_tasks.add_task(celery_app.send_task, "articles.generate_preview", kwargs={"slug": slug})
+
+    async def update(
+        self,
+        request: Request,
+        slug: str,
+        item: schemas.ArticleUpdate,
+        background_tasks: BackgroundTasks,
+        settings: providers.MainSettingsRequired,
+    ) -> schemas.Article:
         if item.model_dump(exclude_unset=True) == {}:
             raise errors.UnprocessableEntityError()
-        async with self._db_repo.get_session() as session, session.begin():
-            return await self._db_repo.update(
+        async with self._db_repo.get_admin_session() as session, session.begin():
+            result: schemas.Article = await self._db_repo.update(
                 session=session,
                 slug=slug,
                 item=item,
                 language=utils.i18n.get_accept_language_best_match(request.headers.get("accept-language")),
             )
+        await self._mark_article_written(slug=slug)
+        if item.model_fields_set & self._PREVIEW_FIELDS and not settings.environment.is_testing:
+            self._schedule_preview(background_tasks=background_tasks, slug=slug)
+        # the lists are rebuilt if the article could be added to or removed from them
+        is_listing_changed = bool(item.model_fields_set & self._LISTING_FIELDS)
+        await self._response_cache.invalidate("articles" if is_listing_changed else f"article:{slug}")
+        return result
 
     async def delete(self, slug: str) -> None:
         session: AsyncSession
-        async with self._db_repo.get_session() as session, session.begin():
+        async with self._db_repo.get_admin_session() as session, session.begin():
             await self._db_repo.delete(session=session, slug=slug)
+        await self._mark_article_written(slug=slug)
+        await self._response_cache.invalidate("articles")
 
     async def like(self, slug: str, user_id: providers.AuthUserId, is_positive: bool = True) -> Literal[True]:
         session: AsyncSession
-        async with self._db_repo.get_session() as session:
-            await self._db_repo.like(
-                session=session,
-                slug=slug,
-                user_id=user_id,
-                is_positive=is_positive,
-            )
-            return True
+        if self._like_buffer.is_enabled:
+            await self._buffer_like(slug=slug, user_id=user_id, state=1 if is_positive else -1)
+        else:
+            async with self._db_repo.get_session() as session:
+                await self._db_repo.like(
+                    session=session,
+                    slug=slug,
+                    user_id=user_id,
+                    is_positive=is_positive,
+                )
+            await self._db_repo.mark_written(sticky_key=f"article:{slug}")
+        await self._response_cache.invalidate(f"article:{slug}")
+        return True
 
     async def delete_like(self, slug: str, user_id: providers.AuthUserId) -> None:
+        session: AsyncSession
+        if self._like_buffer.is_enabled:
+            await self._buffer_like(slug=slug, user_id=user_id, state=0)
+        else:
+            async with self._db_repo.get_session() as session:
+                await self._db_repo.delete_like(
+                    session=session,
+                    slug=slug,
+                    user_id=user_id,
+                )
+            await self._db_repo.mark_written(sticky_key=f"article:{slug}")
+        await self._response_cache.invalidate(f"article:{slug}")
+
+    async def _buffer_like(self, slug: str, user_id: int, state: int) -> None:
         session: AsyncSession
         async with self._db_repo.get_session() as session:
-            await self._db_repo.delete_like(
-                session=session,
-                slug=slug,
-                user_id=user_id,
-            )
+            article_id, stored_state = await self._db_repo.get_like_state(session=session, slug=slug, user_id=user_id)
+        await self._like_buffer.record(
+            target="article", target_id=article_id, user_id=user_id, state=state, stored_state=stored_state
+        )
 
-    @pagination.paginated
+    @pagination.paginated("id")
     async def get_root_comments(
         self,
         item_id: int,
         pagination_body: schemas.PaginationBody = Depends(),
     ) -> schemas.CommentsPaginated:
         session: AsyncSession
-        async with self._db_repo.get_session() as session:
+        async with self._db_repo.get_read_session(sticky_key="comments") as session:
             result: schemas.CommentsWithCount = await self._db_repo.get_root_comments(
                 session=session, article_id=item_id, pagination_body=pagination_body
             )
+        await self._add_buffered_likes(target="comment", items=result.items)
         return schemas.CommentsPaginated(
             items=result.items,
             total_items=result.count,
         )
 
-    @pagination.paginated
+    @pagination.paginated("id")
     async def get_comment_answers(
         self,
         comment_id: int,
         pagination_body: schemas.PaginationBody = Depends(),
     ) -> schemas.CommentsPaginated:
         session: AsyncSession
-        async with self._db_repo.get_session() as session:
+        async with self._db_repo.get_read_session(sticky_key="comments") as session:
             result: schemas.CommentsWithCount = await self._db_repo.get_comment_answers(
                 session=session, comment_id=comment_id, pagination_body=pagination_body
             )
+        await self._add_buffered_likes(target="comment", items=result.items)
         return schemas.CommentsPaginated(
             items=result.items,
             total_items=result.count,
         )
 
+    @pagination.paginated("id")
+    async def get_comment_threads(
+        self,
+        item_id: int,
+        pagination_body: schemas.PaginationBody = Depends(),
+        replies_limit: int = Query(default=3, ge=0, le=50, description="Amount of the replies of every thread"),
+    ) -> schemas.CommentThreadsPaginated:
+        session: AsyncSession
+        async with self._db_repo.get_read_session(sticky_key="comments") as session:
+            result: schemas.CommentThreadsWithCount = await self._db_repo.get_comment_threads(
+                session=session, article_id=item_id, pagination_body=pagination_body, replies_limit=replies_limit
+            )
+        # the buffered likes are added to the replies too
+        comments: list[schemas.CommentThread] = []
+        pending = list(result.items)
+        while pending:
+            comment = pending.pop()
+            comments.append(comment)
+            pending.extend(comment.replies)
+        await self._add_buffered_likes(target="comment", items=comments)
+        return schemas.CommentThreadsPaginated(
+            items=result.items,
+            total_items=result.count,
+        )
+
     async def create_comment(
         self, item_id: int, item: schemas.CommentCreate, requester_id: providers.AuthUserId
     ) -> schemas.Comment:
@@ -178,7 +342,8 @@ class ArticleController:
             result: schemas.Comment = await self._db_repo.create_comment(
                 session=session, article_id=item_id, author_id=requester_id, item=item
             )
-            return result
+        await self._db_repo.mark_written(sticky_key="comments")
+        return result
 
     async def update_comment(
         self, comment_id: int, item: schemas.CommentUpdate, requester_id: providers.AuthUserId
@@ -191,7 +356,8 @@ class ArticleController:
             result: schemas.Comment = await self._db_repo.update_comment(
                 session=session, comment_id=comment_id, item=item
             )
-            return result
+        await self._db_repo.mark_written(sticky_key="comments")
+        return result
 
     async def delete_comment(self, comment_id: int, requester_id: providers.AuthUserId) -> None:
         session: AsyncSession
@@ -200,49 +366,37 @@ class ArticleController:
             if author_id != requester_id:
                 raise errors.OperationWithNonUserCommentError
             await self._db_repo.delete_comment(session=session, comment_id=comment_id)
+        await self._db_repo.mark_written(sticky_key="comments")
 
     async def like_comment(
         self, comment_id: int, requester_id: providers.AuthUserId, is_positive: bool = True
     ) -> Literal[True]:
+        if self._like_buffer.is_enabled:
+            await self._buffer_comment_like(comment_id=comment_id, user_id=requester_id, state=1 if is_positive else -1)
+            return True
         session: AsyncSession
         async with self._db_repo.get_session() as session:
             await self._db_repo.like_comment(
                 session=session, comment_id=comment_id, user_id=requester_id, is_positive=is_positive
             )
-            return True
+        await self._db_repo.mark_written(sticky_key="comments")
+        return True
 
     async def delete_comment_like(self, comment_id: int, requester_id: providers.AuthUserId) -> None:
+        if self._like_buffer.is_enabled:
+            await self._buffer_comment_like(comment_id=comment_id, user_id=requester_id, state=0)
+            return
         session: AsyncSession
         async with self._db_repo.get_session() as session:
             await self._db_repo.delete_comment_like(session=session, comment_id=comment_id, user_id=requester_id)
+        await self._db_repo.mark_written(sticky_key="comments")
 
-    async def generate_preview_article(
-        self,
-        request: Request,
-        item: schemas.ArticleCreateResponse,
-        domain_holder: providers.DomainHolderRequired,
-        settings: providers.MainSettingsRequired,
-    ) -> None:
-        async with aiofiles.open(file=f"{settings.asset_path.templates}/article-preview-template.html") as file:
-            content: str = await file.read()
-            image: bytes = imgkit.from_string(
-                string=content.format(title=item.title, label=item.label, image=item.cover_image),
-                output_path=False,
-                options={"format": "png"},
-            )
-            upload_file = UploadFile(
-                file=io.BytesIO(image),
-                filename=f"{item.slug}-preview.png",
-                headers=Headers({"content-type": "image/png"}),
-            )
-            preview_url = (
-                await domain_holder.image.controller.upload_file_endpoint(
-                    file=upload_file, folder="articles/previews", settings=settings
-                )
-            ).url
-
-            await self.update(
-                request=request,
-                slug=item.slug,
-                item=schemas.ArticleUpdate(preview_image=urljoin(preview_url, urlparse(preview_url).path)),
+    async def _buffer_comment_like(self, comment_id: int, user_id: int, state: int) -> None:
+        session: AsyncSession
+        async with self._db_repo.get_session() as session:
+            stored_state = await self._db_repo.get_comment_like_state(
+                session=session, comment_id=comment_id, user_id=user_id
             )
+        await self._like_buffer.record(
+            target="comment", target_id=comment_id, user_id=user_id, state=state, stored_state=stored_state
+        )
@@ -2,16 +2,35 @@ from dataclasses import dataclass
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.core.persistence import ReplicaRouter
+
 from .controller import ArticleController
+from .like_buffer import LikeBuffer
 from .repository import ArticleDBRepository
+from .response_cache import ArticleResponseCache
 
 
 @dataclass(frozen=True)
 class ArticleDomain:
     controller: ArticleController
+    response_cache: ArticleResponseCache
+    like_buffer: LikeBuffer
 
 
-def create_article_domain(*, pg_session_manager: async_sessionmaker[AsyncSession]) -> ArticleDomain:
-    db_repo = ArticleDBRepository(session_manager=pg_session_manager)
-    controller = ArticleController(db_repo=db_repo)
-    return ArticleDomain(controller=controller)
+def create_article_domain(
+    *,
+    pg_session_manager: async_sessionmaker[AsyncSession],
+    response_cache: ArticleResponseCache,
+    like_buffer: LikeBuffer,
+    pg_read_session_manager: async_sessionmaker[AsyncSession] | None = None,
+    pg_admin_session_manager: async_sessionmaker[AsyncSession] | None = None,
+    replica_router: ReplicaRouter | None = None,
+) -> ArticleDomain:
+    db_repo = ArticleDBRepository(
+        session_manager=pg_session_manager,
+        read_session_manager=pg_read_session_manager,
+        admin_session_manager=pg_admin_session_manager,
+        replica_router=replica_router,
+    )
+    controller = ArticleController(db_repo=db_repo, response_cache=response_cache, like_buffer=like_buffer)
+    return ArticleDomain(controller=controller, response_cache=response_cache, like_buffer=like_buffer)
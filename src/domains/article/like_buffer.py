@@ -0,0 +1,142 @@
+import contextlib
+from typing import Any, AsyncGenerator, Iterable, Literal
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from src.core.base.repository import BaseRedisRepository
+
+LikeTarget = Literal["article", "comment"]
+# map of `(target id, user id)` to the like state: 1 - like, -1 - dislike, 0 - no like
+LikeStates = dict[tuple[int, int], int]
+
+# Set the like state of the user and change the buffered delta of the target by the difference.
+# The current state is the buffered one, the one being flushed or the stored one (passed by the caller).
+# KEYS: states, flushing states, deltas; ARGV: "<target id>:<user id>", target id, new state, stored state
+_RECORD_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current then
+    current = redis.call('HGET', KEYS[2], ARGV[1])
+end
+if not current then
+    current = ARGV[4]
+end
+local delta = tonumber(ARGV[3]) - tonumber(current)
+if delta ~= 0 then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+    redis.call('HINCRBY', KEYS[3], ARGV[2], delta)
+end
+return delta
+"""
+
+# Move the buffered likes to the flushing keys, unless the previous flush has not been finished.
+# KEYS: states, deltas, flushing states, flushing deltas
+_TAKE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return 0
+    end
+    redis.call('RENAME', KEYS[1], KEYS[3])
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        redis.call('RENAME', KEYS[2], KEYS[4])
+    end
+end
+return 1
+"""
+
+
+class LikeBuffer(BaseRedisRepository):
+    """Write-behind buffer of the likes of the articles and comments.
+
+    The like state of every user is kept in Redis until it is flushed to the database in bulk,
+    so the likes of a popular article do not contend for its row locks on every request.
+    The buffered deltas of the likes counters are added to the stored ones on read.
+    """
+
+    prefix = "like-buffer"
+
+    def __init__(self, connection_pool: aioredis.ConnectionPool, is_enabled: bool) -> None:
+        super().__init__(connection_pool=connection_pool)
+        self.is_enabled = is_enabled
+        self._record_script = self._client.register_script(_RECORD_SCRIPT)
+        self._take_script = self._client.register_script(_TAKE_SCRIPT)
+
+    def _get_keys(self, target: LikeTarget) -> tuple[str, str, str, str]:
+        """Get the keys of the states and deltas, and the ones of the states and deltas being flushed."""
+        return (
+            f"{self.prefix}:{target}:states",
+            f"{self.prefix}:{target}:deltas",
+            f"{self.prefix}:{target}:flushing:states",
+            f"{self.prefix}:{target}:flushing:deltas",
+        )
+
+    async def record(self, *, target: LikeTarget, target_id: int, user_id: int, state: int, stored_state: int) -> int:
+        """Buffer the like state of the user, a repeated state changes nothing.
+
+        :param stored_state: state of the like in the database, used if there is no buffered one
+        :return: change of the likes counter of the target
+        """
+        states, deltas, flushing_states, _ = self._get_keys(target)
+        delta: int = await self._record_script(
+            keys=[states, flushing_states, deltas], args=[f"{target_id}:{user_id}", target_id, state, stored_state]
+        )
+        return delta
+
+    async def get_deltas(self, *, target: LikeTarget, target_ids: Iterable[int]) -> dict[int, int]:
+        """Get the buffered changes of the likes counters of the targets, including the ones being flushed."""
+        target_ids = list(target_ids)
+        if not self.is_enabled or not target_ids:
+            return {}
+        _, deltas, _, flushing_deltas = self._get_keys(target)
+        async with self.create_session() as session, session.pipeline(transaction=False) as pipe:
+            pipe.hmget(deltas, target_ids)
+            pipe.hmget(flushing_deltas, target_ids)
+            buffered, flushing = await pipe.execute()
+        return {
+            target_id: int(delta or 0) + int(flushing_delta or 0)
+            for target_id, delta, flushing_delta in zip(target_ids, buffered, flushing)
+            if delta or flushing_delta
+        }
+
+    async def drop_flushed(self, *, target: LikeTarget, states: LikeStates, deltas: dict[int, int]) -> None:
+        """Drop the stored likes from the ones being flushed, so they are not counted twice if the flush fails later.
+
+        :param deltas: changes of the stored likes counters, they are not buffered anymore
+        """
+        _, _, flushing_states, flushing_deltas = self._get_keys(target)
+        async with self.create_session() as session, session.pipeline(transaction=True) as pipe:
+            pipe.hdel(flushing_states, *(f"{target_id}:{user_id}" for target_id, user_id in states))
+            for target_id, delta in deltas.items():
+                pipe.hincrby(flushing_deltas, str(target_id), -delta)
+            await pipe.execute()
+
+    @contextlib.asynccontextmanager
+    async def flush(self, *, target: LikeTarget, timeout: float) -> AsyncGenerator[LikeStates | None, Any]:
+        """Take the buffered likes to store them, they are dropped from the buffer if the block succeeds.
+
+        The likes buffered meanwhile are kept for the next flush, the ones of a failed flush are taken again.
+        The likes stored in parts must be dropped with `drop_flushed` after every part is committed.
+        Yields `None` if there is nothing to flush or another flush of the target is running.
+
+        :param timeout: seconds the flush holds the lock for at most
+        """
+        states, deltas, flushing_states, flushing_deltas = self._get_keys(target)
+        lock = self._client.lock(f"{self.prefix}:{target}:lock", timeout=timeout, blocking=False)
+        if not await lock.acquire():
+            yield None
+            return
+        try:
+            if not await self._take_script(keys=[states, deltas, flushing_states, flushing_deltas]):
+                yield None
+                return
+            entries: dict[str, str] = await self._client.hgetall(flushing_states)
+            yield {
+                (int(target_id), int(user_id)): int(state)
+                for key, state in entries.items()
+                for target_id, user_id in [key.split(":")]
+            }
+            await self._client.delete(flushing_states, flushing_deltas)
+        finally:
+            # the lock has expired if the flush took longer than the timeout
+            with contextlib.suppress(RedisError):
+                await lock.release()
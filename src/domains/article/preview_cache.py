@@ -0,0 +1,33 @@
+import hashlib
+import json
+
+from redis import asyncio as aioredis
+
+from src.core.base.repository import BaseRedisRepository
+
+
+class ArticlePreviewCache(BaseRedisRepository):
+    """Redis cache of the rendered article previews.
+
+    A render is keyed by the hash of everything it is built from, so an update not changing
+    the previewed fields (or changing them back) reuses the uploaded image instead of rendering it again.
+    """
+
+    prefix = "article-preview"
+
+    def __init__(self, connection_pool: aioredis.ConnectionPool, ttl: int) -> None:
+        super().__init__(connection_pool=connection_pool)
+        self._ttl = ttl
+
+    @staticmethod
+    def make_key(*, template: str, title: str, label: str, cover_image: str) -> str:
+        """Hash of the render inputs, used as the name of the uploaded preview too."""
+        return hashlib.sha256(json.dumps([template, title, label, cover_image]).encode()).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        """Get the object name of the rendered preview."""
+        object_name: str | None = await self._client.get(f"{self.prefix}:{key}")
+        return object_name
+
+    async def set(self, key: str, object_name: str) -> None:  # noqa: A003
+        await self._client.set(f"{self.prefix}:{key}", object_name, ex=self._ttl)
@@ -0,0 +1,180 @@
+import abc
+import io
+import json
+import logging
+import os
+from typing import Literal
+
+import httpx
+import imgkit
+from PIL import Image, ImageDraw, ImageFont, ImageOps, UnidentifiedImageError
+from pydantic import BaseModel, Field
+
+from src.lib import schemas
+
+logger = logging.getLogger(__name__)
+
+PreviewEngine = Literal["html", "pillow"]
+HTML_TEMPLATE = "article-preview-template.html"
+PILLOW_LAYOUT = "article-preview-layout.json"
+# the cover images larger than this are not composed
+MAX_COVER_SIZE = 10 * 1024 * 1024
+
+
+class PreviewBox(BaseModel):
+    x: int = 0
+    y: int = 0
+    width: int
+    height: int
+
+
+class PreviewText(BaseModel):
+    field: Literal["title", "label"]
+    x: int
+    y: int
+    width: int
+    font: str | None = Field(default=None, description="Path of the TrueType font, the default font if not set")
+    size: int = 48
+    color: str = "#ffffff"
+    max_lines: int = 1
+    line_spacing: float = 1.2
+
+
+class PreviewLayout(BaseModel):
+    """Declarative layout of the preview: the cover is drawn first, then the overlay and the texts."""
+
+    width: int = 1200
+    height: int = 630
+    background: str = "#1e1e1e"
+    cover: PreviewBox | None = PreviewBox(width=1200, height=630)
+    overlay: str | None = Field(default="#00000099", description="Color drawn over the cover, e.g. to darken it")
+    texts: list[PreviewText] = [
+        PreviewText(field="label", x=80, y=80, width=1040, size=32, color="#ffd166"),
+        PreviewText(field="title", x=80, y=160, width=1040, size=64, max_lines=4),
+    ]
+
+
+class PreviewRenderer(abc.ABC):
+    @property
+    @abc.abstractmethod
+    def template(self) -> str:
+        """Everything the render depends on besides the article, so the cached renders are not reused if it changes."""
+
+    @abc.abstractmethod
+    def render(self, source: schemas.ArticlePreviewSource) -> bytes:
+        """Render the preview as PNG."""
+
+
+class HTMLPreviewRenderer(PreviewRenderer):
+    """Renderer of the HTML template by wkhtmltoimage, spawns a process per render."""
+
+    def __init__(self, template: str) -> None:
+        self._template = template
+
+    @property
+    def template(self) -> str:
+        return self._template
+
+    def render(self, source: schemas.ArticlePreviewSource) -> bytes:
+        image: bytes = imgkit.from_string(
+            string=self._template.format(title=source.title, label=source.label, image=source.cover_image),
+            output_path=False,
+            options={"format": "png"},
+        )
+        return image
+
+
+class PillowPreviewRenderer(PreviewRenderer):
+    """In-process renderer composing the cover, title and label by the layout, the fonts are loaded once."""
+
+    def __init__(self, layout: PreviewLayout, cover_timeout: float = 10) -> None:
+        self._layout = layout
+        self._fonts = {
+            (text.font, text.size): (
+                ImageFont.truetype(text.font, size=text.size)
+                if text.font is not None
+                else ImageFont.load_default(size=text.size)
+            )
+            for text in layout.texts
+        }
+        self._http_client = httpx.Client(timeout=cover_timeout, follow_redirects=True)
+
+    @property
+    def template(self) -> str:
+        return self._layout.model_dump_json()
+
+    def render(self, source: schemas.ArticlePreviewSource) -> bytes:
+        layout = self._layout
+        image = Image.new("RGBA", (layout.width, layout.height), layout.background)
+        if layout.cover is not None:
+            cover = self._load_cover(source.cover_image)
+            if cover is not None:
+                image.paste(
+                    ImageOps.fit(cover.convert("RGBA"), (layout.cover.width, layout.cover.height)),
+                    (layout.cover.x, layout.cover.y),
+                )
+        if layout.overlay is not None:
+            image.alpha_composite(Image.new("RGBA", image.size, layout.overlay))
+
+        draw = ImageDraw.Draw(image)
+        for text in layout.texts:
+            font = self._fonts[(text.font, text.size)]
+            lines = self._wrap(getattr(source, text.field), font=font, width=text.width, max_lines=text.max_lines)
+            for index, line in enumerate(lines):
+                draw.text((text.x, text.y + index * text.size * text.line_spacing), line, font=font, fill=text.color)
+
+        output = io.BytesIO()
+        image.convert("RGB").save(output, format="PNG")
+        return output.getvalue()
+
+    def _load_cover(self, url: str) -> Image.Image | None:
+        """Download the cover, the preview is rendered without it if it is not available."""
+        try:
+            # the cover is streamed, so a large one is rejected without downloading it
+            with self._http_client.stream("GET", url) as response:
+                response.raise_for_status()
+                content = bytearray()
+                is_too_large = int(response.headers.get("content-length", 0)) > MAX_COVER_SIZE
+                if not is_too_large:
+                    for chunk in response.iter_bytes():
+                        content += chunk
+                        if len(content) > MAX_COVER_SIZE:
+                            is_too_large = True
+                            break
+            if is_too_large:
+                logger.warning("Cover image %s is too large", url)
+                return None
+            cover = Image.open(io.BytesIO(content))
+            cover.load()
+        except (httpx.HTTPError, UnidentifiedImageError, OSError, ValueError) as e:
+            logger.warning("Cover image %s is not loaded: %s", url, e)
+            return None
+        return cover
+
+    @staticmethod
+    def _wrap(value: str, font: ImageFont.FreeTypeFont | ImageFont.ImageFont, width: int, max_lines: int) -> list[str]:
+        """Split the text into the lines fitting the width, the overflow is cut with an ellipsis."""
+        lines: list[str] = []
+        for word in value.split():
+            if lines and font.getlength(f"{lines[-1]} {word}") <= width:
+                lines[-1] = f"{lines[-1]} {word}"
+            else:
+                lines.append(word)
+        if len(lines) > max_lines:
+            lines = lines[:max_lines]
+            while lines[-1] and font.getlength(f"{lines[-1]}…") > width:
+                lines[-1] = lines[-1][:-1]
+            lines[-1] = f"{lines[-1].rstrip()}…"
+        return lines
+
+
+def create_preview_renderer(*, engine: PreviewEngine, templates_path: str) -> PreviewRenderer:
+    """Create the renderer of the engine, the Pillow layout is loaded from the templates if it is there."""
+    if engine == "pillow":
+        layout_path = os.path.join(templates_path, PILLOW_LAYOUT)
+        if not os.path.exists(layout_path):
+            return PillowPreviewRenderer(layout=PreviewLayout())
+        with open(layout_path) as file:
+            return PillowPreviewRenderer(layout=PreviewLayout(**json.load(file)))
+    with open(os.path.join(templates_path, HTML_TEMPLATE)) as file:
+        return HTMLPreviewRenderer(template=file.read())
@@ -1,21 +1,36 @@
+from typing import Any, Callable
+
 from sqlalchemy import (
+    ARRAY,
+    CTE,
+    ColumnElement,
     GenerativeSelect,
+    Integer,
+    Select,
+    String,
+    Update,
     and_,
     case,
+    cast,
+    column,
     delete,
-    distinct,
     exists,
     func,
-    insert,
+    literal,
+    literal_column,
     select,
+    true,
+    tuple_,
     update,
+    values,
 )
-from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 from sqlalchemy.sql.functions import coalesce
 
 from src.core.base.repository import BaseAsyncDBRepository
-from src.lib import enums, errors, models, pagination, schemas
+from src.lib import enums, errors, models, pagination, schemas, utils
 
 
 class ArticleDBRepository(BaseAsyncDBRepository):
@@ -66,12 +81,16 @@ class ArticleDBRepository(BaseAsyncDBRepository):
         result = models.Article(**params)
         session.add(result)
         await session.flush()
-        for tag in tags:
-            tag_id = (await session.execute(select(models.Tag.id).where(models.Tag.name == tag))).scalar() or (
-                await session.execute(insert(models.Tag).values(name=tag).returning(models.Tag.id))
-            ).scalar()
-            session.add(models.ArticlesToTags(tag_id=tag_id, article_id=result.id))
-        await session.flush()
+        await self._set_article_tags(
+            session=session, article_id=result.id, tag_ids=await self._get_tag_ids(session=session, tags=tags)
+        )
+        await self._set_article_images(
+            session=session,
+            article_id=result.id,
+            content_hashes=utils.get_image_hashes(result.cover_image, result.preview_image, result.content),
+        )
+        await self._refresh_summaries(session=session, condition=models.Article.generic_id == result.generic_id)
+        await self._change_counter(session=session, language=result.language, is_draft=result.is_draft, delta=1)
         result.tags = tags
         return schemas.ArticleCreateResponse.model_validate(result)
 
@@ -86,22 +105,44 @@ class ArticleDBRepository(BaseAsyncDBRepository):
         if not is_main and not pagination_body:
             raise errors.InvalidArticleListQueryError()
 
-        query = self._get_query(language=language).where(models.Article.is_draft == False)  # noqa: E712
-
-        if pagination_body:
-            query = pagination.add_pagination_to_query(query=query, id_column=models.Article.id, body=pagination_body)
-        if is_main:
-            query = query.where(models.Article.is_main == True).limit(4).order_by(models.Article.created_at)  # noqa: E712
-
+        query = self._filter_published(
+            self._get_query(language=language), pagination_body=pagination_body, is_main=is_main
+        )
         result = await session.execute(query)
         items = result.mappings().all()
 
-        query = select(func.count(distinct(models.Article.generic_id))).where(
-            and_(models.Article.language == language, models.Article.is_draft == False)  # noqa: E712
+        total_count = await self._get_count(session=session, language=language, is_draft=False)
+        return schemas.ArticlesWithCount(items=items, count=total_count)
+
+    async def get_version(
+        self, *, session: AsyncSession, slug: str, language: enums.LanguageType
+    ) -> schemas.ArticleVersion | None:
+        """Get the version of the published article without aggregating it."""
+        query = self._get_version_query(language=language).where(
+            and_(models.Article.slug == slug, models.Article.is_draft == False)  # noqa: E712
         )
+        result = (await session.execute(query)).mappings().first()
+        return schemas.ArticleVersion(**result) if result is not None else None
 
-        total_count = (await session.execute(query)).scalar()
-        return schemas.ArticlesWithCount(items=items, count=total_count)
+    async def get_all_versions(
+        self,
+        *,
+        session: AsyncSession,
+        language: enums.LanguageType,
+        pagination_body: schemas.PaginationBody = None,
+        is_main: bool = False,
+    ) -> schemas.ArticleVersionsWithCount:
+        """Get the versions of the articles `get_all` would return, without aggregating them."""
+        if not is_main and not pagination_body:
+            raise errors.InvalidArticleListQueryError()
+
+        query = self._filter_published(
+            self._get_version_query(language=language), pagination_body=pagination_body, is_main=is_main
+        )
+        items = (await session.execute(query)).mappings().all()
+
+        total_count = await self._get_count(session=session, language=language, is_draft=False)
+        return schemas.ArticleVersionsWithCount(items=items, count=total_count)
 
     async def get_all_admin(
         self,
@@ -115,14 +156,14 @@ class ArticleDBRepository(BaseAsyncDBRepository):
 
         query = self._get_query(language=language).add_columns(models.Article.is_draft, models.Article.is_main)
         if pagination_body:
-            query = pagination.add_pagination_to_query(query=query, id_column=models.Article.id, body=pagination_body)
+            query = pagination.add_pagination_to_query(
+                query=query, sort_columns=(models.Article.created_at, models.Article.id), body=pagination_body
+            )
 
         result = await session.execute(query)
         items = result.mappings().all()
 
-        query = select(func.count(distinct(models.Article.generic_id))).where(and_(models.Article.language == language))
-
-        total_count = (await session.execute(query)).scalar()
+        total_count = await self._get_count(session=session, language=language)
         return schemas.ArticlesEditorWithCount(items=items, count=total_count)
 
     async def update(
@@ -130,48 +171,163 @@ class ArticleDBRepository(BaseAsyncDBRepository):
     ) -> schemas.Article:
         body = item.model_dump(exclude_unset=True)
         tags = body.pop("tags") if body.get("tags") else None
-        article_id = (
-            (
+        previous = None
+        if body.keys() & {"generic_id", "language", "is_draft"}:
+            previous = (
                 await session.execute(
-                    update(models.Article).where(models.Article.slug == slug).values(**body).returning(models.Article.id)
-                )
-            )
-            .scalars()
-            .first()
-        )
-        if tags:
-            article_tag_ids = []
-            for tag in tags:
-                tag_id = (await session.execute(select(models.Tag.id).where(models.Tag.name == tag))).scalar() or (
-                    await session.execute(insert(models.Tag).values(name=tag).returning(models.Tag.id))
-                ).scalar()
-
-                if not (
-                    await session.execute(
-                        select(exists(models.ArticlesToTags)).where(
-                            and_(models.ArticlesToTags.article_id == article_id, models.ArticlesToTags.tag_id == tag_id)
-                        )
+                    select(models.Article.generic_id, models.Article.language, models.Article.is_draft).where(
+                        models.Article.slug == slug
                     )
-                ).scalar():
-                    session.add(models.ArticlesToTags(tag_id=tag_id, article_id=article_id))
-                article_tag_ids.append(tag_id)
+                )
+            ).first()
+        article = (
             await session.execute(
-                delete(models.ArticlesToTags).where(
-                    and_(
-                        models.ArticlesToTags.article_id == article_id,
-                        ~models.ArticlesToTags.tag_id.in_(article_tag_ids),
-                    )
+                update(models.Article)
+                .where(models.Article.slug == slug)
+                .values(**body)
+                .returning(
+                    models.Article.id,
+                    models.Article.generic_id,
+                    models.Article.language,
+                    models.Article.is_draft,
+                    models.Article.cover_image,
+                    models.Article.preview_image,
+                    models.Article.content,
                 )
             )
+        ).first()
+        if article is None:
+            raise errors.ArticleNotFoundError()
+        article_id = article.id
+        generic_ids: set[Any] = {article.generic_id}
+        if previous is not None:
+            # the article may leave its previous language group, so the group summaries have to be refreshed too
+            generic_ids.add(previous.generic_id)
+            if (previous.language, previous.is_draft) != (article.language, article.is_draft):
+                await self._change_counter(
+                    session=session, language=previous.language, is_draft=previous.is_draft, delta=-1
+                )
+                await self._change_counter(
+                    session=session, language=article.language, is_draft=article.is_draft, delta=1
+                )
+        if tags:
+            await self._set_article_tags(
+                session=session,
+                article_id=article_id,
+                tag_ids=await self._get_tag_ids(session=session, tags=tags),
+                replace=True,
+            )
+        if body.keys() & {"cover_image", "preview_image", "content"}:
+            await self._set_article_images(
+                session=session,
+                article_id=article_id,
+                content_hashes=utils.get_image_hashes(article.cover_image, article.preview_image, article.content),
+                replace=True,
+            )
 
         await session.flush()
+        await self._refresh_summaries(session=session, condition=models.Article.generic_id.in_(generic_ids))
 
         return await self.get_admin(session=session, slug=slug, language=language)
 
+    @staticmethod
+    async def get_preview_source(*, session: AsyncSession, slug: str) -> schemas.ArticlePreviewSource | None:
+        """Get the fields the preview of the article is rendered from, `None` if the article has been deleted."""
+        result = (
+            await session.execute(
+                select(models.Article.title, models.Article.label, models.Article.cover_image).where(
+                    models.Article.slug == slug
+                )
+            )
+        ).first()
+        return schemas.ArticlePreviewSource.model_validate(result) if result is not None else None
+
+    async def set_preview_image(self, *, session: AsyncSession, slug: str, preview_image: str) -> bool:
+        """Set the rendered preview of the article.
+
+        :return: `False` if the preview is the same or the article has been deleted meanwhile
+        """
+        generic_id = (
+            await session.execute(
+                update(models.Article)
+                .where(models.Article.slug == slug, models.Article.preview_image.is_distinct_from(preview_image))
+                .values(preview_image=preview_image)
+                .returning(models.Article.generic_id)
+            )
+        ).scalar()
+        if generic_id is None:
+            return False
+        await self._refresh_summaries(session=session, condition=models.Article.generic_id == generic_id)
+        return True
+
     async def delete(self, *, session: AsyncSession, slug: str) -> bool:
-        await session.execute(delete(models.Article).where(models.Article.slug == slug))
+        article = (
+            await session.execute(
+                delete(models.Article)
+                .where(models.Article.slug == slug)
+                .returning(models.Article.generic_id, models.Article.language, models.Article.is_draft)
+            )
+        ).first()
+        if article is not None:
+            await self._refresh_summaries(session=session, condition=models.Article.generic_id == article.generic_id)
+            await self._change_counter(session=session, language=article.language, is_draft=article.is_draft, delta=-1)
         return True
 
+    async def rebuild_summaries(self, *, session: AsyncSession) -> None:
+        """Rebuild the article read model from scratch."""
+        await session.execute(delete(models.ArticleSummary))
+        await self._refresh_summaries(session=session)
+
+    async def reconcile_counters(self, *, session: AsyncSession) -> None:
+        """Recalculate the article counters from the articles table to correct a possible drift."""
+        # lock the counters first, so concurrent article writes are either counted or applied on top of the result
+        await session.execute(select(models.ArticleCounter.language).with_for_update())
+        statement = postgresql.insert(models.ArticleCounter).from_select(
+            ["language", "is_draft", "count"],
+            select(models.Article.language, models.Article.is_draft, func.count()).group_by(
+                models.Article.language, models.Article.is_draft
+            ),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[models.ArticleCounter.language, models.ArticleCounter.is_draft],
+            set_={"count": statement.excluded.count},
+        )
+        await session.execute(statement)
+        await session.execute(
+            update(models.ArticleCounter)
+            .where(
+                ~exists().where(
+                    and_(
+                        models.Article.language == models.ArticleCounter.language,
+                        models.Article.is_draft == models.ArticleCounter.is_draft,
+                    )
+                )
+            )
+            .values(count=0)
+        )
+
+    async def reconcile_like_counters(self, *, session: AsyncSession) -> None:
+        """Recalculate the likes counters of the articles and comments from the likes to correct a possible drift.
+
+        Only the differing counters are written, a like committed during the run is corrected by the next one.
+        """
+        article_likes = self._count_likes(models.ArticleLike.article_id, models.ArticleSummary.article_id)
+        await session.execute(
+            update(models.ArticleSummary)
+            .where(models.ArticleSummary.likes != article_likes)
+            .values(
+                likes=article_likes,
+                version=models.ArticleSummary.version + 1,
+                updated_at=utils.get_current_timestamp(),
+            )
+        )
+        comment_likes = self._count_likes(models.CommentLike.comment_id, models.Comment.id)
+        await session.execute(
+            update(models.Comment)
+            .where(models.Comment.likes != comment_likes)
+            .values(likes=comment_likes, updated_at=models.Comment.updated_at)
+        )
+
     async def like(
         self,
         *,
@@ -180,29 +336,17 @@ class ArticleDBRepository(BaseAsyncDBRepository):
         is_positive: bool = True,
         user_id: int,
     ) -> bool:
-        article_query = select(models.Article).where(models.Article.slug == slug)
-        article = (await session.execute(article_query)).scalar()
-        if article is None:
+        target = select(models.Article.id).where(models.Article.slug == slug).cte("target")
+        article_id, _ = await self._set_like(
+            session=session,
+            target=target,
+            like_target_column=models.ArticleLike.article_id,
+            user_id=user_id,
+            is_positive=is_positive,
+            change_counter=self._change_article_likes,
+        )
+        if article_id is None:
             raise errors.ArticleNotFoundError()
-
-        like = (
-            await session.execute(
-                select(models.ArticleLike).where(
-                    and_(
-                        models.ArticleLike.article_id == article.id,
-                        models.ArticleLike.user_id == user_id,
-                    )
-                )
-            )
-        ).scalar_one_or_none()
-        if like is None:
-            like = models.ArticleLike(article_id=article.id, user_id=user_id, is_positive=is_positive)
-        else:
-            like.is_positive = is_positive
-
-        session.add(like)
-        session.add(article)
-        await session.flush()
         await session.commit()
         return True
 
@@ -213,71 +357,49 @@ class ArticleDBRepository(BaseAsyncDBRepository):
         slug: str,
         user_id: int,
     ) -> bool:
-        article_query = select(models.Article).where(models.Article.slug == slug)
-        article = (await session.execute(article_query)).scalar()
-        if article is None:
+        target = select(models.Article.id).where(models.Article.slug == slug).cte("target")
+        article_id, _ = await self._unset_like(
+            session=session,
+            target=target,
+            like_target_column=models.ArticleLike.article_id,
+            user_id=user_id,
+            change_counter=self._change_article_likes,
+        )
+        if article_id is None:
             raise errors.ArticleNotFoundError()
-
-        like = (
-            await session.execute(
-                select(models.ArticleLike).where(
-                    and_(
-                        models.ArticleLike.article_id == article.id,
-                        models.ArticleLike.user_id == user_id,
-                    )
-                )
-            )
-        ).scalar_one_or_none()
-        if like is None:
-            return True
-
-        session.add(article)
-        await session.delete(like)
-        await session.flush()
         await session.commit()
         return True
 
+    async def get_like_state(self, *, session: AsyncSession, slug: str, user_id: int) -> tuple[int, int]:
+        """Get the id of the article and the state of the like of the user: 1 - like, -1 - dislike, 0 - no like."""
+        article_id, state = await self._get_like_state(
+            session=session,
+            target=select(models.Article.id).where(models.Article.slug == slug).cte("target"),
+            like_target_column=models.ArticleLike.article_id,
+            user_id=user_id,
+        )
+        if article_id is None:
+            raise errors.ArticleNotFoundError()
+        return article_id, state
+
+    async def apply_likes(self, *, session: AsyncSession, states: dict[tuple[int, int], int]) -> dict[int, int]:
+        """Store the like states of the articles in bulk, see `_apply_like_states`."""
+        return await self._apply_like_states(
+            session=session,
+            target_column=models.Article.id,
+            like_target_column=models.ArticleLike.article_id,
+            states=states,
+            change_counter=self._change_article_likes,
+        )
+
     async def get_root_comments(
         self,
         session: AsyncSession,
         article_id: int,
         pagination_body: schemas.PaginationBody,
     ) -> schemas.CommentsWithCount:
-        query = (
-            select(
-                models.Comment.__table__,
-                models.User.full_name.label("author"),
-                coalesce(
-                    func.sum(case((models.CommentLike.is_positive, 1), (~models.CommentLike.is_positive, -1), else_=0))
-                ).label("likes"),
-            )
-            .select_from(
-                models.Comment.__table__.join(
-                    models.User.__table__,
-                    models.Comment.author_id == models.User.id,
-                ).join(models.CommentLike.__table__, models.CommentLike.comment_id == models.Comment.id, isouter=True)
-            )
-            .where(models.Comment.article_id == article_id)
-            .group_by(
-                models.Comment.id,
-                models.Comment.article_id,
-                models.Comment.author_id,
-                models.Comment.content,
-                models.Comment.parent_comment_id,
-                models.Comment.created_at,
-                models.Comment.updated_at,
-                models.Comment.is_deleted,
-                models.User.first_name,
-                models.User.last_name,
-            )
-        )
-        paginated_query = pagination.add_pagination_to_query(
-            query=query, id_column=models.Comment.id, body=pagination_body
-        )
-        result = await session.execute(paginated_query)
-        items = result.mappings().all()
-        total_count = await self._get_rows_count_in(session=session, table=models.Comment)  # type: ignore
-        return schemas.CommentsWithCount(items=items, count=total_count)
+        condition = and_(models.Comment.article_id == article_id, models.Comment.parent_comment_id.is_(None))
+        return await self._get_comments(session=session, condition=condition, pagination_body=pagination_body)
 
     async def get_comment_answers(
         self,
@@ -285,29 +407,89 @@ class ArticleDBRepository(BaseAsyncDBRepository):
         comment_id: int,
         pagination_body: schemas.PaginationBody,
     ) -> schemas.CommentsWithCount:
+        condition = models.Comment.parent_comment_id == comment_id
+        return await self._get_comments(session=session, condition=condition, pagination_body=pagination_body)
+
+    async def get_comment_threads(
+        self,
+        session: AsyncSession,
+        article_id: int,
+        pagination_body: schemas.PaginationBody,
+        replies_limit: int,
+    ) -> schemas.CommentThreadsWithCount:
+        """Get a page of the root comments of the article with the first replies of every thread in one query.
+
+        The threads are collected by a recursive CTE, the replies of every thread are limited by `replies_limit`
+        in the order of creation. A reply is always created after its parent, so the kept replies form a tree
+        of at most `replies_limit` levels, in which every comment has at most `replies_limit` first replies.
+        The recursion walks only these replies, the extra root fetched by the pagination is not walked.
+        """
+        condition = and_(models.Comment.article_id == article_id, models.Comment.parent_comment_id.is_(None))
+        is_backward = pagination_body.offset_type in pagination.BACKWARD_OFFSET_TYPES
+        roots = pagination.add_pagination_to_query(
+            query=select(
+                models.Comment.id,
+                func.row_number()
+                .over(order_by=models.Comment.id.desc() if is_backward else models.Comment.id)
+                .label("position"),
+            ).where(condition),
+            sort_columns=(models.Comment.id,),
+            body=pagination_body,
+        ).cte("roots")
+        # the walk starts at the last level for the extra root, so its replies are not collected
+        threads = select(
+            roots.c.id,
+            roots.c.id.label("root_id"),
+            case((roots.c.position <= pagination_body.limit, 0), else_=replies_limit).label("depth"),
+        ).cte("threads", recursive=True)
+        replies = (
+            select(models.Comment.id)
+            .where(and_(models.Comment.article_id == article_id, models.Comment.parent_comment_id == threads.c.id))
+            .order_by(models.Comment.id)
+            .limit(replies_limit)
+            .lateral("replies")
+        )
+        threads = threads.union_all(
+            select(replies.c.id, threads.c.root_id, threads.c.depth + 1)
+            .select_from(threads.join(replies, true()))
+            .where(threads.c.depth < replies_limit)
+        )
+        ranked = select(
+            threads.c.id,
+            threads.c.root_id,
+            func.row_number().over(partition_by=threads.c.root_id, order_by=threads.c.id).label("rank"),
+        ).subquery("ranked")
         query = (
-            select(
-                models.Comment.__table__,
-                models.User.full_name.label("author"),
-                coalesce(
-                    func.sum(case((models.CommentLike.is_positive, 1), (~models.CommentLike.is_positive, -1), else_=0))
-                ).label("likes"),
-            )
-            .select_from(
-                models.Article.__table__.join(
-                    models.User.__table__,
-                    models.Comment.author_id == models.User.id,
-                ).join(models.CommentLike.__table__, models.CommentLike.comment_id == models.Comment.id, isouter=True)
+            self._get_comments_query()
+            .add_columns(
+                ranked.c.root_id,
+                select(func.count())
+                .select_from(models.Comment)
+                .where(condition)
+                .correlate(None)
+                .scalar_subquery()
+                .label("total"),
             )
-            .where(models.Comment.parent_comment_id == comment_id)
-        )
-        paginated_query = pagination.add_pagination_to_query(
-            query=query, id_column=models.Comment.id, body=pagination_body
+            .join(ranked, ranked.c.id == models.Comment.id)
+            # the first rank is the root itself
+            .where(ranked.c.rank <= replies_limit + 1)
+            .order_by(ranked.c.root_id, models.Comment.id)
         )
-        result = await session.execute(paginated_query)
-        items = result.mappings().all()
-        total_count = await self._get_rows_count_in(session=session, table=models.Comment)  # type: ignore
-        return schemas.CommentsWithCount(items=items, count=total_count)
+        rows = (await session.execute(query)).mappings().all()
+        if not rows:
+            return schemas.CommentThreadsWithCount(
+                items=[], count=await self._count_comments(session=session, condition=condition)
+            )
+
+        comments: dict[int, schemas.CommentThread] = {}
+        items: list[schemas.CommentThread] = []
+        for row in rows:
+            comment = comments[row["id"]] = schemas.CommentThread(**row)
+            if row["id"] == row["root_id"]:
+                items.append(comment)
+            else:
+                comments[row["parent_comment_id"]].replies.append(comment)
+        return schemas.CommentThreadsWithCount(items=items, count=rows[0]["total"])
 
     @staticmethod
     async def create_comment(
@@ -348,71 +530,99 @@ class ArticleDBRepository(BaseAsyncDBRepository):
             raise errors.ArticleCommentNotFoundError
         return author_id
 
-    @staticmethod
     async def like_comment(
+        self,
         session: AsyncSession,
         comment_id: int,
         user_id: int,
         is_positive: bool = True,
     ) -> bool:
-        comment_query = select(models.Comment).where(models.Comment.id == comment_id)
-        comment = (await session.execute(comment_query)).scalar()
-        if comment is None:
+        target = select(models.Comment.id).where(models.Comment.id == comment_id).cte("target")
+        found_id, _ = await self._set_like(
+            session=session,
+            target=target,
+            like_target_column=models.CommentLike.comment_id,
+            user_id=user_id,
+            is_positive=is_positive,
+            change_counter=self._change_comment_likes,
+        )
+        if found_id is None:
             raise errors.ArticleCommentNotFoundError
-
-        like = (
-            await session.execute(
-                select(models.CommentLike).where(
-                    and_(
-                        models.CommentLike.comment_id == comment.id,
-                        models.CommentLike.user_id == user_id,
-                    )
-                )
-            )
-        ).scalar_one_or_none()
-        if like is None:
-            like = models.CommentLike(comment_id=comment.id, user_id=user_id, is_positive=is_positive)
-        else:
-            like.is_positive = is_positive
-
-        session.add(like)
-        session.add(comment)
-        await session.flush()
         await session.commit()
+        return True
 
-    @staticmethod
     async def delete_comment_like(
+        self,
         session: AsyncSession,
         comment_id: int,
         user_id: int,
     ) -> bool:
-        comment_query = select(models.Comment).where(models.Comment.id == comment_id)
-        comment = (await session.execute(comment_query)).scalar()
-        if comment is None:
+        target = select(models.Comment.id).where(models.Comment.id == comment_id).cte("target")
+        found_id, _ = await self._unset_like(
+            session=session,
+            target=target,
+            like_target_column=models.CommentLike.comment_id,
+            user_id=user_id,
+            change_counter=self._change_comment_likes,
+        )
+        if found_id is None:
             raise errors.ArticleCommentNotFoundError
-
-        like = (
-            await session.execute(
-                select(models.CommentLike).where(
-                    and_(
-                        models.CommentLike.comment_id == comment.id,
-                        models.CommentLike.user_id == user_id,
-                    )
-                )
-            )
-        ).scalar_one_or_none()
-        if like is None:
-            return True
-
-        session.add(comment)
-        await session.delete(like)
-        await session.flush()
         await session.commit()
         return True
 
-    def _get_query(self, language: str) -> GenerativeSelect:
-        generic_articles = models.Article.__table__.alias("generic_articles")
+    async def get_comment_like_state(self, *, session: AsyncSession, comment_id: int, user_id: int) -> int:
+        found_id, state = await self._get_like_state(
+            session=session,
+            target=select(models.Comment.id).where(models.Comment.id == comment_id).cte("target"),
+            like_target_column=models.CommentLike.comment_id,
+            user_id=user_id,
+        )
+        if found_id is None:
+            raise errors.ArticleCommentNotFoundError
+        return state
+
+    async def apply_comment_likes(self, *, session: AsyncSession, states: dict[tuple[int, int], int]) -> dict[int, int]:
+        return await self._apply_like_states(
+            session=session,
+            target_column=models.Comment.id,
+            like_target_column=models.CommentLike.comment_id,
+            states=states,
+            change_counter=self._change_comment_likes,
+        )
 
+    async def _get_comments(
+        self, session: AsyncSession, condition: ColumnElement[bool], pagination_body: schemas.PaginationBody
+    ) -> schemas.CommentsWithCount:
+        query = pagination.add_pagination_to_query(
+            query=self._get_comments_query().where(condition), sort_columns=(models.Comment.id,), body=pagination_body
+        )
+        items = (await session.execute(query)).mappings().all()
+        total_count = await self._count_comments(session=session, condition=condition)
+        return schemas.CommentsWithCount(items=items, count=total_count)
+
+    @staticmethod
+    async def _count_comments(session: AsyncSession, condition: ColumnElement[bool]) -> int:
+        result: int = (
+            await session.execute(select(func.count()).select_from(models.Comment).where(condition))
+        ).scalar_one()
+        return result
+
+    @staticmethod
+    def _get_comments_query() -> Select[Any]:
+        """Select the comments with their authors and the amount of their direct replies."""
+        replies = models.Comment.__table__.alias("replies")
+        return select(
+            models.Comment.__table__,
+            models.User.username.label("author_username"),
+            models.User.full_name.label("author_full_name"),
+            select(func.count())
+            .select_from(replies)
+            .where(replies.c.parent_comment_id == models.Comment.id)
+            .scalar_subquery()
+            .label("replies_count"),
+        ).select_from(models.Comment.__table__.join(models.User.__table__, models.Comment.author_id == models.User.id))
+
+    def _get_query(self, language: str) -> GenerativeSelect:
         return (
             select(
                 models.Article.id,
@@ -422,45 +632,372 @@ class ArticleDBRepository(BaseAsyncDBRepository):
                 models.Article.created_at,
                 models.Article.cover_image,
                 models.User.full_name.label("author"),
-                func.array_remove(array_agg(aggregate_order_by(models.Tag.name, models.Tag.name.desc())), None).label(
-                    "tags"
-                ),
-                case(
-                    (
-                        generic_articles.c.language != None,  # noqa: E711
-                        func.json_build_object(generic_articles.c.language, generic_articles.c.slug),
-                    ),
-                    else_=None,
-                ).label("language_variants"),
-                coalesce(
-                    func.sum(case((models.ArticleLike.is_positive, 1), (~models.ArticleLike.is_positive, -1), else_=0))
-                ).label("likes"),
+                coalesce(models.ArticleSummary.tags, cast(postgresql.array([]), ARRAY(String))).label("tags"),
+                models.ArticleSummary.language_variants,
+                coalesce(models.ArticleSummary.likes, 0).label("likes"),
             )
             .select_from(
-                models.Article.__table__.join(
-                    models.ArticlesToTags.__table__.join(
-                        models.Tag, models.ArticlesToTags.__table__.c.tag_id == models.Tag.id
-                    ),
-                    models.Article.id == models.ArticlesToTags.__table__.c.article_id,
+                models.Article.__table__.join(models.User, models.User.id == models.Article.author_id).join(
+                    models.ArticleSummary.__table__,
+                    models.ArticleSummary.article_id == models.Article.id,
                     isouter=True,
                 )
-                .join(
-                    generic_articles,
-                    and_(
-                        generic_articles.c.generic_id == models.Article.generic_id,
-                        generic_articles.c.id != models.Article.id,
-                    ),
+            )
+            .where(models.Article.language == language)
+        )
+
+    @staticmethod
+    def _get_version_query(language: str) -> GenerativeSelect:
+        return (
+            select(
+                models.Article.id,
+                models.Article.created_at,
+                models.Article.updated_at,
+                models.ArticleSummary.version,
+                models.ArticleSummary.updated_at.label("summary_updated_at"),
+            )
+            .select_from(
+                models.Article.__table__.join(
+                    models.ArticleSummary.__table__,
+                    models.ArticleSummary.article_id == models.Article.id,
                     isouter=True,
                 )
-                .join(models.User, models.User.id == models.Article.author_id)
-                .join(models.ArticleLike.__table__, models.ArticleLike.article_id == models.Article.id, isouter=True)
             )
             .where(models.Article.language == language)
-            .group_by(
-                models.Article.id,
-                models.User.first_name,
-                models.User.last_name,
-                generic_articles.c.language,
-                generic_articles.c.slug,
+        )
+
+    @staticmethod
+    def _filter_published(
+        query: GenerativeSelect, pagination_body: schemas.PaginationBody | None, is_main: bool
+    ) -> GenerativeSelect:
+        query = query.where(models.Article.is_draft == False)  # noqa: E712
+        if pagination_body:
+            query = pagination.add_pagination_to_query(
+                query=query, sort_columns=(models.Article.created_at, models.Article.id), body=pagination_body
+            )
+        if is_main:
+            query = query.where(models.Article.is_main).limit(4).order_by(models.Article.created_at)
+        return query
+
+    @classmethod
+    def _get_summary_query(cls) -> Select[Any]:
+        """Aggregate the summary values of every article with correlated subqueries (no join fan-out)."""
+        generic_articles = models.Article.__table__.alias("generic_articles")
+        tags = (
+            select(models.Tag.name)
+            .join(models.ArticlesToTags, models.ArticlesToTags.tag_id == models.Tag.id)
+            .where(models.ArticlesToTags.article_id == models.Article.id)
+            .order_by(models.Tag.name.desc())
+            .scalar_subquery()
+        )
+        language_variants = (
+            select(func.jsonb_object_agg(generic_articles.c.language, generic_articles.c.slug))
+            .where(
+                and_(
+                    generic_articles.c.generic_id == models.Article.generic_id,
+                    generic_articles.c.id != models.Article.id,
+                )
+            )
+            .scalar_subquery()
+        )
+        likes = cls._count_likes(models.ArticleLike.article_id, models.Article.id)
+        return select(
+            models.Article.id,
+            func.array(tags, type_=ARRAY(String)),
+            language_variants,
+            likes,
+        )
+
+    @staticmethod
+    def _count_likes(
+        like_target_column: InstrumentedAttribute[int], target_id: InstrumentedAttribute[int]
+    ) -> ColumnElement[int]:
+        like_table = like_target_column.class_.__table__
+        return coalesce(
+            select(func.sum(case((like_table.c.is_positive, 1), else_=-1)))
+            .where(like_target_column == target_id)
+            .scalar_subquery(),
+            0,
+        )
+
+    @staticmethod
+    async def _get_tag_ids(*, session: AsyncSession, tags: list[str]) -> list[int]:
+        """Get ids of the tags by their names, creating the missing ones (two queries at most)."""
+        names = list(dict.fromkeys(tags))
+        if not names:
+            return []
+        created = (
+            await session.execute(
+                postgresql.insert(models.Tag)
+                .values([{"name": name} for name in names])
+                .on_conflict_do_nothing(index_elements=[models.Tag.name])
+                .returning(models.Tag.id, models.Tag.name)
+            )
+        ).all()
+        tag_ids = [tag.id for tag in created]
+        existing_names = set(names) - {tag.name for tag in created}
+        if existing_names:
+            tag_ids.extend(
+                (await session.execute(select(models.Tag.id).where(models.Tag.name.in_(existing_names)))).scalars()
+            )
+        return tag_ids
+
+    @staticmethod
+    async def _set_article_tags(
+        *, session: AsyncSession, article_id: int, tag_ids: list[int], replace: bool = False
+    ) -> None:
+        """Link the tags to the article with one multi-row insert, unlinking the other ones if `replace` is set."""
+        if replace:
+            await session.execute(
+                delete(models.ArticlesToTags).where(
+                    and_(models.ArticlesToTags.article_id == article_id, ~models.ArticlesToTags.tag_id.in_(tag_ids))
+                )
+            )
+        if tag_ids:
+            await session.execute(
+                postgresql.insert(models.ArticlesToTags)
+                .values([{"article_id": article_id, "tag_id": tag_id} for tag_id in tag_ids])
+                .on_conflict_do_nothing()
+            )
+
+    @staticmethod
+    async def _set_article_images(
+        *, session: AsyncSession, article_id: int, content_hashes: set[str], replace: bool = False
+    ) -> None:
+        """Record the images referenced by the article, forgetting the other ones if `replace` is set."""
+        if replace:
+            await session.execute(
+                delete(models.ArticlesToImages).where(
+                    and_(
+                        models.ArticlesToImages.article_id == article_id,
+                        ~models.ArticlesToImages.content_hash.in_(content_hashes),
+                    )
+                )
+            )
+        if content_hashes:
+            await session.execute(
+                postgresql.insert(models.ArticlesToImages)
+                .values([{"article_id": article_id, "content_hash": content_hash} for content_hash in content_hashes])
+                .on_conflict_do_nothing()
+            )
+
+    @staticmethod
+    async def _get_count(*, session: AsyncSession, language: enums.LanguageType, is_draft: bool | None = None) -> int:
+        query = select(coalesce(func.sum(models.ArticleCounter.count), 0)).where(
+            models.ArticleCounter.language == language
+        )
+        if is_draft is not None:
+            query = query.where(models.ArticleCounter.is_draft == is_draft)
+        result: int = (await session.execute(query)).scalar_one()
+        return result
+
+    @staticmethod
+    async def _change_counter(
+        *, session: AsyncSession, language: enums.LanguageType, is_draft: bool, delta: int
+    ) -> None:
+        statement = postgresql.insert(models.ArticleCounter).values(language=language, is_draft=is_draft, count=delta)
+        statement = statement.on_conflict_do_update(
+            index_elements=[models.ArticleCounter.language, models.ArticleCounter.is_draft],
+            set_={"count": models.ArticleCounter.count + statement.excluded.count},
+        )
+        await session.execute(statement)
+
+    async def _set_like(
+        self,
+        *,
+        session: AsyncSession,
+        target: CTE,
+        like_target_column: InstrumentedAttribute[int],
+        user_id: int,
+        is_positive: bool,
+        change_counter: Callable[[CTE], Update],
+    ) -> tuple[int | None, int | None]:
+        """Upsert the like and change the likes counter of the target by the delta in one round trip.
+
+        The delta is ±1 for a new like and ±2 for a flipped one, a repeated like changes nothing.
+
+        :return: id of the target (`None` if there is no such target) and its likes counter
+        """
+        like_table = like_target_column.class_.__table__
+        now = utils.get_current_timestamp()
+        sign = 1 if is_positive else -1
+        statement = postgresql.insert(like_table).from_select(
+            [like_target_column.key, "user_id", "is_positive", "created_at"],
+            select(target.c.id, literal(user_id), literal(is_positive), literal(now)),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[like_table.c.user_id, like_target_column],
+            set_={"is_positive": statement.excluded.is_positive, "updated_at": now},
+            where=like_table.c.is_positive.is_distinct_from(statement.excluded.is_positive),
+        )
+        # `xmax` of the row is 0 if it is inserted by the statement and not updated
+        changes = statement.returning(
+            like_target_column.label("target_id"),
+            case((literal_column("xmax = 0"), sign), else_=2 * sign).label("delta"),
+        ).cte("changes")
+        return await self._apply_like_changes(
+            session=session, target=target, changes=changes, change_counter=change_counter
+        )
+
+    async def _unset_like(
+        self,
+        *,
+        session: AsyncSession,
+        target: CTE,
+        like_target_column: InstrumentedAttribute[int],
+        user_id: int,
+        change_counter: Callable[[CTE], Update],
+    ) -> tuple[int | None, int | None]:
+        """Delete the like and change the likes counter of the target back in one round trip."""
+        like_table = like_target_column.class_.__table__
+        changes = (
+            delete(like_table)
+            .where(and_(like_target_column == target.c.id, like_table.c.user_id == user_id))
+            .returning(
+                like_target_column.label("target_id"),
+                case((like_table.c.is_positive, -1), else_=1).label("delta"),
             )
+            .cte("changes")
+        )
+        return await self._apply_like_changes(
+            session=session, target=target, changes=changes, change_counter=change_counter
+        )
+
+    @staticmethod
+    async def _apply_like_changes(
+        *, session: AsyncSession, target: CTE, changes: CTE, change_counter: Callable[[CTE], Update]
+    ) -> tuple[int | None, int | None]:
+        counter = change_counter(changes).cte("counter")
+        result = (
+            await session.execute(
+                select(
+                    select(target.c.id).scalar_subquery().label("target_id"),
+                    select(counter.c.likes).scalar_subquery().label("likes"),
+                )
+            )
+        ).one()
+        return result.target_id, result.likes
+
+    @staticmethod
+    async def _get_like_state(
+        *, session: AsyncSession, target: CTE, like_target_column: InstrumentedAttribute[int], user_id: int
+    ) -> tuple[int | None, int]:
+        like_table = like_target_column.class_.__table__
+        state = (
+            select(case((like_table.c.is_positive, 1), else_=-1))
+            .where(and_(like_target_column == target.c.id, like_table.c.user_id == user_id))
+            .scalar_subquery()
+        )
+        result = (
+            await session.execute(
+                select(select(target.c.id).scalar_subquery().label("target_id"), coalesce(state, 0).label("state"))
+            )
+        ).one()
+        return result.target_id, result.state
+
+    @staticmethod
+    async def _apply_like_states(
+        *,
+        session: AsyncSession,
+        target_column: InstrumentedAttribute[int],
+        like_target_column: InstrumentedAttribute[int],
+        states: dict[tuple[int, int], int],
+        change_counter: Callable[[CTE], Update],
+    ) -> dict[int, int]:
+        """Store the like states of `(target id, user id)` in bulk, the state 0 deletes the like.
+
+        The likes counters are changed by the difference with the stored states,
+        so applying the same states again changes nothing.
+
+        :return: changes of the likes counters of the targets
+        """
+        like_table = like_target_column.class_.__table__
+        like_key = tuple_(like_target_column, like_table.c.user_id)
+        target_ids = set(
+            (
+                await session.execute(select(target_column).where(target_column.in_({key[0] for key in states})))
+            ).scalars()
+        )
+        # the likes of the deleted targets are dropped
+        states = {key: state for key, state in states.items() if key[0] in target_ids}
+        if not states:
+            return {}
+        stored = {
+            (target_id, user_id): 1 if is_positive else -1
+            for target_id, user_id, is_positive in await session.execute(
+                select(like_target_column, like_table.c.user_id, like_table.c.is_positive)
+                .where(like_key.in_(list(states)))
+                .with_for_update()
+            )
+        }
+
+        deleted = [key for key, state in states.items() if state == 0 and key in stored]
+        if deleted:
+            await session.execute(delete(like_table).where(like_key.in_(deleted)))
+        now = utils.get_current_timestamp()
+        upserted = [
+            {like_target_column.key: target_id, "user_id": user_id, "is_positive": state > 0, "created_at": now}
+            for (target_id, user_id), state in states.items()
+            if state != 0 and stored.get((target_id, user_id)) != state
+        ]
+        if upserted:
+            statement = postgresql.insert(like_table).values(upserted)
+            statement = statement.on_conflict_do_update(
+                index_elements=[like_table.c.user_id, like_target_column],
+                set_={"is_positive": statement.excluded.is_positive, "updated_at": now},
+            )
+            await session.execute(statement)
+
+        deltas: dict[int, int] = {}
+        for (target_id, user_id), state in states.items():
+            deltas[target_id] = deltas.get(target_id, 0) + state - stored.get((target_id, user_id), 0)
+        rows = [(target_id, delta) for target_id, delta in deltas.items() if delta]
+        if rows:
+            changes = values(column("target_id", Integer), column("delta", Integer), name="deltas").data(rows)
+            await session.execute(change_counter(select(changes).cte("changes")))
+        return dict(rows)
+
+    @staticmethod
+    def _change_article_likes(changes: CTE) -> Update:
+        # the summary version is increased, so the cached article is revalidated
+        return (
+            update(models.ArticleSummary)
+            .where(models.ArticleSummary.article_id == changes.c.target_id)
+            .values(
+                likes=models.ArticleSummary.likes + changes.c.delta,
+                version=models.ArticleSummary.version + 1,
+                updated_at=utils.get_current_timestamp(),
+            )
+            .returning(models.ArticleSummary.likes)
+        )
+
+    @staticmethod
+    def _change_comment_likes(changes: CTE) -> Update:
+        # the like is not an edit of the comment, so `updated_at` is kept
+        return (
+            update(models.Comment)
+            .where(models.Comment.id == changes.c.target_id)
+            .values(likes=models.Comment.likes + changes.c.delta, updated_at=models.Comment.updated_at)
+            .returning(models.Comment.likes)
+        )
+
+    async def _refresh_summaries(self, *, session: AsyncSession, condition: ColumnElement[bool] | None = None) -> None:
+        """Recalculate the summaries of the articles matching the condition (all articles if it is not provided)."""
+        query = self._get_summary_query().add_columns(literal(1), literal(utils.get_current_timestamp()))
+        if condition is not None:
+            query = query.where(condition)
+        statement = postgresql.insert(models.ArticleSummary).from_select(
+            ["article_id", "tags", "language_variants", "likes", "version", "updated_at"], query
+        )
+        # the likes of an existing summary are changed only by the likes, the recount of a snapshot could
+        # overwrite a like committed meanwhile; `reconcile_like_counters` corrects them
+        statement = statement.on_conflict_do_update(
+            index_elements=[models.ArticleSummary.article_id],
+            set_={
+                "tags": statement.excluded.tags,
+                "language_variants": statement.excluded.language_variants,
+                "version": models.ArticleSummary.version + 1,
+                "updated_at": statement.excluded.updated_at,
+            },
         )
+        await session.execute(statement)
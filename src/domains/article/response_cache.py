@@ -0,0 +1,204 @@
+import asyncio
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Iterable, Mapping, TypeVar
+from urllib.parse import urlencode
+
+from pydantic import BaseModel as PydanticBaseModel
+from redis import asyncio as aioredis
+from starlette import status
+from starlette.responses import Response
+
+from src.core.base.repository import BaseRedisRepository
+from src.lib import utils
+
+ResultType = TypeVar("ResultType", bound=PydanticBaseModel)
+# `ETag` and `Last-Modified` timestamp of the response
+Validators = tuple[str, int | None]
+
+
+class ArticleResponseCache(BaseRedisRepository):
+    """Redis cache of the serialized responses of the public article endpoints.
+
+    Every entry keeps the versions of its tags (e.g. `article:<slug>`) it was built with,
+    invalidating a tag increases its version, so the entries built before are not served anymore.
+    The tags of the items (e.g. of a list) are known after the build only, so such an entry is not stored
+    if any tag was invalidated during the build, its items may be older than their versions read after.
+    The concurrent misses of a key are coalesced: in the worker by awaiting the same build,
+    between the workers by a short Redis lock, so an expired popular page is built once.
+    """
+
+    prefix = "article-cache"
+
+    def __init__(self, connection_pool: aioredis.ConnectionPool, ttl: int, lock_timeout: float) -> None:
+        super().__init__(connection_pool=connection_pool)
+        self._ttl = ttl
+        self._lock_timeout = lock_timeout
+        self._pending: dict[str, asyncio.Future[dict[str, str] | None]] = {}
+
+    def make_key(self, route: str, language: str, params: dict[str, Any] | None = None) -> str:
+        """Build the key of the route response, the params are sorted and the unset ones are dropped."""
+        query = urlencode(sorted((name, str(value)) for name, value in (params or {}).items() if value is not None))
+        return f"{self.prefix}:response:{route}:{language}:{query}"
+
+    def _get_tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def _get_sequence_key(self) -> str:
+        """Key of the counter of the invalidations of all the tags."""
+        return f"{self.prefix}:tag-sequence"
+
+    async def get_or_create(
+        self,
+        *,
+        key: str,
+        tags: list[str],
+        create: Callable[[], Awaitable[ResultType]],
+        get_item_tags: Callable[[ResultType], Iterable[str]] | None = None,
+        get_validators: Callable[[], Awaitable[Validators | None]] | None = None,
+        request_headers: Mapping[str, str] | None = None,
+    ) -> Response:
+        """Get the cached response or build it with `create` and cache it.
+
+        The conditional requests are answered with 304 by the validators (`ETag`, `Last-Modified`) of the cached
+        entry, or by the ones of `get_validators` if there is no entry, so the response is not built.
+        If the caching is disabled (`ttl <= 0`), the validators are looked up only for the conditional requests.
+
+        :param tags: tags of the response known before it is built
+        :param get_item_tags: tags of the items of the built response
+        :param get_validators: lightweight lookup of the validators of the response, `None` if there are none
+        """
+        request_headers = request_headers or {}
+        is_conditional = "if-none-match" in request_headers or "if-modified-since" in request_headers
+        if self._ttl <= 0:
+            # nothing is cached, so the validators are looked up only to answer a conditional request
+            validators = await get_validators() if is_conditional and get_validators is not None else None
+            if is_conditional and validators is not None and utils.is_not_modified(request_headers, *validators):
+                return self._respond(entry=self._make_entry(body="", validators=validators), headers=request_headers)
+            body = (await create()).model_dump_json()
+            return self._respond(
+                entry=self._make_entry(body=body, validators=validators), headers=request_headers, is_hit=False
+            )
+
+        async with self.create_session() as session:
+            entry = await self._get(session=session, key=key)
+            if entry is not None:
+                return self._respond(entry=entry, headers=request_headers)
+
+            if is_conditional and get_validators is not None:
+                validators = await get_validators()
+                if validators is not None and utils.is_not_modified(request_headers, *validators):
+                    return self._respond(
+                        entry=self._make_entry(body="", validators=validators), headers=request_headers
+                    )
+
+            pending = self._pending.get(key)
+            if pending is not None:
+                entry = await asyncio.shield(pending)
+                if entry is not None:
+                    return self._respond(entry=entry, headers=request_headers)
+                # the build awaited has failed, the error is raised by the own build
+                entry = await self._create(session, key, tags, create, get_item_tags, get_validators)
+                return self._respond(entry=entry, headers=request_headers, is_hit=False)
+
+            future: asyncio.Future[dict[str, str] | None] = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            try:
+                entry = await self._create_locked(session, key, tags, create, get_item_tags, get_validators)
+            finally:
+                future.set_result(entry)
+                del self._pending[key]
+            return self._respond(entry=entry, headers=request_headers, is_hit=False)
+
+    async def invalidate(self, *tags: str) -> None:
+        async with self.create_session() as session, session.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(self._get_tag_key(tag))
+            pipe.incr(self._get_sequence_key())
+            await pipe.execute()
+
+    @staticmethod
+    def _make_entry(body: str, validators: Validators | None) -> dict[str, str]:
+        etag, last_modified = validators or ("", None)
+        return {"body": body, "etag": etag or "", "last_modified": str(last_modified or "")}
+
+    @staticmethod
+    def _respond(entry: dict[str, str], headers: Mapping[str, str], is_hit: bool = True) -> Response:
+        etag = entry.get("etag") or None
+        last_modified = int(entry["last_modified"]) if entry.get("last_modified") else None
+        response_headers = {"X-Cache": "HIT" if is_hit else "MISS", "Vary": "Accept-Language"}
+        if etag is not None:
+            response_headers["ETag"] = etag
+        if last_modified is not None:
+            response_headers["Last-Modified"] = utils.format_http_date(last_modified)
+        if utils.is_not_modified(headers, etag=etag, last_modified=last_modified):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=response_headers)
+        return Response(content=entry["body"], media_type="application/json", headers=response_headers)
+
+    async def _get_tag_versions(self, session: "aioredis.Redis[Any]", tags: list[str]) -> dict[str, int]:
+        if not tags:
+            return {}
+        versions = await session.mget([self._get_tag_key(tag) for tag in tags])
+        return {tag: int(version or 0) for tag, version in zip(tags, versions)}
+
+    async def _get(self, session: "aioredis.Redis[Any]", key: str) -> dict[str, str] | None:
+        entry: dict[str, str] = await session.hgetall(key)
+        if not entry:
+            return None
+        versions: dict[str, int] = json.loads(entry.pop("tags"))
+        if await self._get_tag_versions(session=session, tags=list(versions)) != versions:
+            return None
+        return entry
+
+    async def _create_locked(
+        self,
+        session: "aioredis.Redis[Any]",
+        key: str,
+        tags: list[str],
+        create: Callable[[], Awaitable[ResultType]],
+        get_item_tags: Callable[[ResultType], Iterable[str]] | None,
+        get_validators: Callable[[], Awaitable[Validators | None]] | None,
+    ) -> dict[str, str]:
+        """Build the response once between the workers, the others wait for it until the lock expires."""
+        lock_key, token = f"{key}:lock", str(uuid.uuid4())
+        if not await session.set(lock_key, token, nx=True, px=int(self._lock_timeout * 1000)):
+            deadline = asyncio.get_running_loop().time() + self._lock_timeout
+            while asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(0.05)
+                entry = await self._get(session=session, key=key)
+                if entry is not None:
+                    return entry
+            return await self._create(session, key, tags, create, get_item_tags, get_validators)
+        try:
+            return await self._create(session, key, tags, create, get_item_tags, get_validators)
+        finally:
+            # the lock may have expired and been taken by another worker meanwhile
+            if await session.get(lock_key) == token:
+                await session.delete(lock_key)
+
+    async def _create(
+        self,
+        session: "aioredis.Redis[Any]",
+        key: str,
+        tags: list[str],
+        create: Callable[[], Awaitable[ResultType]],
+        get_item_tags: Callable[[ResultType], Iterable[str]] | None,
+        get_validators: Callable[[], Awaitable[Validators | None]] | None,
+    ) -> dict[str, str]:
+        # the versions and validators are read before the build, so a write during the build is not missed
+        sequence = await session.get(self._get_sequence_key())
+        versions = await self._get_tag_versions(session=session, tags=tags)
+        validators = await get_validators() if get_validators is not None else None
+        result = await create()
+        entry = self._make_entry(body=result.model_dump_json(), validators=validators)
+        if get_item_tags is not None:
+            item_tags = [tag for tag in dict.fromkeys(get_item_tags(result)) if tag not in versions]
+            versions.update(await self._get_tag_versions(session=session, tags=item_tags))
+            # the item versions read after the build match the built items only if no tag was invalidated since
+            if await session.get(self._get_sequence_key()) != sequence:
+                return entry
+        async with session.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={**entry, "tags": json.dumps(versions)})
+            pipe.expire(key, self._ttl)
+            await pipe.execute()
+        return entry
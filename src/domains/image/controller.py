@@ -1,55 +1,190 @@
-import os
-import tempfile
-from typing import Annotated
+import hashlib
+from typing import Annotated, AsyncIterator
 
-from fastapi import File, Form, Query, UploadFile
-from slugify import slugify
+from fastapi import BackgroundTasks, File, Form, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.celery_app.celery import celery_app
+from src.core.config import MainSettings
 from src.lib import errors, providers, schemas, utils
 
-from .repository import ImageS3Repository
+from .repository import ImageDBRepository, ImageS3Repository
+
+IMAGE_EXTENSIONS = {"image/png": "png", "image/jpeg": "jpeg", "image/webp": "webp"}
+# the upload is spooled by starlette, it is read by chunks to stream it without loading it into memory
+READ_CHUNK_SIZE = 64 * 1024
+# amount of the images deleted in one transaction by the garbage collection
+GC_BATCH_SIZE = 100
 
 
 class ImageController:
-    def __init__(self, s3_repo: ImageS3Repository) -> None:
+    def __init__(self, s3_repo: ImageS3Repository, db_repo: ImageDBRepository) -> None:
         self._s3_repo = s3_repo
+        self._db_repo = db_repo
+
+    @staticmethod
+    def _get_bucket(settings: MainSettings) -> schemas.S3Bucket:
+        return schemas.S3Bucket(
+            name=settings.s3.bucket, endpoint=settings.s3.endpoint, replace_domain=settings.s3.replace_domain
+        )
+
+    def _make_response(
+        self, tag: str, bucket: schemas.S3Bucket, derivatives: dict[str, str] | None = None
+    ) -> schemas.ImageResponse:
+        """Build the URLs of the image and of its stored derivatives, the ones not stored yet are not returned."""
+        derivatives = derivatives or {}
+        return schemas.ImageResponse(
+            tag=tag,
+            url=self._s3_repo.get_instance_url(object_name=tag, bucket=bucket),
+            derivatives={
+                descriptor: self._s3_repo.get_instance_url(object_name=name, bucket=bucket)
+                for descriptor, name in derivatives.items()
+            },
+        )
+
+    async def _get_derivatives(self, tags: list[str]) -> dict[str, dict[str, str]]:
+        session: AsyncSession
+        async with self._db_repo.get_session() as session:
+            return await self._db_repo.get_derivatives(session=session, object_names=tags)
 
     async def get_file(
         self,
         tag: Annotated[str, Query()],
         settings: providers.MainSettingsRequired,
     ) -> schemas.ImageResponse:
-        url = self._s3_repo.get_instance_url(
-            object_name=tag,
-            bucket=schemas.S3Bucket(
-                name=settings.s3.bucket, endpoint=settings.s3.endpoint, replace_domain=settings.s3.replace_domain
-            ),
+        derivatives = await self._get_derivatives(tags=[tag])
+        return self._make_response(tag=tag, bucket=self._get_bucket(settings), derivatives=derivatives.get(tag))
+
+    async def get_files(
+        self,
+        body: schemas.ImageBatchRequest,
+        settings: providers.MainSettingsRequired,
+    ) -> schemas.ImageBatchResponse:
+        """Get the URLs of many images at once, e.g. of a gallery, the repeated tags are returned once."""
+        bucket = self._get_bucket(settings)
+        tags = list(dict.fromkeys(body.tags))
+        derivatives = await self._get_derivatives(tags=tags)
+        return schemas.ImageBatchResponse(
+            images=[self._make_response(tag=tag, bucket=bucket, derivatives=derivatives.get(tag)) for tag in tags]
         )
-        if url is None:
-            raise errors.ImageNotFoundError()
-        return schemas.ImageResponse(tag=tag, url=url)
 
     async def upload_file_endpoint(
         self,
         file: Annotated[UploadFile, File()],
         folder: Annotated[str, Form()],
+        background_tasks: BackgroundTasks,
         settings: providers.MainSettingsRequired,
     ) -> schemas.ImageResponse:
-        types = {"image/png": "png", "image/jpeg": "jpeg", "image/webp": "webp"}
+        max_size = settings.s3.max_upload_size
+        if file.size is not None and file.size > max_size:
+            raise errors.ImageTooLargeError()
 
-        if file.content_type not in types.keys():
+        # the declared content type is not trusted, the format is detected by the content
+        header = await file.read(READ_CHUNK_SIZE)
+        content_type = utils.sniff_image_type(header[: utils.IMAGE_HEADER_SIZE])
+        if content_type is None:
             raise errors.NotSupportedImageMimeTypeError()
 
-        tmp = tempfile.NamedTemporaryFile(suffix="." + types[file.content_type])
-        name, extension = os.path.basename(file.filename).split(".")
-        image_name = f"{folder}/{slugify(f'{name} {utils.get_current_datetime()}')}.{extension}"
-        content = await file.read()
-        tmp.write(content)
-        bucket = schemas.S3Bucket(
-            name=settings.s3.bucket, endpoint=settings.s3.endpoint, replace_domain=settings.s3.replace_domain
+        # the images are named by the content, so a repeated upload returns the image uploaded before
+        content_hash, size = await self._hash_file(file=file, header=header, max_size=max_size)
+        bucket = self._get_bucket(settings)
+        session: AsyncSession
+        async with self._db_repo.get_session() as session, session.begin():
+            image = await self._db_repo.use(session=session, content_hash=content_hash)
+        if image is not None:
+            return self._make_response(tag=image.object_name, bucket=bucket, derivatives=image.derivatives)
+
+        image_name = f"{folder}/{content_hash}.{IMAGE_EXTENSIONS[content_type]}"
+        await file.seek(0)
+        is_uploaded = await self._s3_repo.upload_stream(
+            chunks=self._read_chunks(file=file),
+            bucket=bucket,
+            object_name=image_name,
+            content_type=content_type,
         )
-        self._s3_repo.upload_file(file_name=tmp.name, bucket=bucket, object_name=image_name)
-        url = self._s3_repo.get_instance_url(bucket=bucket, object_name=image_name)
-        if url is None:
-            raise errors.ImageNotFoundError()
-        return schemas.ImageResponse(tag=image_name, url=url)
+        if not is_uploaded:
+            raise errors.ImageUploadError()
+        async with self._db_repo.get_session() as session, session.begin():
+            image = await self._db_repo.create(
+                session=session,
+                item=schemas.ImageObject(
+                    content_hash=content_hash, object_name=image_name, content_type=content_type, size=size
+                ),
+            )
+        if image.object_name != image_name:
+            # a concurrent upload of the same content to another folder is indexed, its object is returned instead
+            await self._s3_repo.delete_objects(bucket=bucket, object_names=[image_name])
+        elif not settings.environment.is_testing:
+            # the task is sent after the response, the background tasks run the sync calls in the thread pool
+            background_tasks.add_task(
+                celery_app.send_task, "images.generate_derivatives", kwargs={"object_name": image_name}
+            )
+        return self._make_response(tag=image.object_name, bucket=bucket, derivatives=image.derivatives)
+
+    async def collect_garbage(self, *, settings: MainSettings, grace_period: int, dry_run: bool = False) -> list[str]:
+        """Delete the uploaded images not used by any article and their derivatives.
+
+        :param grace_period: seconds since the last upload of an image it is kept for, e.g. while the article is edited
+        :param dry_run: only find the images
+        :return: names of the deleted images
+        """
+        used_before = utils.get_current_timestamp() - grace_period
+        session: AsyncSession
+        if dry_run:
+            async with self._db_repo.get_session() as session:
+                images = await self._db_repo.get_unreferenced(session=session, used_before=used_before)
+            return [image.object_name for image in images]
+
+        bucket = self._get_bucket(settings)
+        collected: list[str] = []
+        while True:
+            # the objects are deleted while the images are locked, so a concurrent upload of one uploads it again
+            async with self._db_repo.get_session() as session, session.begin():
+                images = await self._db_repo.get_unreferenced(
+                    session=session, used_before=used_before, limit=GC_BATCH_SIZE, lock=True
+                )
+                failed = await self._s3_repo.delete_objects(
+                    bucket=bucket,
+                    # the derivatives stored by a task failed before recording them have the names of the settings
+                    object_names=[
+                        name
+                        for image in images
+                        for name in dict.fromkeys(
+                            (
+                                image.object_name,
+                                *image.derivatives.values(),
+                                *utils.get_derivative_names(
+                                    image.object_name,
+                                    widths=settings.image.derivative_widths,
+                                    image_format=settings.image.derivative_format,
+                                    thumbnail_size=settings.image.thumbnail_size,
+                                ).values(),
+                            )
+                        )
+                    ],
+                )
+                # a derivative not deleted is not referenced by anything anyway
+                deleted = [image for image in images if image.object_name not in failed]
+                await self._db_repo.delete(session=session, content_hashes=[image.content_hash for image in deleted])
+            collected.extend(image.object_name for image in deleted)
+            if len(images) < GC_BATCH_SIZE or not deleted:
+                return collected
+
+    @staticmethod
+    async def _hash_file(file: UploadFile, header: bytes, max_size: int) -> tuple[str, int]:
+        """Hash the upload by chunks, the size is checked while reading, as the declared one may be missing."""
+        content_hash = hashlib.sha256()
+        size = 0
+        chunk = header
+        while chunk:
+            size += len(chunk)
+            if size > max_size:
+                raise errors.ImageTooLargeError()
+            content_hash.update(chunk)
+            chunk = await file.read(READ_CHUNK_SIZE)
+        return content_hash.hexdigest(), size
+
+    @staticmethod
+    async def _read_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+        while chunk := await file.read(READ_CHUNK_SIZE):
+            yield chunk
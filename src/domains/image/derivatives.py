@@ -0,0 +1,69 @@
+import io
+import math
+
+from PIL import Image, ImageCms, ImageOps
+
+_MIME_TYPES = {"webp": "image/webp"}
+_SRGB_PROFILE = ImageCms.createProfile("sRGB")
+
+
+def get_mime_type(image_format: str) -> str:
+    return _MIME_TYPES[image_format]
+
+
+def create_derivatives(
+    content: bytes, *, widths: list[int], image_format: str, quality: int, thumbnail_size: int
+) -> dict[str, tuple[str, bytes]]:
+    """Create the resized copies of the image by the descriptors of `utils.get_derivative_names`.
+
+    The copies are not upscaled, so the widths not smaller than the original share one copy of the original size,
+    it is returned for the smallest of them. Every copy is returned with its actual srcset descriptor.
+    The metadata (EXIF, ICC profile, comments) is dropped, the EXIF orientation is applied before that.
+    """
+    with Image.open(io.BytesIO(content)) as original:
+        # a JPEG is decoded at the smallest scale still covering the largest derivative in any orientation
+        scale = max(widths + [thumbnail_size]) / min(original.size)
+        if scale < 1:
+            original.draft("RGB", (math.ceil(original.width * scale), math.ceil(original.height * scale)))
+        # `None` is returned only for the transposition in place
+        image = ImageOps.exif_transpose(original) or original
+    image = _to_srgb(image)
+    # the copies inherit the info, e.g. the ICC profile, of the image they are made from
+    image.info.clear()
+
+    derivatives: dict[str, tuple[str, bytes]] = {}
+    for width in sorted(widths):
+        if width >= image.width:
+            derivatives[f"{width}w"] = (f"{image.width}w", _encode(image, image_format, quality))
+            break
+        resized = image.resize(
+            (width, round(image.height * width / image.width)), Image.Resampling.LANCZOS, reducing_gap=3.0
+        )
+        derivatives[f"{width}w"] = (f"{width}w", _encode(resized, image_format, quality))
+    if thumbnail_size > 0:
+        thumbnail = ImageOps.fit(image, (thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+        derivatives["thumbnail"] = ("thumbnail", _encode(thumbnail, image_format, quality))
+    return derivatives
+
+
+def _to_srgb(image: Image.Image) -> Image.Image:
+    """Convert the image to sRGB by its ICC profile, so it looks the same without the profile."""
+    mode = "RGBA" if image.has_transparency_data else "RGB"
+    icc_profile = image.info.get("icc_profile")
+    if icc_profile:
+        try:
+            converted = ImageCms.profileToProfile(
+                image, ImageCms.ImageCmsProfile(io.BytesIO(icc_profile)), _SRGB_PROFILE, outputMode=mode
+            )
+        except ImageCms.PyCMSError:
+            converted = None
+        if converted is not None:
+            return converted
+    return image.convert(mode)
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    output = io.BytesIO()
+    # the image is built from the pixels only, so no metadata is written
+    image.save(output, format=image_format.upper(), quality=quality)
+    return output.getvalue()
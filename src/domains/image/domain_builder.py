@@ -1,9 +1,10 @@
 from dataclasses import dataclass
 
-from botocore.client import BaseClient as S3Client
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.core.persistence import AsyncS3Client, S3UrlSigner
 from src.domains.image.controller import ImageController
-from src.domains.image.repository import ImageS3Repository
+from src.domains.image.repository import ImageDBRepository, ImageS3Repository
 
 
 @dataclass(frozen=True)
@@ -11,7 +12,22 @@ class ImageDomain:
     controller: ImageController
 
 
-def create_image_domain(*, s3_client: S3Client) -> ImageDomain:
-    s3_repo = ImageS3Repository(session=s3_client)
-    controller = ImageController(s3_repo=s3_repo)
+def create_image_domain(
+    *,
+    pg_session_manager: async_sessionmaker[AsyncSession],
+    s3_client: AsyncS3Client,
+    s3_url_signer: S3UrlSigner,
+    url_expiration: int = 3600,
+    url_refresh_margin: int = 300,
+    url_cache_size: int = 10000,
+) -> ImageDomain:
+    s3_repo = ImageS3Repository(
+        client=s3_client,
+        signer=s3_url_signer,
+        url_expiration=url_expiration,
+        url_refresh_margin=url_refresh_margin,
+        url_cache_size=url_cache_size,
+    )
+    db_repo = ImageDBRepository(session_manager=pg_session_manager)
+    controller = ImageController(s3_repo=s3_repo, db_repo=db_repo)
     return ImageDomain(controller=controller)
@@ -1,46 +1,184 @@
 import logging
-import os
+import time
+from collections import OrderedDict
+from typing import AsyncIterable
 
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.domains.base.repository import BaseS3Repository
-from src.lib import schemas
+from src.core.base.repository import BaseAsyncDBRepository, BaseS3Repository
+from src.core.persistence import AsyncS3Client, S3UrlSigner
+from src.lib import models, schemas, utils
 
 logger = logging.getLogger(__name__)
 
+# S3 deletes up to 1000 objects per request
+DELETE_BATCH_SIZE = 1000
 
-class ImageS3Repository(BaseS3Repository, abc.ABC):
-    def get_instance_url(self, *, bucket: schemas.S3Bucket, object_name: str, expiration: int = 3600) -> str | None:
-        """Generate a pre-signed URL to share an S3 object
 
-        :param bucket: string
-        :param object_name: string
-        :param expiration: Time in seconds for the presigned URL to remain valid
-        :return: Pre-signed URL as string. If error, returns None.
+class ImageS3Repository(BaseS3Repository):
+    """S3 storage of the images.
+
+    The pre-signed URLs are signed locally and cached per object until shortly before they expire,
+    so the repeated requests of an image get the same URL, which is cacheable by the browsers.
+    """
+
+    def __init__(
+        self,
+        client: AsyncS3Client,
+        signer: S3UrlSigner,
+        url_expiration: int = 3600,
+        url_refresh_margin: int = 300,
+        url_cache_size: int = 10000,
+    ) -> None:
+        super().__init__(client=client)
+        self._signer = signer
+        self._url_expiration = url_expiration
+        self._url_refresh_margin = min(url_refresh_margin, url_expiration)
+        self._url_cache_size = url_cache_size
+        # the wall clock is used, as the URLs expire by it
+        self._urls: OrderedDict[tuple[str, str | None, str], tuple[float, str]] = OrderedDict()
+
+    def get_instance_url(self, *, bucket: schemas.S3Bucket, object_name: str) -> str:
+        """Get a pre-signed URL to share an S3 object
+
+        :param bucket: Bucket of the object
+        :param object_name: S3 object name
+        :return: Pre-signed URL valid for at least `url_refresh_margin` seconds
         """
-        try:
-            response = self._session.generate_presigned_url(  # type: ignore
-                "get_object", Params={"Bucket": bucket.name, "Key": object_name}, ExpiresIn=expiration
-            )
-        except ClientError as e:
-            logger.error(e)
-            return None
+        key = (bucket.name, bucket.replace_domain, object_name)
+        entry = self._urls.get(key)
+        now = time.time()
+        if entry is not None and entry[0] > now:
+            self._urls.move_to_end(key)
+            return entry[1]
 
-        return bucket.make_presigned_url(instance_url=response)
+        url = bucket.make_presigned_url(
+            instance_url=self._signer.presign_get(bucket=bucket.name, key=object_name, expiration=self._url_expiration)
+        )
+        if self._url_cache_size > 0:
+            self._urls[key] = (now + self._url_expiration - self._url_refresh_margin, url)
+            self._urls.move_to_end(key)
+            while len(self._urls) > self._url_cache_size:
+                self._urls.popitem(last=False)
+        return url
 
-    def upload_file(self, file_name: str, bucket: schemas.S3Bucket, object_name: str | None = None) -> bool:
-        """Upload a file to an S3 bucket
+    async def upload_stream(
+        self, chunks: AsyncIterable[bytes], bucket: schemas.S3Bucket, object_name: str, content_type: str
+    ) -> bool:
+        """Upload a stream of chunks to an S3 bucket in parts
 
-        :param file_name: File to upload
+        :param chunks: Content of the file, the errors raised by the stream are propagated
         :param bucket: Bucket to upload to
-        :param object_name: S3 object name. If not specified then file_name is used
+        :param object_name: S3 object name
+        :param content_type: MIME type the object is served with
         :return: True if file was uploaded, else False
         """
-        if object_name is None:
-            object_name = os.path.basename(file_name)
         try:
-            self._session.upload_file(file_name, bucket.name, object_name, {"ACL": "public-read"})  # type: ignore
-        except ClientError as e:
+            await self._client.upload_stream(
+                chunks,
+                bucket=bucket.name,
+                key=object_name,
+                extra_args={"ACL": "public-read", "ContentType": content_type},
+            )
+        except (BotoCoreError, ClientError) as e:
             logger.error(e)
             return False
         return True
+
+    async def delete_objects(self, bucket: schemas.S3Bucket, object_names: list[str]) -> set[str]:
+        """Delete the objects from an S3 bucket, the missing ones are skipped
+
+        :param bucket: Bucket to delete from
+        :param object_names: S3 object names
+        :return: Names of the objects not deleted
+        """
+        failed: set[str] = set()
+        for start in range(0, len(object_names), DELETE_BATCH_SIZE):
+            batch = object_names[start : start + DELETE_BATCH_SIZE]
+            try:
+                response = await self._client.run(
+                    self._client.client.delete_objects,  # type: ignore
+                    Bucket=bucket.name,
+                    Delete={"Objects": [{"Key": name} for name in batch], "Quiet": True},
+                )
+            except (BotoCoreError, ClientError) as e:
+                logger.error(e)
+                failed.update(batch)
+                continue
+            for error in response.get("Errors", []):
+                logger.error("Object %s is not deleted: %s", error["Key"], error["Message"])
+                failed.add(error["Key"])
+        return failed
+
+
+class ImageDBRepository(BaseAsyncDBRepository):
+    @staticmethod
+    async def use(*, session: AsyncSession, content_hash: str) -> schemas.ImageObject | None:
+        """Get the image uploaded before and mark it used, so it is not collected meanwhile."""
+        result = await session.execute(
+            update(models.ImageObject)
+            .where(models.ImageObject.content_hash == content_hash)
+            .values(used_at=utils.get_current_timestamp())
+            .returning(models.ImageObject)
+        )
+        image = result.scalar()
+        return schemas.ImageObject.model_validate(image) if image is not None else None
+
+    @staticmethod
+    async def create(*, session: AsyncSession, item: schemas.ImageObject) -> schemas.ImageObject:
+        """Index the uploaded image, the one indexed by a concurrent upload of the same content is returned."""
+        await session.execute(
+            postgresql.insert(models.ImageObject)
+            .values(**item.model_dump(exclude_none=True))
+            .on_conflict_do_nothing(index_elements=[models.ImageObject.content_hash])
+        )
+        result = await session.get(models.ImageObject, item.content_hash, populate_existing=True)
+        return schemas.ImageObject.model_validate(result)
+
+    @staticmethod
+    async def get_derivatives(*, session: AsyncSession, object_names: list[str]) -> dict[str, dict[str, str]]:
+        """Get the stored derivatives of the indexed images by their names, the other images are skipped."""
+        result = await session.execute(
+            select(models.ImageObject.object_name, models.ImageObject.derivatives).where(
+                models.ImageObject.object_name.in_(object_names)
+            )
+        )
+        return dict(result.tuples().all())
+
+    @staticmethod
+    async def set_derivatives(*, session: AsyncSession, object_name: str, derivatives: dict[str, str]) -> None:
+        await session.execute(
+            update(models.ImageObject)
+            .where(models.ImageObject.object_name == object_name)
+            .values(derivatives=derivatives)
+        )
+
+    @staticmethod
+    async def get_unreferenced(
+        *, session: AsyncSession, used_before: int, limit: int | None = None, lock: bool = False
+    ) -> list[schemas.ImageObject]:
+        """Get the indexed images not used by any article, e.g. the cover of an article deleted since.
+
+        An image is used if an article references it, the references are recorded on the article save.
+
+        :param lock: lock the images until the end of the transaction, a concurrent upload of one waits for it,
+            the images locked by another transaction are skipped
+        """
+        is_referenced = exists().where(models.ArticlesToImages.content_hash == models.ImageObject.content_hash)
+        query = (
+            select(models.ImageObject)
+            .where(models.ImageObject.used_at < used_before, ~is_referenced)
+            .order_by(models.ImageObject.used_at)
+            .limit(limit)
+        )
+        if lock:
+            query = query.with_for_update(of=models.ImageObject, skip_locked=True)
+        result = await session.execute(query)
+        return [schemas.ImageObject.model_validate(image) for image in result.scalars()]
+
+    @staticmethod
+    async def delete(*, session: AsyncSession, content_hashes: list[str]) -> None:
+        await session.execute(delete(models.ImageObject).where(models.ImageObject.content_hash.in_(content_hashes)))
@@ -11,6 +11,7 @@ from src.core.config import MainSettings
 from src.domains.oauth.repository import OauthCacheRepository, OauthDBRepository
 from src.domains.oauth.service import JWTService
 from src.domains.user.graph_repository import UserGraphRepository
+from src.domains.user.permission_cache import PermissionCache
 from src.lib import enums, errors, providers, schemas, security
 
 
@@ -20,11 +21,13 @@ class OauthController:
         db_repo: OauthDBRepository,
         graph_repo: UserGraphRepository,
         cache_repo: OauthCacheRepository,
+        permission_cache: PermissionCache,
         oauth_service: JWTService,
     ) -> None:
         self._db_repo = db_repo
         self._graph_repo = graph_repo
         self._cache_repo = cache_repo
+        self._permission_cache = permission_cache
         self._oauth_service = oauth_service
 
     async def rotate_access_and_refresh_token(
@@ -134,14 +137,20 @@ class OauthController:
             if not user_id:
                 return False
 
-            session: Redis[Any]
-            async with self._graph_repo.create_session() as session:
-                is_granted = await self._graph_repo.is_user_granted_permission(
-                    session=session, user_id=user_id, scope=scope, access=access
+            is_granted = self._permission_cache.get(user_id=user_id, scope=scope, access=access)
+            if is_granted is None:
+                version = self._permission_cache.version
+                session: Redis[Any]
+                async with self._graph_repo.create_session() as session:
+                    is_granted = await self._graph_repo.is_user_granted_permission(
+                        session=session, user_id=user_id, scope=scope, access=access
+                    )
+                self._permission_cache.set(
+                    user_id=user_id, scope=scope, access=access, is_granted=is_granted, version=version
                 )
-                if not is_granted and auto_error:
-                    raise errors.AccessTokenProvideUserWithNoAccessRightsError
-                return is_granted
+            if not is_granted and auto_error:
+                raise errors.AccessTokenProvideUserWithNoAccessRightsError
+            return is_granted
 
         return wrapper
 
@@ -8,6 +8,8 @@ from src.domains.oauth.controller import OauthController
 from src.domains.oauth.repository import OauthCacheRepository, OauthDBRepository
 from src.domains.oauth.service import JWTService
 from src.domains.user.graph_repository import UserGraphRepository
+from src.domains.user.permission_cache import PermissionCache
+from src.lib.security import IAMPermissionMatrix
 
 
 @dataclass(frozen=True)
@@ -21,12 +23,20 @@ def create_oauth_domain(
     redis_connection_pool: aioredis.ConnectionPool,
     iam_graph_name: str,
     pwd_context: CryptContext,
+    permission_cache: PermissionCache,
+    permission_matrix: IAMPermissionMatrix,
 ) -> OauthDomain:
     db_repo = OauthDBRepository(session_manager=pg_session_manager)
     cache_repo = OauthCacheRepository(connection_pool=redis_connection_pool)
-    graph_repo = UserGraphRepository(connection_pool=redis_connection_pool, graph_name=iam_graph_name)
+    graph_repo = UserGraphRepository(
+        connection_pool=redis_connection_pool, graph_name=iam_graph_name, permission_matrix=permission_matrix
+    )
     oauth_service = JWTService(pwd_context=pwd_context)
     controller = OauthController(
-        db_repo=db_repo, cache_repo=cache_repo, graph_repo=graph_repo, oauth_service=oauth_service
+        db_repo=db_repo,
+        cache_repo=cache_repo,
+        graph_repo=graph_repo,
+        permission_cache=permission_cache,
+        oauth_service=oauth_service,
     )
     return OauthDomain(controller=controller)
@@ -0,0 +1 @@
+from .domain_builder import StatsDomain, create_stats_domain
@@ -0,0 +1,35 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.persistence import (
+    AsyncS3Client,
+    MeasuredConnectionPool,
+    MeasuredQueuePool,
+)
+from src.lib import schemas
+
+
+class StatsController:
+    def __init__(
+        self,
+        redis_connection_pool: MeasuredConnectionPool,
+        pg_session_managers: dict[str, async_sessionmaker[AsyncSession] | None],
+        s3_client: AsyncS3Client,
+    ) -> None:
+        self._redis_connection_pool = redis_connection_pool
+        self._pg_session_managers = pg_session_managers
+        self._s3_client = s3_client
+
+    async def get_redis_pool_metrics(self) -> schemas.RedisPoolMetrics:
+        return self._redis_connection_pool.get_metrics()
+
+    async def get_db_pool_metrics(self) -> list[schemas.DBPoolMetrics]:
+        metrics = []
+        for name, session_manager in self._pg_session_managers.items():
+            # the pool is not set up or is not measured (e.g. `NullPool` of the tests)
+            if session_manager is None or not isinstance(pool := session_manager.kw["bind"].pool, MeasuredQueuePool):
+                continue
+            metrics.append(pool.get_metrics(name=name))
+        return metrics
+
+    async def get_s3_metrics(self) -> schemas.S3Metrics:
+        return self._s3_client.get_metrics()
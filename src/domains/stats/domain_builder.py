@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.persistence import AsyncS3Client, MeasuredConnectionPool
+
+from .controller import StatsController
+
+
+@dataclass(frozen=True)
+class StatsDomain:
+    controller: StatsController
+
+
+def create_stats_domain(
+    *,
+    redis_connection_pool: MeasuredConnectionPool,
+    pg_session_managers: dict[str, async_sessionmaker[AsyncSession] | None],
+    s3_client: AsyncS3Client,
+) -> StatsDomain:
+    controller = StatsController(
+        redis_connection_pool=redis_connection_pool, pg_session_managers=pg_session_managers, s3_client=s3_client
+    )
+    return StatsDomain(controller=controller)
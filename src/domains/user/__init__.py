@@ -1 +1,2 @@
 from .domain_builder import UserDomain, create_user_domain
+from .permission_cache import PermissionCache
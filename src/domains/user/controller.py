@@ -7,22 +7,30 @@ from src.domains.oauth.service import JWTService
 from src.lib import enums, pagination, providers, schemas
 
 from .graph_repository import UserGraphRepository
+from .permission_cache import PermissionCache
 from .repository import UserDBRepository
 
 
 class UserController:
-    def __init__(self, db_repo: UserDBRepository, graph_repo: UserGraphRepository, oauth_service: JWTService) -> None:
+    def __init__(
+        self,
+        db_repo: UserDBRepository,
+        graph_repo: UserGraphRepository,
+        permission_cache: PermissionCache,
+        oauth_service: JWTService,
+    ) -> None:
         self._db_repo = db_repo
         self._graph_repo = graph_repo
+        self._permission_cache = permission_cache
         self._oauth_service = oauth_service
 
-    @pagination.paginated
+    @pagination.paginated("id")
     async def list(
         self,
         pagination_body: schemas.PaginationBody = Depends(),
     ) -> schemas.PaginationResponse[schemas.User]:
         session: AsyncSession
-        async with self._db_repo.get_session() as session:
+        async with self._db_repo.get_read_session(sticky_key="users") as session:
             result = await self._db_repo.get_all(
                 session=session,
                 pagination_body=pagination_body,
@@ -37,11 +45,6 @@ class UserController:
         async with self._db_repo.get_session() as session:
             return await self._db_repo.get(session=session, item_id=item_id)
 
-    async def create(self, item: schemas.UserCreate) -> schemas.User:
-        session: AsyncSession
-        async with self._db_repo.get_session() as session, session.begin():
-            return await self._db_repo.create(session=session, item=item)
-
     async def me(self, user_id: providers.AuthUserId) -> schemas.User:
         return await self.retrieve(item_id=user_id)
 
@@ -50,33 +53,47 @@ class UserController:
         async with self._db_repo.get_session() as session, session.begin():
             body: dict[str, Any] = item.model_dump()
             password = body.pop("password")
-            return await self._db_repo.create(
+            result: schemas.User = await self._db_repo.create(
                 session=session,
                 item=schemas.InnerUserCreate(
                     **body, hashed_password=self._oauth_service.get_password_hash(password=password)
                 ),
             )
+        await self._db_repo.mark_written(sticky_key="users")
+        return result
 
     async def update(self, item_id: int, item: schemas.UserUpdate) -> schemas.User:
         session: AsyncSession
         async with self._db_repo.get_session() as session, session.begin():
-            return await self._db_repo.update(session=session, item=item, item_id=item_id)
+            result: schemas.User = await self._db_repo.update(session=session, item=item, item_id=item_id)
+        await self._db_repo.mark_written(sticky_key="users")
+        return result
 
     async def me_update(self, item: schemas.UserUpdate, user_id: providers.AuthUserId) -> schemas.User:
         session: AsyncSession
         async with self._db_repo.get_session() as session, session.begin():
             result: schemas.User = await self._db_repo.update(session=session, item=item, item_id=user_id)
-            return result
+        await self._db_repo.mark_written(sticky_key="users")
+        return result
         
     async def delete(self, item_id: int) -> None:
         session: AsyncSession
-        async with self._db_repo.get_session() as session, session.begin():
+        async with self._db_repo.get_admin_session() as session, session.begin():
             await self._db_repo.delete(session=session, item_id=item_id)
+        await self._db_repo.mark_written(sticky_key="users")
 
     @staticmethod
     async def get_groups() -> schemas.UserGroupsResponse:
         return schemas.UserGroupsResponse(data=enums.IAMUserGroup.choices())
 
+    async def sync_permissions(self, graph_data_path: str) -> None:
+        async with self._graph_repo.create_session() as session:
+            await self._graph_repo.sync_permissions(session=session, graph_data_path=graph_data_path)
+        self._permission_cache.drop()
+
+    async def get_permission_cache_metrics(self) -> schemas.PermissionCacheMetrics:
+        return self._permission_cache.get_metrics()
+
     async def get_user_groups(self, item_id: int) -> schemas.UserGroupsResponse:
         async with self._graph_repo.create_session() as session:
             data = await self._graph_repo.get_user_groups(session=session, user_id=item_id)
@@ -89,6 +106,7 @@ class UserController:
             valid = await self._graph_repo.assign_group_to_user(
                 session=session, user_id=item_id, user_group=item.user_group
             )
+            await self._permission_cache.invalidate(session=session, user_id=item_id)
             return schemas.UserIsGrantedPermissionResponse(ok=valid)
 
     async def unassign_group(
@@ -98,4 +116,5 @@ class UserController:
             await self._graph_repo.unassign_group_from_user(
                 session=session, user_id=item_id, user_group=item.user_group
             )
+            await self._permission_cache.invalidate(session=session, user_id=item_id)
             return schemas.UserIsGrantedPermissionResponse()
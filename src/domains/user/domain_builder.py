@@ -4,27 +4,43 @@ from passlib.context import CryptContext
 from redis import asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.core.persistence import ReplicaRouter
 from src.domains.oauth.service import JWTService
+from src.lib.security import IAMPermissionMatrix
 
 from .controller import UserController
 from .graph_repository import UserGraphRepository
+from .permission_cache import PermissionCache
 from .repository import UserDBRepository
 
 
 @dataclass(frozen=True)
 class UserDomain:
     controller: UserController
+    permission_cache: PermissionCache
 
 
 def create_user_domain(
     *,
     pg_session_manager: async_sessionmaker[AsyncSession],
+    pg_admin_session_manager: async_sessionmaker[AsyncSession] | None = None,
+    replica_router: ReplicaRouter | None = None,
     redis_connection_pool: aioredis.ConnectionPool,
     iam_graph_name: str,
     pwd_context: CryptContext,
+    permission_cache: PermissionCache,
+    permission_matrix: IAMPermissionMatrix,
 ) -> UserDomain:
-    db_repo = UserDBRepository(session_manager=pg_session_manager)
-    graph_repo = UserGraphRepository.create_instance(connection_pool=redis_connection_pool, graph_name=iam_graph_name)
+    db_repo = UserDBRepository(
+        session_manager=pg_session_manager,
+        admin_session_manager=pg_admin_session_manager,
+        replica_router=replica_router,
+    )
+    graph_repo = UserGraphRepository(
+        connection_pool=redis_connection_pool, graph_name=iam_graph_name, permission_matrix=permission_matrix
+    )
     oauth_service = JWTService(pwd_context=pwd_context)
-    controller = UserController(db_repo=db_repo, graph_repo=graph_repo, oauth_service=oauth_service)
-    return UserDomain(controller=controller)
+    controller = UserController(
+        db_repo=db_repo, graph_repo=graph_repo, permission_cache=permission_cache, oauth_service=oauth_service
+    )
+    return UserDomain(controller=controller, permission_cache=permission_cache)
@@ -4,51 +4,144 @@ from redis import asyncio as aioredis
 
 from src.core.base.repository import BaseGraphRepository
 from src.lib.enums import IAMAccess, IAMScope, IAMUserGroup
+from src.lib.security import IAMPermissionMatrix
 
 
 class UserGraphRepository(BaseGraphRepository):
+    """IAM graph of the users.
+
+    The `USER -> USERGROUP` relations are mirrored into a Redis set per user, the group permissions
+    are compiled into `IAMPermissionMatrix`, so the permission checks do not query the graph.
+    """
+
+    query_templates = {
+        "is_user_granted_permission": (
+            "MATCH (u:USER {id: $user_id})-[:RELATES]->(:USERGROUP)-[:ALLOWS {access: $access}]->"
+            "(:SCOPE {name: $scope})"
+            " RETURN count(u) > 0"
+        ),
+        "check_permissions_many": (
+            "UNWIND $user_ids AS user_id"
+            " OPTIONAL MATCH (u:USER {id: user_id})-[:RELATES]->(:USERGROUP)-[:ALLOWS {access: $access}]->"
+            "(:SCOPE {name: $scope})"
+            " RETURN user_id, count(u) > 0"
+        ),
+        "get_user_groups": "MATCH (:USER {id: $user_id})-[:RELATES]->(ug:USERGROUP) RETURN ug.name",
+        "get_user_groups_many": (
+            "UNWIND $user_ids AS user_id"
+            " OPTIONAL MATCH (:USER {id: user_id})-[:RELATES]->(ug:USERGROUP)"
+            " RETURN user_id, collect(ug.name)"
+        ),
+        "get_memberships": "MATCH (u:USER)-[:RELATES]->(ug:USERGROUP) RETURN u.id, ug.name",
+        "assign_group_to_user": (
+            "MATCH (ug:USERGROUP {name: $user_group}) MERGE (u:USER {id: $user_id}) MERGE (u)-[:RELATES]->(ug)"
+        ),
+        "unassign_group_from_user": (
+            "MATCH (:USER {id: $user_id})-[r:RELATES]->(:USERGROUP {name: $user_group}) DELETE r"
+        ),
+    }
+
+    def __init__(self, permission_matrix: IAMPermissionMatrix, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._permission_matrix = permission_matrix
+        # the graph is queried until the memberships are synced for the first time
+        self._is_memberships_synced = False
+
+    def _get_groups_key(self, user_id: int | str) -> str:
+        return f"iam:{self.graph_name}:user:{user_id}:groups"
+
+    def _get_synced_key(self) -> str:
+        return f"iam:{self.graph_name}:memberships-synced"
+
+    async def _check_is_memberships_synced(self, session: "aioredis.Redis[Any]") -> bool:
+        if not self._is_memberships_synced:
+            self._is_memberships_synced = bool(await session.exists(self._get_synced_key()))
+        return self._is_memberships_synced
+
     async def is_user_granted_permission(
         self, session: "aioredis.Redis[Any]", user_id: int, scope: IAMScope, access: IAMAccess
     ) -> bool:
-        graph = self.get_graph(session=session)
-        query = """
-            MATCH (u:USER {id: %s})<-[:RELATES]->(:USERGROUP)-[:ALLOWS {access: '%s'}]->(:SCOPE {name: '%s'})
-            RETURN EXISTS(u)
-        """ % (
-            user_id,
-            access,
-            scope,
+        if not await self._check_is_memberships_synced(session=session):
+            return await self._is_user_granted_permission_in_graph(
+                session=session, user_id=user_id, scope=scope, access=access
+            )
+        groups: set[str] = await session.smembers(self._get_groups_key(user_id))
+        return self._permission_matrix.is_granted(groups=groups, scope=scope.value, access=access.value)
+
+    async def check_permissions_many(
+        self, session: "aioredis.Redis[Any]", user_ids: list[int], scope: IAMScope, access: IAMAccess
+    ) -> dict[int, bool]:
+        """Check the permission for each of the users in one round trip."""
+        if not user_ids:
+            return {}
+        if not await self._check_is_memberships_synced(session=session):
+            result = await self.execute_query(
+                session,
+                "check_permissions_many",
+                read_only=True,
+                user_ids=user_ids,
+                scope=str(scope),
+                access=str(access),
+            )
+            return {user_id: is_granted for user_id, is_granted in result.result_set}
+
+        async with session.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.smembers(self._get_groups_key(user_id))
+            users_groups: list[set[str]] = await pipe.execute()
+        return {
+            user_id: self._permission_matrix.is_granted(groups=groups, scope=scope.value, access=access.value)
+            for user_id, groups in zip(user_ids, users_groups)
+        }
+
+    async def _is_user_granted_permission_in_graph(
+        self, session: "aioredis.Redis[Any]", user_id: int, scope: IAMScope, access: IAMAccess
+    ) -> bool:
+        result = await self.execute_query(
+            session, "is_user_granted_permission", read_only=True, user_id=user_id, scope=str(scope), access=str(access)
         )
-        result = await graph.query(q=query)
-        if not result.result_set:
-            return False
-        return_value: bool = result.result_set[0]
-        return return_value
+        return bool(result.result_set and result.result_set[0][0])
 
     async def get_user_groups(self, session: "aioredis.Redis[Any]", user_id: int) -> list[str]:
-        graph = self.get_graph(session=session)
-        query = """MATCH (:USER {id: %s})<-[r:RELATES]->(ug:USERGROUP) RETURN ug.name""" % (user_id,)
-        result = await graph.query(q=query)
-        return result.result_set[0] if result.result_set else []
+        result = await self.execute_query(session, "get_user_groups", read_only=True, user_id=user_id)
+        return [user_group for user_group, in result.result_set]
+
+    async def get_user_groups_many(self, session: "aioredis.Redis[Any]", user_ids: list[int]) -> dict[int, list[str]]:
+        """Get the groups of each of the users in one round trip."""
+        if not user_ids:
+            return {}
+        result = await self.execute_query(session, "get_user_groups_many", read_only=True, user_ids=user_ids)
+        return {user_id: user_groups for user_id, user_groups in result.result_set}
 
     async def assign_group_to_user(
         self, session: "aioredis.Redis[Any]", user_id: int, user_group: IAMUserGroup
     ) -> Literal[True]:
-        graph = self.get_graph(session=session)
-        query = """
-            MATCH (ug:USERGROUP {name: '%s'})
-            MERGE (u:USER {id: %s})
-            MERGE (u)-[e:RELATES]->(ug)
-        """ % (
-            user_group,
-            user_id,
-        )
-        await graph.query(q=query)
+        await self.execute_query(session, "assign_group_to_user", user_id=user_id, user_group=str(user_group))
+        await session.sadd(self._get_groups_key(user_id), str(user_group))
         return True
 
     async def unassign_group_from_user(
         self, session: "aioredis.Redis[Any]", user_id: int, user_group: IAMUserGroup
     ) -> None:
-        graph = self.get_graph(session=session)
-        query = "MATCH (:USER {id: %s})<-[r:RELATES]->(:USERGROUP {name: '%s'}) DELETE r" % (user_id, user_group)
-        await graph.query(q=query)
+        await self.execute_query(session, "unassign_group_from_user", user_id=user_id, user_group=str(user_group))
+        await session.srem(self._get_groups_key(user_id), str(user_group))
+
+    async def sync_permissions(self, session: "aioredis.Redis[Any]", graph_data_path: str) -> None:
+        """Recompile the permission matrix and rebuild the membership sets from the graph."""
+        self._permission_matrix.load(graph_data_path=graph_data_path, graph_name=self.graph_name)
+
+        result = await self.execute_query(session, "get_memberships", read_only=True)
+        memberships: dict[str, set[str]] = {}
+        for user_id, user_group in result.result_set:
+            memberships.setdefault(self._get_groups_key(user_id), set()).add(user_group)
+
+        stale_keys = [key async for key in session.scan_iter(match=self._get_groups_key("*")) if key not in memberships]
+        async with session.pipeline(transaction=True) as pipe:
+            if stale_keys:
+                pipe.delete(*stale_keys)
+            for key, groups in memberships.items():
+                pipe.delete(key)
+                pipe.sadd(key, *groups)
+            pipe.set(self._get_synced_key(), 1)
+            await pipe.execute()
+        self._is_memberships_synced = True
@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from src.core.base.repository import BaseRedisRepository
+from src.lib import schemas
+from src.lib.enums import IAMAccess, IAMScope
+
+logger = logging.getLogger(__name__)
+
+PermissionKey = tuple[int, IAMScope, IAMAccess]
+
+
+class PermissionCache(BaseRedisRepository):
+    """In-process TTL + LRU cache of the IAM permission checks, `(user_id, scope, access) -> is granted`.
+
+    The entries of a user are dropped on every worker through the Redis pub/sub channel
+    when the groups of the user are changed.
+    """
+
+    def __init__(self, connection_pool: aioredis.ConnectionPool, channel: str, ttl: float, max_size: int) -> None:
+        super().__init__(connection_pool=connection_pool)
+        self._channel = channel
+        self._ttl = ttl
+        self._max_size = max_size
+        self._entries: OrderedDict[PermissionKey, tuple[float, bool]] = OrderedDict()
+        self._listener: asyncio.Task[None] | None = None
+        self.hits = 0
+        self.misses = 0
+        # is increased on every drop, so the checks started before it are not cached
+        self.version = 0
+
+    def get(self, user_id: int, scope: IAMScope, access: IAMAccess) -> bool | None:
+        key = (user_id, scope, access)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(  # noqa: A003
+        self, user_id: int, scope: IAMScope, access: IAMAccess, is_granted: bool, version: int
+    ) -> None:
+        if version != self.version or self._ttl <= 0 or self._max_size <= 0:
+            return
+        key = (user_id, scope, access)
+        self._entries[key] = (time.monotonic() + self._ttl, is_granted)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def drop(self, user_id: int | None = None) -> None:
+        """Drop the entries of the user, or all the entries if the user is not set."""
+        self.version += 1
+        if user_id is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+
+    async def invalidate(self, session: "aioredis.Redis[Any]", user_id: int) -> None:
+        """Drop the entries of the user on this and the other workers."""
+        self.drop(user_id)
+        await session.publish(self._channel, str(user_id))
+
+    def get_metrics(self) -> schemas.PermissionCacheMetrics:
+        return schemas.PermissionCacheMetrics(
+            hits=self.hits, misses=self.misses, size=len(self._entries), max_size=self._max_size, ttl=self._ttl
+        )
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                # the subscription holds one connection of the shared pool until it is closed
+                async with self._client.pubsub() as pubsub:
+                    await pubsub.subscribe(self._channel)
+                    # the invalidations could be missed while there was no subscription
+                    self.drop()
+                    while True:
+                        # polled with a timeout shorter than the socket one, so an idle channel is not an error
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self.drop(int(message["data"]))
+            except RedisError as exc:
+                logger.warning(f"Permission cache subscription is lost: {exc}")
+                self.drop()
+                await asyncio.sleep(1)
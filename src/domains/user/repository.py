@@ -26,7 +26,7 @@ class UserDBRepository(BaseAsyncDBRepository):
         pagination_body: schemas.PaginationBody,
     ) -> schemas.UsersWithCount:
         paginated_query = pagination.add_pagination_to_query(
-            query=select(models.User.__table__), id_column=models.User.id, body=pagination_body
+            query=select(models.User.__table__), sort_columns=(models.User.id,), body=pagination_body
         )
         result = await session.execute(paginated_query)
         items = result.mappings().all()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import logging
+
+from src.core.config import create_settings
+from src.core.persistence import (
+    AsyncS3Client,
+    S3UrlSigner,
+    create_new_pg_session_maker,
+    create_s3_client,
+)
+from src.domains import ImageDomain, create_image_domain
+from src.lib.logger import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_argparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Delete the uploaded images not used by any article")
+
+    parser.add_argument("--grace-days", type=float, help="Days since the last upload an image is kept for", default=7)
+    parser.add_argument("--dry-run", action="store_true", help="Only list the images to delete")
+
+    return parser
+
+
+async def image_gc() -> None:
+    # Settings
+    settings = create_settings()
+
+    # Setup logging
+    setup_logging(path=settings.config_path.logger)
+
+    # Parse arguments
+    parser = get_argparser()
+    args = parser.parse_args()
+    logger.debug("Arguments: %s", args)
+
+    s3_client = AsyncS3Client(
+        create_s3_client(
+            region=settings.s3.region,
+            endpoint=settings.s3.endpoint,
+            access_key=settings.s3.access_key,
+            secret_key=settings.s3.secret_key,
+        )
+    )
+    image_domain: ImageDomain = create_image_domain(
+        pg_session_manager=create_new_pg_session_maker(db_url=settings.db.pg_connection_url),
+        s3_client=s3_client,
+        s3_url_signer=S3UrlSigner(
+            region=settings.s3.region,
+            endpoint=settings.s3.endpoint,
+            access_key=settings.s3.access_key,
+            secret_key=settings.s3.secret_key,
+        ),
+    )
+    try:
+        names = await image_domain.controller.collect_garbage(
+            settings=settings, grace_period=int(args.grace_days * 24 * 60 * 60), dry_run=args.dry_run
+        )
+    finally:
+        await s3_client.close()
+
+    for name in names:
+        logger.info("%s %s", "Unused" if args.dry_run else "Deleted", name)
+    logger.info("%s images %s", len(names), "are unused" if args.dry_run else "deleted")
+
+
+if __name__ == "__main__":
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(image_gc())
@@ -1,42 +1,173 @@
+import functools
 from dataclasses import dataclass
 
-from botocore.client import BaseClient as S3Client
 from passlib.context import CryptContext
-from redis import asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.core import persistence
 from src.core.config import MainSettings, TestSettings
+from src.core.config.config import DBSettings
+from src.core.startup import (
+    StartupPhase,
+    StartupPipeline,
+    get_files_fingerprint,
+)
+from src.domains.article import ArticleResponseCache, LikeBuffer
+from src.domains.user import PermissionCache
 from src.injected import DomainHolder
 from src.injected.sso_holder import SSOHolder
+from src.lib.security import IAMPermissionMatrix
 
 
 @dataclass(frozen=True)
 class AppEnvironment:
     domain_holder: DomainHolder
     sso_holder: SSOHolder | None
+    redis_connection_pool: persistence.MeasuredConnectionPool
+    pg_session_managers: tuple[async_sessionmaker[AsyncSession], ...]
+    s3_client: persistence.AsyncS3Client
+    startup_pipeline: StartupPipeline
+
+    @staticmethod
+    def _create_pg_session_maker(
+        *, settings: DBSettings, pool_size: int, db_url: str | None = None
+    ) -> async_sessionmaker[AsyncSession]:
+        return persistence.create_new_pg_session_maker(
+            db_url=db_url or settings.pg_connection_url,
+            pool_size=pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+            pool_pre_ping=settings.pool_pre_ping,
+            statement_cache_size=settings.statement_cache_size,
+            command_timeout=settings.command_timeout,
+        )
+
+    @staticmethod
+    def _create_startup_pipeline(
+        *,
+        settings: MainSettings | TestSettings,
+        redis_connection_pool: persistence.MeasuredConnectionPool,
+        domain_holder: DomainHolder,
+    ) -> StartupPipeline:
+        return StartupPipeline(
+            db_url=settings.db.pg_connection_url,
+            redis_connection_pool=redis_connection_pool,
+            lock_key=settings.startup.lock_key,
+            lock_timeout=settings.startup.lock_timeout,
+            max_attempts=settings.startup.max_attempts,
+            retry_delay=settings.startup.retry_delay,
+            phases=[
+                StartupPhase(
+                    name="migrations",
+                    run=functools.partial(
+                        persistence.run_pg_migrations,
+                        db_url=settings.db.pg_connection_url,
+                        migrations_path=settings.db.migrations_path,
+                    ),
+                ),
+                StartupPhase(
+                    name="graph_sync",
+                    run=functools.partial(
+                        AppEnvironment._sync_redis_graph,
+                        domain_holder=domain_holder,
+                        connection_url=settings.redis.connection_url,
+                        graph_data_path=settings.redis.graph_data_path,
+                    ),
+                    # the graphs are stored in the same Redis, so they are synced again if it has lost them
+                    fingerprint=get_files_fingerprint(settings.redis.graph_data_path),
+                ),
+            ],
+        )
 
     @classmethod
     def create(cls, *, settings: MainSettings) -> "AppEnvironment":
-        pg_session_manager: async_sessionmaker[AsyncSession] = persistence.create_new_pg_session_maker(
-            db_url=settings.db.pg_connection_url
+        pg_session_manager = cls._create_pg_session_maker(settings=settings.db, pool_size=settings.db.pool_size)
+        pg_read_session_manager = (
+            cls._create_pg_session_maker(settings=settings.db, pool_size=settings.db.public_read_pool_size)
+            if settings.db.public_read_pool_size
+            else None
+        )
+        pg_admin_session_manager = (
+            cls._create_pg_session_maker(settings=settings.db, pool_size=settings.db.admin_write_pool_size)
+            if settings.db.admin_write_pool_size
+            else None
         )
-        redis_connection_pool: aioredis.ConnectionPool = persistence.create_redis_connection_pool(
-            connection_url=settings.redis.connection_url
+        redis_connection_pool: persistence.MeasuredConnectionPool = persistence.create_redis_connection_pool(
+            connection_url=settings.redis.connection_url,
+            max_connections=settings.redis.max_connections,
+            timeout=settings.redis.pool_timeout,
+            socket_timeout=settings.redis.socket_timeout,
+            socket_connect_timeout=settings.redis.socket_connect_timeout,
+            health_check_interval=settings.redis.health_check_interval,
         )
-        s3_client: S3Client = persistence.create_s3_client(
+        replica_router = persistence.ReplicaRouter(
+            connection_pool=redis_connection_pool,
+            replicas=[
+                cls._create_pg_session_maker(settings=settings.db, pool_size=settings.db.replica_pool_size, db_url=url)
+                for url in settings.db.replica_urls
+            ],
+            weights=settings.db.replica_weights,
+            policy=settings.db.replica_policy,
+            sticky_seconds=settings.db.replica_sticky_seconds,
+            retry_seconds=settings.db.replica_retry_seconds,
+        )
+        s3_client = persistence.AsyncS3Client(
+            persistence.create_s3_client(
+                region=settings.s3.region,
+                endpoint=settings.s3.endpoint,
+                access_key=settings.s3.access_key,
+                secret_key=settings.s3.secret_key,
+                max_pool_connections=settings.s3.max_pool_connections,
+                max_attempts=settings.s3.max_attempts,
+                retry_mode=settings.s3.retry_mode,
+                connect_timeout=settings.s3.connect_timeout,
+                read_timeout=settings.s3.read_timeout,
+            ),
+            max_workers=settings.s3.max_workers,
+            multipart_threshold=settings.s3.multipart_threshold,
+            multipart_chunk_size=settings.s3.multipart_chunk_size,
+            multipart_concurrency=settings.s3.multipart_concurrency,
+        )
+        s3_url_signer = persistence.S3UrlSigner(
             region=settings.s3.region,
             endpoint=settings.s3.endpoint,
             access_key=settings.s3.access_key,
             secret_key=settings.s3.secret_key,
         )
         pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        permission_cache = PermissionCache(
+            connection_pool=redis_connection_pool,
+            channel=settings.redis.permission_cache_channel,
+            ttl=settings.redis.permission_cache_ttl,
+            max_size=settings.redis.permission_cache_max_size,
+        )
+        permission_matrix = IAMPermissionMatrix.from_graph_data(
+            graph_data_path=settings.redis.graph_data_path, graph_name=settings.redis.iam_graph_name
+        )
+        article_response_cache = ArticleResponseCache(
+            connection_pool=redis_connection_pool,
+            ttl=settings.redis.article_cache_ttl,
+            lock_timeout=settings.redis.article_cache_lock_timeout,
+        )
+        like_buffer = LikeBuffer(connection_pool=redis_connection_pool, is_enabled=settings.redis.like_buffer_enabled)
         domain_holder = DomainHolder.create(
             pg_session_manager=pg_session_manager,
+            pg_read_session_manager=pg_read_session_manager,
+            pg_admin_session_manager=pg_admin_session_manager,
+            replica_router=replica_router,
             redis_connection_pool=redis_connection_pool,
             s3_client=s3_client,
+            s3_url_signer=s3_url_signer,
+            s3_url_expiration=settings.s3.presigned_url_expiration,
+            s3_url_refresh_margin=settings.s3.presigned_url_refresh_margin,
+            s3_url_cache_size=settings.s3.presigned_url_cache_size,
             iam_graph_name=settings.redis.iam_graph_name,
             pwd_context=pwd_context,
+            permission_cache=permission_cache,
+            permission_matrix=permission_matrix,
+            article_response_cache=article_response_cache,
+            like_buffer=like_buffer,
         )
         sso_holder = SSOHolder.create(
             google_client_id=settings.sso.google.client_id,
@@ -50,28 +181,109 @@ class AppEnvironment:
             microsoft_redirect_uri=settings.sso.microsoft.redirect_uri,
             microsoft_tenant=settings.sso.microsoft.tenant,
         )
-        return AppEnvironment(domain_holder=domain_holder, sso_holder=sso_holder)
+        return AppEnvironment(
+            domain_holder=domain_holder,
+            sso_holder=sso_holder,
+            redis_connection_pool=redis_connection_pool,
+            s3_client=s3_client,
+            startup_pipeline=cls._create_startup_pipeline(
+                settings=settings, redis_connection_pool=redis_connection_pool, domain_holder=domain_holder
+            ),
+            pg_session_managers=tuple(
+                session_manager
+                for session_manager in (
+                    pg_session_manager,
+                    pg_read_session_manager,
+                    pg_admin_session_manager,
+                    *replica_router.replicas,
+                )
+                if session_manager is not None
+            ),
+        )
 
     @classmethod
     def mock(cls, *, settings: TestSettings) -> "AppEnvironment":
         pg_session_manager: async_sessionmaker[AsyncSession] = persistence.create_new_test_pg_session_maker(
             db_url=settings.db.pg_connection_url
         )
-        redis_connection_pool: aioredis.ConnectionPool = persistence.create_redis_connection_pool(
-            connection_url=settings.redis.connection_url
+        redis_connection_pool: persistence.MeasuredConnectionPool = persistence.create_redis_connection_pool(
+            connection_url=settings.redis.connection_url,
+            max_connections=settings.redis.max_connections,
+            timeout=settings.redis.pool_timeout,
+            socket_timeout=settings.redis.socket_timeout,
+            socket_connect_timeout=settings.redis.socket_connect_timeout,
+            health_check_interval=settings.redis.health_check_interval,
         )
         pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        s3_client = persistence.create_s3_client(
-            region="mocked",
-            endpoint="mocked",
-            access_key="mocked",
-            secret_key="mocked",
+        s3_client = persistence.AsyncS3Client(
+            persistence.create_s3_client(
+                region="mocked",
+                endpoint="mocked",
+                access_key="mocked",
+                secret_key="mocked",
+            )
+        )
+        s3_url_signer = persistence.S3UrlSigner(
+            region="mocked", endpoint="mocked", access_key="mocked", secret_key="mocked"
+        )
+        permission_cache = PermissionCache(
+            connection_pool=redis_connection_pool,
+            channel=settings.redis.permission_cache_channel,
+            ttl=settings.redis.permission_cache_ttl,
+            max_size=settings.redis.permission_cache_max_size,
+        )
+        permission_matrix = IAMPermissionMatrix.from_graph_data(
+            graph_data_path=settings.redis.graph_data_path, graph_name=settings.redis.iam_graph_name
         )
+        article_response_cache = ArticleResponseCache(
+            connection_pool=redis_connection_pool,
+            ttl=settings.redis.article_cache_ttl,
+            lock_timeout=settings.redis.article_cache_lock_timeout,
+        )
+        like_buffer = LikeBuffer(connection_pool=redis_connection_pool, is_enabled=settings.redis.like_buffer_enabled)
         domain_holder = DomainHolder.mock(
             pg_session_manager=pg_session_manager,
             redis_connection_pool=redis_connection_pool,
             iam_graph_name=settings.redis.iam_graph_name,
             pwd_context=pwd_context,
             s3_client=s3_client,
+            s3_url_signer=s3_url_signer,
+            permission_cache=permission_cache,
+            permission_matrix=permission_matrix,
+            article_response_cache=article_response_cache,
+            like_buffer=like_buffer,
         )
-        return AppEnvironment(domain_holder=domain_holder, sso_holder=None)
+        return AppEnvironment(
+            domain_holder=domain_holder,
+            sso_holder=None,
+            redis_connection_pool=redis_connection_pool,
+            s3_client=s3_client,
+            startup_pipeline=cls._create_startup_pipeline(
+                settings=settings, redis_connection_pool=redis_connection_pool, domain_holder=domain_holder
+            ),
+            pg_session_managers=(pg_session_manager,),
+        )
+
+    @staticmethod
+    async def _sync_redis_graph(*, domain_holder: DomainHolder, connection_url: str, graph_data_path: str) -> None:
+        await persistence.sync_redis_graph(connection_url=connection_url, graph_data_path=graph_data_path)
+        await domain_holder.user.controller.sync_permissions(graph_data_path=graph_data_path)
+
+    async def sync_redis_graph(self, *, connection_url: str, graph_data_path: str) -> None:
+        """Sync the graphs with the graph data, then refresh the IAM permissions compiled from them."""
+        await self._sync_redis_graph(
+            domain_holder=self.domain_holder, connection_url=connection_url, graph_data_path=graph_data_path
+        )
+
+    async def startup(self) -> None:
+        await persistence.check_redis_connection(connection_pool=self.redis_connection_pool)
+        await self.domain_holder.user.permission_cache.start()
+        self.startup_pipeline.start()
+
+    async def shutdown(self) -> None:
+        await self.startup_pipeline.stop()
+        await self.domain_holder.user.permission_cache.stop()
+        await self.redis_connection_pool.disconnect()
+        await self.s3_client.close()
+        for session_manager in self.pg_session_managers:
+            await session_manager.kw["bind"].dispose()
@@ -1,20 +1,29 @@
 from dataclasses import dataclass
 
-from botocore.client import BaseClient as S3Client
 from passlib.context import CryptContext
-from redis import asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.core.persistence import (
+    AsyncS3Client,
+    MeasuredConnectionPool,
+    ReplicaRouter,
+    S3UrlSigner,
+)
 from src.domains import (
     ArticleDomain,
     ImageDomain,
     OauthDomain,
+    StatsDomain,
     UserDomain,
     create_article_domain,
     create_image_domain,
     create_oauth_domain,
+    create_stats_domain,
     create_user_domain,
 )
+from src.domains.article import ArticleResponseCache, LikeBuffer
+from src.domains.user import PermissionCache
+from src.lib.security import IAMPermissionMatrix
 
 
 @dataclass(frozen=True)
@@ -23,16 +32,28 @@ class DomainHolder:
     image: ImageDomain
     user: UserDomain
     article: ArticleDomain
+    stats: StatsDomain
 
     @classmethod
     def create(
         cls,
         *,
         pg_session_manager: async_sessionmaker[AsyncSession],
-        redis_connection_pool: aioredis.ConnectionPool,
-        s3_client: S3Client,
+        pg_read_session_manager: async_sessionmaker[AsyncSession] | None,
+        pg_admin_session_manager: async_sessionmaker[AsyncSession] | None,
+        replica_router: ReplicaRouter,
+        redis_connection_pool: MeasuredConnectionPool,
+        s3_client: AsyncS3Client,
+        s3_url_signer: S3UrlSigner,
+        s3_url_expiration: int,
+        s3_url_refresh_margin: int,
+        s3_url_cache_size: int,
         iam_graph_name: str,
         pwd_context: CryptContext,
+        permission_cache: PermissionCache,
+        permission_matrix: IAMPermissionMatrix,
+        article_response_cache: ArticleResponseCache,
+        like_buffer: LikeBuffer,
     ) -> "DomainHolder":
         return DomainHolder(
             oauth=create_oauth_domain(
@@ -40,15 +61,45 @@ class DomainHolder:
                 redis_connection_pool=redis_connection_pool,
                 iam_graph_name=iam_graph_name,
                 pwd_context=pwd_context,
+                permission_cache=permission_cache,
+                permission_matrix=permission_matrix,
+            ),
+            image=create_image_domain(
+                pg_session_manager=pg_session_manager,
+                s3_client=s3_client,
+                s3_url_signer=s3_url_signer,
+                url_expiration=s3_url_expiration,
+                url_refresh_margin=s3_url_refresh_margin,
+                url_cache_size=s3_url_cache_size,
             ),
-            image=create_image_domain(s3_client=s3_client),
             user=create_user_domain(
                 pg_session_manager=pg_session_manager,
+                pg_admin_session_manager=pg_admin_session_manager,
+                replica_router=replica_router,
                 redis_connection_pool=redis_connection_pool,
                 iam_graph_name=iam_graph_name,
                 pwd_context=pwd_context,
+                permission_cache=permission_cache,
+                permission_matrix=permission_matrix,
+            ),
+            article=create_article_domain(
+                pg_session_manager=pg_session_manager,
+                response_cache=article_response_cache,
+                like_buffer=like_buffer,
+                pg_read_session_manager=pg_read_session_manager,
+                pg_admin_session_manager=pg_admin_session_manager,
+                replica_router=replica_router,
+            ),
+            stats=create_stats_domain(
+                redis_connection_pool=redis_connection_pool,
+                pg_session_managers={
+                    "main": pg_session_manager,
+                    "public_read": pg_read_session_manager,
+                    "admin_write": pg_admin_session_manager,
+                    **{f"replica_{index}": replica for index, replica in enumerate(replica_router.replicas)},
+                },
+                s3_client=s3_client,
             ),
-            article=create_article_domain(pg_session_manager=pg_session_manager),
         )
 
     @classmethod
@@ -56,10 +107,15 @@ class DomainHolder:
         cls,
         *,
         pg_session_manager: async_sessionmaker[AsyncSession],
-        redis_connection_pool: aioredis.ConnectionPool,
+        redis_connection_pool: MeasuredConnectionPool,
         iam_graph_name: str,
         pwd_context: CryptContext,
-        s3_client: S3Client,
+        permission_cache: PermissionCache,
+        permission_matrix: IAMPermissionMatrix,
+        article_response_cache: ArticleResponseCache,
+        like_buffer: LikeBuffer,
+        s3_client: AsyncS3Client,
+        s3_url_signer: S3UrlSigner,
     ) -> "DomainHolder":
         return DomainHolder(
             oauth=create_oauth_domain(
@@ -67,13 +123,26 @@ class DomainHolder:
                 redis_connection_pool=redis_connection_pool,
                 iam_graph_name=iam_graph_name,
                 pwd_context=pwd_context,
+                permission_cache=permission_cache,
+                permission_matrix=permission_matrix,
             ),
             user=create_user_domain(
                 pg_session_manager=pg_session_manager,
                 redis_connection_pool=redis_connection_pool,
                 iam_graph_name=iam_graph_name,
                 pwd_context=pwd_context,
+                permission_cache=permission_cache,
+                permission_matrix=permission_matrix,
+            ),
+            article=create_article_domain(
+                pg_session_manager=pg_session_manager, response_cache=article_response_cache, like_buffer=like_buffer
+            ),
+            stats=create_stats_domain(
+                redis_connection_pool=redis_connection_pool,
+                pg_session_managers={"main": pg_session_manager},
+                s3_client=s3_client,
+            ),
+            image=create_image_domain(
+                pg_session_manager=pg_session_manager, s3_client=s3_client, s3_url_signer=s3_url_signer
             ),
-            article=create_article_domain(pg_session_manager=pg_session_manager),
-            image=create_image_domain(s3_client=s3_client),
         )
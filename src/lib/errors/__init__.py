@@ -4,8 +4,11 @@ from .web import (
     ImageNotFoundError,
     UnprocessableEntityError,
     NotSupportedImageMimeTypeError,
+    ImageTooLargeError,
+    ImageUploadError,
     UserNotFoundError,
-    OffsetIdNullableViolationError,
+    PaginationCursorNullableViolationError,
+    InvalidPaginationCursorError,
     OffsetTypeViolationError,
     ArticleNotFoundError,
     ArticleCommentNotFoundError,
@@ -32,8 +35,11 @@ __all__ = [
     "ImageNotFoundError",
     "UnprocessableEntityError",
     "NotSupportedImageMimeTypeError",
+    "ImageTooLargeError",
+    "ImageUploadError",
     "UserNotFoundError",
-    "OffsetIdNullableViolationError",
+    "PaginationCursorNullableViolationError",
+    "InvalidPaginationCursorError",
     "OffsetTypeViolationError",
     "ArticleNotFoundError",
     "ArticleCommentNotFoundError",
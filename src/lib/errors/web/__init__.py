@@ -1,7 +1,11 @@
 from .base import AbstractError, NotFoundError, BadRequestError, UnprocessableEntityError, global_exception_handler
-from .image import ImageNotFoundError, NotSupportedImageMimeTypeError
+from .image import ImageNotFoundError, ImageTooLargeError, ImageUploadError, NotSupportedImageMimeTypeError
 from .user import UserNotFoundError
-from .pagination import OffsetIdNullableViolationError, OffsetTypeViolationError
+from .pagination import (
+    PaginationCursorNullableViolationError,
+    InvalidPaginationCursorError,
+    OffsetTypeViolationError,
+)
 from .article import (
     ArticleNotFoundError,
     ArticleCommentNotFoundError,
@@ -24,8 +28,11 @@ __all__ = [
     "UnprocessableEntityError",
     "ImageNotFoundError",
     "NotSupportedImageMimeTypeError",
+    "ImageTooLargeError",
+    "ImageUploadError",
     "UserNotFoundError",
-    "OffsetIdNullableViolationError",
+    "PaginationCursorNullableViolationError",
+    "InvalidPaginationCursorError",
     "OffsetTypeViolationError",
     "ArticleNotFoundError",
     "ArticleCommentNotFoundError",
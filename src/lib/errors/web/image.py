@@ -1,4 +1,11 @@
-from .base import BadRequestError, NotFoundError
+from fastapi import status
+
+from .base import (
+    AbstractError,
+    BadRequestError,
+    InternalServerError,
+    NotFoundError,
+)
 
 
 class ImageNotFoundError(NotFoundError):
@@ -8,3 +15,13 @@ class ImageNotFoundError(NotFoundError):
 class NotSupportedImageMimeTypeError(BadRequestError):
     def __init__(self, detail: str = "Image type is not supported (supported: png, jpg/jpeg, webp)") -> None:
         super().__init__(detail=detail)
+
+
+class ImageTooLargeError(AbstractError):
+    def __init__(self, detail: str = "Image is too large") -> None:
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+class ImageUploadError(InternalServerError):
+    def __init__(self, detail: str = "Image could not be uploaded") -> None:
+        super().__init__(detail=detail)
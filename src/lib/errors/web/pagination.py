@@ -1,8 +1,13 @@
 from .base import BadRequestError
 
 
-class OffsetIdNullableViolationError(BadRequestError):
-    def __init__(self, detail: str = "Offset ID cannot be empty if offset type is not FIRST or SPECIFIC") -> None:
+class PaginationCursorNullableViolationError(BadRequestError):
+    def __init__(self, detail: str = "Cursor cannot be empty if offset type is NEXT or PREV") -> None:
+        super().__init__(detail=detail)
+
+
+class InvalidPaginationCursorError(BadRequestError):
+    def __init__(self, detail: str = "Cursor is malformed or does not belong to this list") -> None:
         super().__init__(detail=detail)
 
 
@@ -1,3 +1,4 @@
-from .setup import setup_logging
+from .formatters import JsonLinesFormatter
+from .setup import setup_logging, stop_queue_listeners
 
-__all__ = ["setup_logging"]
+__all__ = ["JsonLinesFormatter", "setup_logging", "stop_queue_listeners"]
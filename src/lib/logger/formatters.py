@@ -0,0 +1,28 @@
+import json
+import logging
+from typing import Any
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format the record as a compact single-line JSON object.
+
+    The fields of the records logged with a dict message (e.g. by `LoggingMiddleware`) are merged into the object.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:  # noqa: A003
+        data: dict[str, Any] = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict):
+            data.update(record.msg)
+        else:
+            data["message"] = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(data, default=str, separators=(",", ":"))
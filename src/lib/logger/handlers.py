@@ -0,0 +1,80 @@
+import copy
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler
+
+
+class StructuredQueueHandler(QueueHandler):
+    """Put the records to the queue without rendering them, so dict messages stay structured.
+
+    Only the parts that can not outlive the call (arguments, exception info) are resolved here.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class BatchingQueueListener:
+    """Write the queued records on a background thread, up to `batch_size` records at once.
+
+    Stream handlers get the whole batch in one write and one flush instead of a flush per record.
+    The thread is stopped by `None` put to the queue after the records, so they are written out before.
+    """
+
+    def __init__(
+        self, queue_: "queue.SimpleQueue[logging.LogRecord | None]", *handlers: logging.Handler, batch_size: int = 512
+    ) -> None:
+        self.queue = queue_
+        self.handlers = handlers
+        self._batch_size = batch_size
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write out the queued records and stop the thread."""
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def handle_batch(self, records: list[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            accepted = [record for record in records if record.levelno >= handler.level and handler.filter(record)]
+            if not accepted:
+                continue
+            if not isinstance(handler, logging.StreamHandler) or isinstance(handler, logging.FileHandler):
+                for record in accepted:
+                    handler.handle(record)
+                continue
+            try:
+                chunk = "".join(handler.format(record) + handler.terminator for record in accepted)
+                with handler.lock:  # type: ignore[union-attr]
+                    handler.stream.write(chunk)
+                    handler.flush()
+            except Exception:  # noqa
+                handler.handleError(accepted[-1])
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            self.handle_batch(records)
+            if len(records) < len(batch):
+                return
@@ -1,8 +1,54 @@
+import atexit
 import json
+import logging
+import queue
 from logging.config import dictConfig
+from typing import Any
+
+from .handlers import BatchingQueueListener, StructuredQueueHandler
+
+_listeners: list[BatchingQueueListener] = []
 
 
 def setup_logging(path: str) -> None:
+    """Configure logging with the JSON config.
+
+    If the `queue.enabled` option of the config is set, the configured handlers are moved to the background
+    writer threads, the loggers only put the records to the in-memory queues.
+    """
     with open(path, "rt") as f:
-        config = json.load(f)
+        config: dict[str, Any] = json.load(f)
+    queue_config: dict[str, Any] = config.pop("queue", {})
+
+    stop_queue_listeners()
     dictConfig(config)
+    if queue_config.get("enabled", False):
+        _enable_queue(batch_size=queue_config.get("batch_size", 512))
+
+
+def stop_queue_listeners() -> None:
+    """Write out the queued records and stop the writer threads."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def _enable_queue(batch_size: int) -> None:
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+    ]
+    # the loggers with the same handlers share the queue
+    queue_handlers: dict[tuple[logging.Handler, ...], StructuredQueueHandler] = {}
+    for logger in loggers:
+        handlers = tuple(logger.handlers)
+        if not handlers:
+            continue
+        if handlers not in queue_handlers:
+            records_queue: queue.SimpleQueue[logging.LogRecord | None] = queue.SimpleQueue()
+            listener = BatchingQueueListener(records_queue, *handlers, batch_size=batch_size)
+            listener.start()
+            _listeners.append(listener)
+            queue_handlers[handlers] = StructuredQueueHandler(records_queue)
+        logger.handlers = [queue_handlers[handlers]]
+
+
+atexit.register(stop_queue_listeners)
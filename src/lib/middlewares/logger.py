@@ -1,19 +1,12 @@
-import json
 import logging
 import math
+import random
 import time
 import traceback
 import uuid
-from typing import Any
 
-from starlette.datastructures import Address
-from starlette.middleware.base import (
-    BaseHTTPMiddleware,
-    RequestResponseEndpoint,
-)
-from starlette.requests import Request
-from starlette.responses import Response
-from starlette.types import ASGIApp
+from starlette.datastructures import Headers, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.lib.schemas.logger import (
     ExceptionJsonLog,
@@ -22,106 +15,136 @@ from src.lib.schemas.logger import (
 )
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self._logger = logging.getLogger(__name__)
+class _BodyCollector:
+    """Keep the first `limit` bytes of the body chunks passing through and count the whole size."""
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._head = bytearray()
+        self.size = 0
+
+    def add(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if len(self._head) < self._limit:
+            self._head += chunk[: self._limit - len(self._head)]
 
-    @staticmethod
-    async def get_protocol(request: Request) -> str:
-        protocol = str(request.scope.get("type", ""))
-        http_version = str(request.scope.get("http_version", ""))
-        if protocol.lower() == "http" and http_version:
-            return f"{protocol.upper()}/{http_version}"
-        return ""
+    def decode(self) -> str:
+        return self._head.decode(errors="replace")
 
-    @staticmethod
-    async def set_body(request: Request, body: bytes) -> None:
-        async def receive() -> dict[str, str | bytes]:
-            return {"type": "http.request", "body": body}
 
-        request._receive = receive
+class LoggingMiddleware:
+    """Log request and response in `JSON` format.
 
-    async def get_body(self, request: Request) -> bytes:
-        body = await request.body()
-        await self.set_body(request, body)
-        return body
+    The body chunks are passed through as they are, only the first `max_*_body_size` bytes are kept for the log,
+    so streaming responses are neither buffered nor copied.
+    The records are logged as dicts and rendered by the log handlers.
+    Nothing is collected if DEBUG is disabled for the logger or the request is not sampled.
 
-    async def dispatch(
+    :param sample_rate: share of the requests to log
+    :param route_sample_rates: sample rates overriding `sample_rate` for the paths starting with the given prefixes
+    :param body_excluded_paths: prefixes of the paths the bodies are not logged for, e.g. the ones with credentials
+    """
+
+    def __init__(
         self,
-        request: Request,
-        call_next: RequestResponseEndpoint,
-        *args: Any,
-        **kwargs: Any,
-    ) -> Response:
-        """Log request and response in `JSON` format."""
-        # Set request id
-        request.state.id = str(uuid.uuid4())
-
-        # Create needed variables
+        app: ASGIApp,
+        max_request_body_size: int = 4096,
+        max_response_body_size: int = 4096,
+        sample_rate: float = 0.0,
+        route_sample_rates: dict[str, float] | None = None,
+        body_excluded_paths: tuple[str, ...] = (),
+    ) -> None:
+        self.app = app
+        self._logger = logging.getLogger(__name__)
+        self._max_request_body_size = max_request_body_size
+        self._max_response_body_size = max_response_body_size
+        self._sample_rate = sample_rate
+        # the longest prefix wins
+        self._route_sample_rates = sorted((route_sample_rates or {}).items(), key=lambda item: -len(item[0]))
+        self._body_excluded_paths = body_excluded_paths
+
+    def is_sampled(self, path: str) -> bool:
+        rate = next((rate for prefix, rate in self._route_sample_rates if path.startswith(prefix)), self._sample_rate)
+        return rate >= 1 or random.random() < rate  # noqa: S311
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self._logger.isEnabledFor(logging.DEBUG)
+            or not self.is_sampled(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # Set request id, it is available as `request.state.id`
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["id"] = request_id
+
         start_time = time.time()
+        # only the sizes of the excluded bodies are logged
+        is_body_excluded = scope["path"].startswith(self._body_excluded_paths)
+        request_body = _BodyCollector(limit=0 if is_body_excluded else self._max_request_body_size)
+        response_body = _BodyCollector(limit=0 if is_body_excluded else self._max_response_body_size)
+        request_logged = False
+        status_code = 0
+
+        def log_request() -> None:
+            nonlocal request_logged
+            if request_logged:
+                return
+            request_logged = True
+            client = scope.get("client") or ("0.0.0.0", 0)  # noqa: S104
+            self._logger.debug(
+                RequestJsonLog(
+                    request_id=request_id,
+                    request_referer=Headers(scope=scope).get("referer", None),
+                    request_method=scope["method"],
+                    request_path=scope["path"],
+                    request_query_params=dict(QueryParams(scope["query_string"]).multi_items()),
+                    request_body=request_body.decode(),
+                    request_body_size=request_body.size,
+                    remote_ip=client[0],
+                    remote_port=client[1],
+                ).model_dump()
+            )
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.add(message.get("body", b""))
+                if not message.get("more_body", False):
+                    log_request()
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                # the endpoint may respond without reading the body
+                log_request()
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_body.add(message.get("body", b""))
+                if not message.get("more_body", False):
+                    self._logger.debug(
+                        ResponseJsonLog(
+                            request_id=request_id,
+                            response_status_code=status_code,
+                            response_body=response_body.decode(),
+                            response_body_size=response_body.size,
+                            response_duration=math.ceil((time.time() - start_time) * 1000),
+                        ).model_dump()
+                    )
+            await send(message)
 
-        # Request side
-        try:
-            raw_request_body = await request.body()
-            await self.set_body(request, raw_request_body)
-            raw_request_body = await self.get_body(request)
-            request_body = raw_request_body.decode()
-        except Exception:  # noqa
-            request_body = ""
-
-        request_client = request.client
-        if request_client is None:
-            self._logger.debug("Request client is None")
-            request_client = Address("0.0.0.0", 0)
-
-        # Create request log schema
-        request_headers: dict[str, str] = dict(request.headers.items())
-        request_json_fields = RequestJsonLog(
-            request_id=request.state.id,
-            request_referer=request_headers.get("referer", None),
-            request_method=request.method,
-            request_path=request.url.path,
-            request_query_params=dict(request.query_params.multi_items()),
-            request_body=request_body,
-            remote_ip=request_client[0],
-            remote_port=request_client[1],
-        ).model_dump()
-
-        # Log request data
-        self._logger.debug(json.dumps(request_json_fields, indent=4))
-
-        # Response side
         try:
-            response = await call_next(request)
+            await self.app(scope, receive_wrapper, send_wrapper)
         except Exception as exc:
-            exception_json_response = ExceptionJsonLog(
-                request_id=request.state.id,
-                error=str(exc),
-                traceback=str(traceback.format_exception(type(exc), exc, exc.__traceback__)),
-            ).model_dump()
-            self._logger.debug(json.dumps(exception_json_response, indent=4))
-            raise exc
-        else:
-            response_body = b""
-            async for chunk in response.body_iterator:  # type: ignore
-                response_body += chunk
-            response = Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
+            log_request()
+            self._logger.debug(
+                ExceptionJsonLog(
+                    request_id=request_id,
+                    error=str(exc),
+                    traceback=str(traceback.format_exception(type(exc), exc, exc.__traceback__)),
+                ).model_dump()
             )
-
-        # Create response log schema
-        duration: int = math.ceil((time.time() - start_time) * 1000)
-        response_json_fields = ResponseJsonLog(
-            request_id=request.state.id,
-            response_status_code=response.status_code,
-            response_body=response_body.decode(),
-            response_duration=duration,
-        ).model_dump()
-
-        # Log response data
-        self._logger.debug(json.dumps(response_json_fields, indent=4))
-        return response
+            raise exc
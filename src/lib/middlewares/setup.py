@@ -2,13 +2,21 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.core.config import MainSettings, TestSettings
+from src.core.startup import StartupPipeline
+
+from .logger import LoggingMiddleware
+from .startup import StartupGateMiddleware
 
 
 def setup_middlewares(
     *,
     app: FastAPI,
     settings: MainSettings | TestSettings,
+    startup_pipeline: StartupPipeline | None = None,
 ) -> None:
+    # the innermost one, so the rejected requests are logged and get the CORS headers
+    if startup_pipeline is not None:
+        app.add_middleware(StartupGateMiddleware, startup_pipeline=startup_pipeline, exempt_paths=("/ready/",))
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors.allow_origins,
@@ -16,3 +24,13 @@ def setup_middlewares(
         allow_methods=settings.cors.allow_methods,
         allow_headers=settings.cors.allow_headers,
     )
+    http_logging = settings.http_logging
+    if http_logging.sample_rate > 0 or any(rate > 0 for rate in http_logging.route_sample_rates.values()):
+        app.add_middleware(
+            LoggingMiddleware,
+            max_request_body_size=http_logging.max_request_body_size,
+            max_response_body_size=http_logging.max_response_body_size,
+            sample_rate=http_logging.sample_rate,
+            route_sample_rates=http_logging.route_sample_rates,
+            body_excluded_paths=tuple(http_logging.body_excluded_paths),
+        )
@@ -0,0 +1,33 @@
+from starlette import status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.startup import StartupPipeline
+from src.lib.errors.web.base import ErrorModel
+
+
+class StartupGateMiddleware:
+    """Respond 503 to the HTTP requests until the startup pipeline is finished, e.g. the migrations are applied.
+
+    The paths in `exempt_paths` (the readiness endpoint) are served during the startup.
+    """
+
+    def __init__(self, app: ASGIApp, startup_pipeline: StartupPipeline, exempt_paths: tuple[str, ...] = ()) -> None:
+        self.app = app
+        self._startup_pipeline = startup_pipeline
+        self._exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._startup_pipeline.is_ready or scope["path"] in self._exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        response = JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=ErrorModel(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                error="StartupNotFinishedError",
+                detail="The application is starting, try again later.",
+            ).model_dump(),
+            headers={"Retry-After": "1"},
+        )
+        await response(scope, receive, send)
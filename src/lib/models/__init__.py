@@ -1,14 +1,29 @@
 from .base import PgBaseModel
 from .user import User
-from .article import Article, Comment, Tag, ArticlesToTags, ArticleLike, CommentLike
+from .article import (
+    Article,
+    ArticleCounter,
+    ArticleSummary,
+    Comment,
+    Tag,
+    ArticlesToTags,
+    ArticlesToImages,
+    ArticleLike,
+    CommentLike,
+)
+from .image import ImageObject
 
 __all__ = [
     "PgBaseModel",
     "User",
     "Article",
+    "ArticleCounter",
+    "ArticleSummary",
     "Comment",
     "Tag",
     "ArticlesToTags",
+    "ArticlesToImages",
     "ArticleLike",
     "CommentLike",
+    "ImageObject",
 ]
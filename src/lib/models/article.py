@@ -1,15 +1,18 @@
 import uuid
 
 from sqlalchemy import (
+    ARRAY,
     UUID,
     Boolean,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     PrimaryKeyConstraint,
     String,
     Text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.lib import enums, utils
@@ -25,6 +28,21 @@ class ArticlesToTags(PgBaseModel):
     __table_args__ = (PrimaryKeyConstraint("tag_id", "article_id", name="_tag_article_ids_key"),)
 
 
+class ArticlesToImages(PgBaseModel):
+    """Images referenced by the cover, preview or content of the article, by the content hash in their names.
+
+    The references are written on the article save, so the garbage collection of the images does not scan the articles.
+    """
+
+    __tablename__ = "articles_to_images"
+    article_id: Mapped[int] = mapped_column(ForeignKey("articles.id", ondelete="CASCADE"), nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    __table_args__ = (
+        PrimaryKeyConstraint("content_hash", "article_id", name="_image_article_ids_key"),
+        Index("ix_articles_to_images_article_id", "article_id"),
+    )
+
+
 class Article(PgBaseModel, PKMixin, ReprMixin):
     __tablename__ = "articles"
 
@@ -59,6 +77,50 @@ class Article(PgBaseModel, PKMixin, ReprMixin):
     Article(id: 2, title: "Привет мир", lang: ru, generic_id: 1)
     ```
     """
+    __table_args__ = (
+        # keyset pagination of article lists
+        Index("ix_articles_language_created_at_id", "language", "created_at", "id"),
+    )
+
+
+class ArticleSummary(PgBaseModel, ReprMixin):
+    """Denormalized read model of the article.
+
+    Keeps the values which otherwise have to be aggregated on every read (tags, language variants and likes),
+    so article lists and details are read as one row per article without `GROUP BY`.
+
+    The rows are maintained by `ArticleDBRepository` on every article/like write
+    and can be rebuilt from scratch with `ArticleDBRepository.rebuild_summaries`.
+    """
+
+    __tablename__ = "article_summaries"
+
+    article_id: Mapped[int] = mapped_column(ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    tags: Mapped[list[str]] = mapped_column(ARRAY(String(32)), nullable=False, default=list)
+    language_variants: Mapped[dict[str, str] | None] = mapped_column(JSONB, nullable=True)
+    """Map of language to slug of the articles with the same `generic_id`."""
+    likes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    """Increased on every refresh of the summary, every article write refreshes it, so it versions the article."""
+    updated_at: Mapped[int] = mapped_column(Integer, nullable=False, default=utils.get_current_timestamp)
+
+
+class ArticleCounter(PgBaseModel, ReprMixin):
+    """Amount of articles per language and draft state.
+
+    Maintained by `ArticleDBRepository` in the same transaction as article writes,
+    so paginated lists do not need to count the whole table on every request.
+    The drift (if any) is corrected by `ArticleDBRepository.reconcile_counters`.
+    """
+
+    __tablename__ = "article_counters"
+
+    language: Mapped[enums.LanguageType] = mapped_column(
+        Enum(enums.LanguageType, values_callable=lambda obj: [e.value for e in obj]), nullable=False
+    )
+    is_draft: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    __table_args__ = (PrimaryKeyConstraint("language", "is_draft", name="_language_is_draft_key"),)
 
 
 class Tag(PgBaseModel, PKMixin, ReprMixin):
@@ -73,11 +135,17 @@ class Comment(PgBaseModel, PKMixin, ReprMixin):
     article_id: Mapped[int] = mapped_column(Integer, ForeignKey("articles.id"), nullable=False)
     author_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    """Total amount of likes for this comment minus dislikes."""
+    likes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    """Total amount of likes for this comment minus dislikes, maintained by `ArticleDBRepository` on every like."""
     parent_comment_id: Mapped[int] = mapped_column(Integer, ForeignKey("comments.id"), nullable=True)
     created_at: Mapped[int] = mapped_column(Integer, nullable=False, default=utils.get_current_timestamp)
     updated_at: Mapped[int] = mapped_column(Integer, nullable=True, onupdate=utils.get_current_timestamp)
     is_deleted: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    __table_args__ = (
+        # keyset pagination of the root comments of an article and of the replies of a comment
+        Index("ix_comments_article_id_parent_comment_id_id", "article_id", "parent_comment_id", "id"),
+        Index("ix_comments_parent_comment_id_id", "parent_comment_id", "id"),
+    )
 
 
 class BaseLike(PgBaseModel, ReprMixin):
@@ -0,0 +1,28 @@
+from sqlalchemy import Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.lib import utils
+
+from .base import PgBaseModel
+from .mixins import ReprMixin
+
+
+class ImageObject(PgBaseModel, ReprMixin):
+    """Index of the uploaded images by the SHA-256 of their content, so a repeated upload reuses the object."""
+
+    __tablename__ = "image_objects"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    object_name: Mapped[str] = mapped_column(String(512), unique=True, nullable=False)
+    content_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[int] = mapped_column(Integer, nullable=False, default=utils.get_current_timestamp)
+    # the last upload of the content, the images are not collected for a while after it
+    used_at: Mapped[int] = mapped_column(Integer, nullable=False, default=utils.get_current_timestamp)
+    derivatives: Mapped[dict[str, str]] = mapped_column(JSONB, nullable=False, default=dict)
+    """Map of the srcset descriptors (e.g. `640w`, `thumbnail`) to the names of the stored resized copies."""
+    __table_args__ = (
+        # the garbage collection takes the images unused for the longest time first
+        Index("ix_image_objects_used_at", "used_at"),
+    )
@@ -1,68 +1,120 @@
+import base64
+import binascii
 import functools
-from typing import Any, Callable, Coroutine
+import json
+import math
+from typing import Any, Callable, Coroutine, Sequence
 
-from sqlalchemy import GenerativeSelect
+from sqlalchemy import GenerativeSelect, literal, select, tuple_
 from sqlalchemy.orm import InstrumentedAttribute
 
-from src.lib import enums, schemas
+from src.lib import enums, errors, schemas
+
+BACKWARD_OFFSET_TYPES = (enums.OffsetType.PREV, enums.OffsetType.LAST)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Create an opaque cursor token from the sort key values of the item."""
+    return base64.urlsafe_b64encode(json.dumps(list(values), separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, columns: Sequence[InstrumentedAttribute[Any]]) -> list[Any]:
+    """Read the sort key values from the cursor token and check them against the sort columns."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        raise errors.InvalidPaginationCursorError
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise errors.InvalidPaginationCursorError
+    for value, column in zip(values, columns):
+        if not isinstance(value, column.type.python_type):
+            raise errors.InvalidPaginationCursorError
+    return values
 
 
 def add_pagination_to_query(
-    query: GenerativeSelect, id_column: InstrumentedAttribute[int], body: schemas.PaginationBody
+    query: GenerativeSelect, sort_columns: Sequence[InstrumentedAttribute[Any]], body: schemas.PaginationBody
 ) -> Any:
-    statement: Any = query.limit(body.limit).order_by(id_column)
-    if body.offset_type == enums.OffsetType.FIRST:
-        return statement.order_by(id_column)
-    if body.offset_type == enums.OffsetType.PREV:
-        return statement.where(id_column < body.offset_id)
-    if body.offset_type == enums.OffsetType.NEXT:
-        return statement.where(id_column > body.offset_id)
-    if body.offset_type == enums.OffsetType.SPECIFIC:
-        return statement.slice((body.page - 1) * body.limit, body.page * body.limit)
-    if body.offset_type == enums.OffsetType.LAST:
-        return statement.where(id_column < body.offset_id)
-    # the code will never get to this point, it is necessary to suppress the mypy error
-    return query
+    """Apply keyset pagination to the query.
+
+    The page is selected by comparing the sort key (e.g. `(created_at, id)`) with the cursor,
+    so the latency does not depend on the depth of the page.
+    One extra row is fetched to let `paginated` know if there is one more page in the requested direction.
+    Backward pages (PREV, LAST) are selected in the reversed order, but returned in the ascending one.
+    """
+    is_backward = body.offset_type in BACKWARD_OFFSET_TYPES
+    statement: Any = query
+    if body.cursor is not None:
+        values = decode_cursor(body.cursor, columns=sort_columns)
+        sort_key = tuple_(*sort_columns)
+        cursor_key = tuple_(*(literal(value, column.type) for value, column in zip(values, sort_columns)))
+        statement = statement.where(sort_key < cursor_key if is_backward else sort_key > cursor_key)
+    if not is_backward:
+        return statement.order_by(*sort_columns).limit(body.limit + 1)
+
+    page = statement.order_by(*(column.desc() for column in sort_columns)).limit(body.limit + 1).subquery()
+    return select(page).order_by(*(page.c[column.key] for column in sort_columns))
 
 
 def create_pagination_url_params(
-    request_body: schemas.PaginationBody, items_first_id: int | None, items_last_id: int | None, total_pages: int
+    request_body: schemas.PaginationBody, first_cursor: str | None, last_cursor: str | None, has_more: bool
 ) -> schemas.PaginationResponseUrlParams:
-    prev_page_params = (
-        f"?limit={request_body.limit}&offset_id={items_first_id}"
-        f"&offset_type={enums.OffsetType.PREV.value}&page={request_body.page - 1}"
-    )
-    next_page_params = (
-        f"?limit={request_body.limit}&offset_id={items_last_id}"
-        f"&offset_type={enums.OffsetType.NEXT.value}&page={request_body.page + 1}"
-    )
+    if request_body.offset_type in BACKWARD_OFFSET_TYPES:
+        has_prev_page, has_next_page = has_more, request_body.offset_type != enums.OffsetType.LAST
+    else:
+        has_prev_page, has_next_page = request_body.offset_type != enums.OffsetType.FIRST, has_more
+
+    prev_page_params = f"?limit={request_body.limit}&offset_type={enums.OffsetType.PREV.value}&cursor={first_cursor}"
+    next_page_params = f"?limit={request_body.limit}&offset_type={enums.OffsetType.NEXT.value}&cursor={last_cursor}"
 
     return schemas.PaginationResponseUrlParams(
-        prev_page_url_params=prev_page_params if request_body.page > 1 else None,
-        next_page_url_params=next_page_params if request_body.page < total_pages else None,
+        prev_page_url_params=prev_page_params if has_prev_page and first_cursor else None,
+        next_page_url_params=next_page_params if has_next_page and last_cursor else None,
     )
 
 
 def paginated(
-    function: Callable[[Any], Coroutine[Any, Any, schemas.PaginationResponse[schemas.BaseModelWithId]]]
+    *keys: str,
 ) -> Callable[
-    [tuple[Any, ...], dict[str, Any]], Coroutine[Any, Any, schemas.PaginationResponse[schemas.BaseModelWithId]]
+    [Callable[[Any], Coroutine[Any, Any, schemas.PaginationResponse[schemas.BaseModelWithId]]]],
+    Callable[
+        [tuple[Any, ...], dict[str, Any]], Coroutine[Any, Any, schemas.PaginationResponse[schemas.BaseModelWithId]]
+    ],
 ]:
-    @functools.wraps(function)
-    async def wrapper(*args, **kwargs) -> schemas.PaginationResponse:
-        pagination_body = kwargs["pagination_body"]
-        result: schemas.PaginationResponse[Any] = await function(*args, **kwargs)
-
-        result.total_pages = int(result.total_items / pagination_body.limit)
-
-        pagination_url_params = create_pagination_url_params(
-            request_body=pagination_body,
-            items_first_id=result.items[0].id if len(result.items) > 0 else None,
-            items_last_id=result.items[-1].id if len(result.items) > 0 else None,
-            total_pages=result.total_pages,
-        )
-        result.prev_page_url_params = pagination_url_params.prev_page_url_params
-        result.next_page_url_params = pagination_url_params.next_page_url_params
-        return result
-
-    return wrapper
+    """Complete the response of the query paginated with `add_pagination_to_query`.
+
+    :param keys: names of the item fields the list is sorted by (the same as the query `sort_columns`)
+    """
+
+    def decorator(
+        function: Callable[[Any], Coroutine[Any, Any, schemas.PaginationResponse[schemas.BaseModelWithId]]]
+    ) -> Callable[
+        [tuple[Any, ...], dict[str, Any]], Coroutine[Any, Any, schemas.PaginationResponse[schemas.BaseModelWithId]]
+    ]:
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs) -> schemas.PaginationResponse:
+            pagination_body: schemas.PaginationBody = kwargs["pagination_body"]
+            result: schemas.PaginationResponse[Any] = await function(*args, **kwargs)
+
+            # drop the extra row, it is the farthest one in the direction of the request
+            has_more = len(result.items) > pagination_body.limit
+            if has_more and pagination_body.offset_type in BACKWARD_OFFSET_TYPES:
+                result.items = result.items[1:]
+            elif has_more:
+                result.items = result.items[: pagination_body.limit]
+
+            result.total_pages = math.ceil(result.total_items / pagination_body.limit)
+
+            pagination_url_params = create_pagination_url_params(
+                request_body=pagination_body,
+                first_cursor=encode_cursor([getattr(result.items[0], key) for key in keys]) if result.items else None,
+                last_cursor=encode_cursor([getattr(result.items[-1], key) for key in keys]) if result.items else None,
+                has_more=has_more,
+            )
+            result.prev_page_url_params = pagination_url_params.prev_page_url_params
+            result.next_page_url_params = pagination_url_params.next_page_url_params
+            return result
+
+        return wrapper
+
+    return decorator
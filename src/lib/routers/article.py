@@ -21,6 +21,11 @@ def _create_no_auth_router(domain: ArticleDomain) -> APIRouter:
     no_auth_router.get(
         path="/{item_id}/comments/", response_model=schemas.CommentsPaginated, status_code=status.HTTP_200_OK
     )(domain.controller.get_root_comments)
+    no_auth_router.get(
+        path="/{item_id}/comments/threads/",
+        response_model=schemas.CommentThreadsPaginated,
+        status_code=status.HTTP_200_OK,
+    )(domain.controller.get_comment_threads)
     no_auth_router.get(
         path="/{item_id}/comments/{comment_id}/answers/",
         response_model=schemas.CommentsPaginated,
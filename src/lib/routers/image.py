@@ -18,6 +18,9 @@ def create_image_router(
         dependencies=[Depends(get_access_provided(enums.IAMScope.ADMIN_POSTS, enums.IAMAccess.WRITE))],
     )
     router.get(path="/", status_code=status.HTTP_200_OK, response_description="Image file")(domain.controller.get_file)
+    router.post(path="/batch/", status_code=status.HTTP_200_OK, response_model=schemas.ImageBatchResponse)(
+        domain.controller.get_files
+    )
     router.post(path="/upload/", status_code=status.HTTP_201_CREATED, response_model=schemas.ImageResponse)(
         domain.controller.upload_file_endpoint
     )
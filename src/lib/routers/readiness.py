@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Response
+from starlette import status
+
+from src.core.startup import StartupPipeline
+from src.lib import schemas
+
+
+def create_readiness_router(*, startup_pipeline: StartupPipeline) -> APIRouter:
+    router: APIRouter = APIRouter(tags=["health"])
+
+    async def get_readiness(response: Response) -> schemas.StartupStatus:
+        """Report the startup phases, the status is 503 until they are finished."""
+        startup_status = startup_pipeline.get_status()
+        if not startup_status.ready:
+            response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return startup_status
+
+    router.get(
+        path="/ready/",
+        response_model=schemas.StartupStatus,
+        status_code=status.HTTP_200_OK,
+        responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": schemas.StartupStatus}},
+    )(get_readiness)
+    return router
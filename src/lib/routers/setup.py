@@ -1,12 +1,15 @@
 from fastapi import APIRouter, FastAPI
 
+from src.core.startup import StartupPipeline
 from src.injected import DomainHolder
+from src.lib.routers.readiness import create_readiness_router
 from src.lib.routers.v1 import create_v1_router
 
 
-def setup_routers(app: FastAPI, domain_holder: DomainHolder) -> None:
+def setup_routers(app: FastAPI, domain_holder: DomainHolder, startup_pipeline: StartupPipeline) -> None:
     main_router: APIRouter = create_v1_router(domain_holder=domain_holder)
     app.include_router(main_router)
+    app.include_router(create_readiness_router(startup_pipeline=startup_pipeline))
 
 
 __all__ = ["setup_routers"]
@@ -0,0 +1,29 @@
+from typing import Any, Callable, Coroutine
+
+from fastapi import APIRouter, Depends
+from starlette import status
+
+from src.domains import StatsDomain
+from src.lib import enums, schemas
+
+
+def create_stats_router(
+    *,
+    domain: StatsDomain,
+    get_access_provided: Callable[[enums.IAMScope, enums.IAMAccess], Callable[[int], Coroutine[Any, Any, bool]]],
+) -> APIRouter:
+    router: APIRouter = APIRouter(
+        prefix="/admin/stats",
+        tags=["stats", "admin"],
+        dependencies=[Depends(get_access_provided(enums.IAMScope.ADMIN_STATS, enums.IAMAccess.READ))],
+    )
+    router.get(path="/redis-pool/", response_model=schemas.RedisPoolMetrics, status_code=status.HTTP_200_OK)(
+        domain.controller.get_redis_pool_metrics
+    )
+    router.get(path="/db-pools/", response_model=list[schemas.DBPoolMetrics], status_code=status.HTTP_200_OK)(
+        domain.controller.get_db_pool_metrics
+    )
+    router.get(path="/s3/", response_model=schemas.S3Metrics, status_code=status.HTTP_200_OK)(
+        domain.controller.get_s3_metrics
+    )
+    return router
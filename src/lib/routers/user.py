@@ -49,6 +49,9 @@ def _create_admin_read_router(
     admin_read_router.get(path="/groups/", response_model=schemas.UserGroupsResponse, status_code=status.HTTP_200_OK)(
         domain.controller.get_groups
     )
+    admin_read_router.get(
+        path="/permission-cache/", response_model=schemas.PermissionCacheMetrics, status_code=status.HTTP_200_OK
+    )(domain.controller.get_permission_cache_metrics)
     admin_read_router.get(
         path="/{item_id}/groups/", response_model=schemas.UserGroupsResponse, status_code=status.HTTP_200_OK
     )(domain.controller.get_user_groups)
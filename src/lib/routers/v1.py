@@ -4,6 +4,7 @@ from src.injected import DomainHolder
 from src.lib.routers.article import create_article_router
 from src.lib.routers.image import create_image_router
 from src.lib.routers.oauth import create_oauth_router
+from src.lib.routers.stats import create_stats_router
 from src.lib.routers.user import create_user_router
 
 
@@ -25,8 +26,13 @@ def create_v1_router(*, domain_holder: DomainHolder) -> APIRouter:
         domain=domain_holder.image,
         get_access_provided=domain_holder.oauth.controller.get_access_provided,
     )
+    stats_router: APIRouter = create_stats_router(
+        domain=domain_holder.stats,
+        get_access_provided=domain_holder.oauth.controller.get_access_provided,
+    )
     api_router.include_router(router=oauth_router)
     api_router.include_router(router=user_router)
     api_router.include_router(router=article_router)
     api_router.include_router(router=image_router)
+    api_router.include_router(router=stats_router)
     return api_router
@@ -1,5 +1,5 @@
 from .base import BaseModelWithCount, BaseModelWithId, BaseModelORM
-from .image import ImageResponse
+from .image import ImageResponse, ImageBatchRequest, ImageBatchResponse, ImageObject
 from .s3 import S3Bucket
 from .jwt import (
     TokenPayload,
@@ -31,18 +31,26 @@ from .article import (
     ArticlesEditorPaginated,
     ArticlesWithCount,
     ArticlesEditorWithCount,
+    ArticleVersion,
+    ArticleVersionsWithCount,
     ArticleCreate,
     ArticleUpdate,
     ArticleCreateResponse,
+    ArticlePreviewSource,
     InnerArticleCreate,
     Comment,
     CommentCreate,
     CommentUpdate,
     CommentsPaginated,
     CommentsWithCount,
+    CommentThread,
+    CommentThreadsPaginated,
+    CommentThreadsWithCount,
 )
 from .logger import ExceptionJsonLog, RequestJsonLog, ResponseJsonLog
-from .iam import IAMGroupToUserAssign
+from .iam import IAMGroupToUserAssign, PermissionCacheMetrics
+from .stats import DBPoolMetrics, RedisPoolMetrics, S3Metrics
+from .startup import StartupPhaseStatus, StartupStatus
 
 
 __all__ = [
@@ -56,17 +64,32 @@ __all__ = [
     "InnerArticleCreate",
     "InnerUserCreate",
     "IAMGroupToUserAssign",
+    "PermissionCacheMetrics",
+    "RedisPoolMetrics",
+    "DBPoolMetrics",
+    "S3Metrics",
+    "StartupPhaseStatus",
+    "StartupStatus",
     "ImageResponse",
+    "ImageBatchRequest",
+    "ImageBatchResponse",
+    "ImageObject",
     "ArticleCreate",
     "ArticleCreateResponse",
+    "ArticlePreviewSource",
     "ArticleUpdate",
     "ArticlesResponse",
     "ArticlesEditorResponse",
     "ArticlesWithCount",
     "ArticlesEditorWithCount",
+    "ArticleVersion",
+    "ArticleVersionsWithCount",
     "UsersWithCount",
     "CommentsWithCount",
     "CommentsPaginated",
+    "CommentThread",
+    "CommentThreadsWithCount",
+    "CommentThreadsPaginated",
     "UsersPaginated",
     "UserCredentials",
     "PaginationResponse",
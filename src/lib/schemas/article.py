@@ -44,6 +44,12 @@ class InnerArticleCreate(ArticleCreate):
     generic_id: uuid.UUID = Field(default_factory=uuid.uuid4)
 
 
+class ArticlePreviewSource(BaseModelORM):
+    title: str
+    label: str
+    cover_image: str
+
+
 class ArticleCreateResponse(ArticleBase, BaseModelORM):
     author_id: int
     language: enums.LanguageType
@@ -80,13 +86,19 @@ class ArticleEditor(ArticleShortEditor, Article):
 class Comment(BaseModelWithId):
     author_username: str | None = None
     author_full_name: str | None = None
+    parent_comment_id: int | None = None
     is_deleted: bool = False
     likes: int = 0
+    replies_count: int = Field(default=0, description="Amount of the direct replies")
     content: str
     created_at: int
     updated_at: int | None = None
 
 
+class CommentThread(Comment):
+    replies: list["CommentThread"] = Field(default_factory=list)
+
+
 class CommentCreate(BaseModel):
     parent_comment_id: int | None = Field(default=None, gt=0)
     content: str
@@ -104,6 +116,14 @@ class CommentsPaginated(PaginationResponse[Comment]):
     items: list[Comment]
 
 
+class CommentThreadsWithCount(BaseModelWithCount[CommentThread]):
+    items: list[CommentThread]
+
+
+class CommentThreadsPaginated(PaginationResponse[CommentThread]):
+    items: list[CommentThread]
+
+
 class ArticlesResponse(BaseModel):
     items: list[ArticleShort]
 
@@ -120,6 +140,21 @@ class ArticlesPaginated(ArticlesResponse, PaginationResponse[Article]):
     pass
 
 
+class ArticleVersion(BaseModelWithId):
+    created_at: int
+    updated_at: int | None = None
+    version: int | None = None
+    summary_updated_at: int | None = None
+
+    @property
+    def last_modified(self) -> int:
+        return max(self.created_at, self.updated_at or 0, self.summary_updated_at or 0)
+
+
+class ArticleVersionsWithCount(BaseModelWithCount[ArticleVersion]):
+    items: list[ArticleVersion]
+
+
 class ArticlesEditorWithCount(ArticlesEditorResponse, BaseModelWithCount[ArticleShortEditor]):
     pass
 
@@ -5,3 +5,11 @@ from src.lib.enums import IAMUserGroup
 
 class IAMGroupToUserAssign(BaseModel):
     user_group: IAMUserGroup
+
+
+class PermissionCacheMetrics(BaseModel):
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+    ttl: float
@@ -1,6 +1,31 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from .base import BaseModelORM
 
 
 class ImageResponse(BaseModel):
     tag: str
     url: str
+    derivatives: dict[str, str] = Field(
+        default={},
+        description="URLs of the resized copies by the srcset descriptors (e.g. `640w`) and of the `thumbnail`, "
+        "they are returned once they are created, shortly after the upload",
+    )
+
+
+class ImageObject(BaseModelORM):
+    content_hash: str
+    object_name: str
+    content_type: str
+    size: int
+    created_at: int | None = None
+    used_at: int | None = None
+    derivatives: dict[str, str] = {}
+
+
+class ImageBatchRequest(BaseModel):
+    tags: list[str] = Field(min_length=1, max_length=100)
+
+
+class ImageBatchResponse(BaseModel):
+    images: list[ImageResponse]
@@ -11,6 +11,7 @@ class RequestJsonLog(BaseModel):
     request_query_params: dict[str, Any]
     request_referer: str | None = None
     request_body: str
+    request_body_size: int = 0
     remote_ip: str
     remote_port: int
 
@@ -20,6 +21,7 @@ class ResponseJsonLog(BaseModel):
     request_id: str
     response_status_code: int
     response_body: str
+    response_body_size: int = 0
     response_duration: int
 
 
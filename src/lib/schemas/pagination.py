@@ -11,24 +11,17 @@ from .base import BaseModelItemType
 
 class PaginationBody(BaseModel):
     limit: int = Field(Query())
-    page: int = Field(Query())
     offset_type: enums.OffsetType = Field(Query())
-    offset_id: int | None = Field(Query(default=None))
-
-    @field_validator("offset_id")
-    def check_offset_id_nullable_violation(cls, offset_id: int | None, info: FieldValidationInfo) -> int | None:
-        if offset_id is None and info.data.get("offset_type") not in [
-            enums.OffsetType.FIRST,
-            enums.OffsetType.SPECIFIC,
-        ]:
-            raise errors.OffsetIdNullableViolationError
-        return offset_id
-
-    @field_validator("offset_type")
-    def check_offset_type_violation(cls, offset_type: enums.OffsetType, info: FieldValidationInfo) -> enums.OffsetType:
-        if offset_type == enums.OffsetType.FIRST and info.data.get("page") != 1:
+    cursor: str | None = Field(Query(default=None, description="Opaque cursor from the previous page url params"))
+
+    @field_validator("cursor")
+    def check_cursor_violation(cls, cursor: str | None, info: FieldValidationInfo) -> str | None:
+        offset_type = info.data.get("offset_type")
+        if cursor is None and offset_type in [enums.OffsetType.NEXT, enums.OffsetType.PREV]:
+            raise errors.PaginationCursorNullableViolationError
+        if cursor is not None and offset_type in [enums.OffsetType.FIRST, enums.OffsetType.LAST]:
             raise errors.OffsetTypeViolationError
-        return offset_type
+        return cursor
 
 
 class PaginationResponseUrlParams(BaseModel):
@@ -1,3 +1,5 @@
+from urllib.parse import quote
+
 from pydantic import BaseModel
 
 
@@ -6,7 +8,14 @@ class S3Bucket(BaseModel):
     endpoint: str
     replace_domain: str | None = None
 
-    def make_presigned_url(self, instance_url: str) -> str | None:
-        if instance_url is not None and self.replace_domain is not None:
-            return instance_url.replace(f"{self.endpoint}/{self.name}", self.replace_domain)
-        return None
+    def make_presigned_url(self, instance_url: str) -> str:
+        """Serve the URL from `replace_domain` if it is set, both the path and virtual-hosted styles are replaced."""
+        if self.replace_domain is None:
+            return instance_url
+        return instance_url.replace(f"{self.name}.{self.endpoint}", self.replace_domain).replace(
+            f"{self.endpoint}/{self.name}", self.replace_domain
+        )
+
+    def make_object_url(self, object_name: str) -> str:
+        """Unsigned URL of a public object."""
+        return self.make_presigned_url(instance_url=f"https://{self.name}.{self.endpoint}/{quote(object_name)}")
@@ -0,0 +1,19 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+StartupPhaseState = Literal["pending", "running", "done", "skipped", "failed"]
+
+
+class StartupPhaseStatus(BaseModel):
+    name: str
+    state: StartupPhaseState = "pending"
+    seconds: float | None = None
+
+
+class StartupStatus(BaseModel):
+    ready: bool
+    # whether this worker has run the phases first, None until the lock is taken
+    is_leader: bool | None
+    seconds: float | None
+    phases: list[StartupPhaseStatus]
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+
+
+class RedisPoolMetrics(BaseModel):
+    max_connections: int
+    connections: int
+    in_use_connections: int
+    checkouts: int
+    created_connections: int
+
+
+class DBPoolMetrics(BaseModel):
+    name: str
+    size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class S3Metrics(BaseModel):
+    max_workers: int
+    uploads: int
+    failed_uploads: int
+    uploaded_bytes: int
+    upload_seconds_total: float
+    upload_bytes_per_second: float
@@ -1,4 +1,5 @@
+from .iam import IAMPermissionMatrix
 from .oauth import OAuth2AccessToken, OAuth2RefreshToken
 
 
-__all__ = ["OAuth2RefreshToken", "OAuth2AccessToken"]
+__all__ = ["IAMPermissionMatrix", "OAuth2RefreshToken", "OAuth2AccessToken"]
@@ -0,0 +1,38 @@
+import csv
+from typing import Iterable, Self
+
+
+class IAMPermissionMatrix:
+    """Permissions of the IAM user groups compiled from the graph data into bitsets.
+
+    Every `(scope, access)` pair gets its own bit and every group gets the mask of the pairs it is allowed,
+    so a permission check is a bit test per group of the user.
+    """
+
+    def __init__(self) -> None:
+        self._bits: dict[tuple[str, str], int] = {}
+        self._masks: dict[str, int] = {}
+
+    @classmethod
+    def from_graph_data(cls, *, graph_data_path: str, graph_name: str) -> Self:
+        matrix = cls()
+        matrix.load(graph_data_path=graph_data_path, graph_name=graph_name)
+        return matrix
+
+    def load(self, *, graph_data_path: str, graph_name: str) -> None:
+        """Compile the `ALLOWS` relationships (`src` group, `dest` scope, `access`) of the graph."""
+        with open(f"{graph_data_path}/{graph_name}/relationships/ALLOWS.csv", "rt") as f:
+            self.compile((row["src"].strip(), row["dest"].strip(), row["access"].strip()) for row in csv.DictReader(f))
+
+    def compile(self, allows: Iterable[tuple[str, str, str]]) -> None:  # noqa: A003
+        bits: dict[tuple[str, str], int] = {}
+        masks: dict[str, int] = {}
+        for group, scope, access in allows:
+            bit = bits.setdefault((scope, access), 1 << len(bits))
+            masks[group] = masks.get(group, 0) | bit
+        # swapped at once, so the checks running meanwhile see either the old or the new permissions
+        self._bits, self._masks = bits, masks
+
+    def is_granted(self, groups: Iterable[str], scope: str, access: str) -> bool:
+        bit = self._bits.get((scope, access), 0)
+        return bit != 0 and any(self._masks.get(group, 0) & bit for group in groups)
@@ -1,4 +1,18 @@
 from .time import get_current_datetime, get_current_timestamp
 from .i18n import get_accept_language_best_match
+from .http_cache import make_etag, format_http_date, is_not_modified
+from .images import DERIVATIVES_FOLDER, IMAGE_HEADER_SIZE, get_derivative_names, get_image_hashes, sniff_image_type
 
-__all__ = ["get_current_datetime", "get_current_timestamp", "get_accept_language_best_match"]
+__all__ = [
+    "get_current_datetime",
+    "get_current_timestamp",
+    "get_accept_language_best_match",
+    "make_etag",
+    "format_http_date",
+    "is_not_modified",
+    "IMAGE_HEADER_SIZE",
+    "sniff_image_type",
+    "DERIVATIVES_FOLDER",
+    "get_derivative_names",
+    "get_image_hashes",
+]
@@ -0,0 +1,32 @@
+import email.utils
+import hashlib
+from typing import Any, Mapping
+
+
+def make_etag(*parts: Any) -> str:
+    """Create a strong `ETag` of the values the response is built from."""
+    return f'"{hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()}"'
+
+
+def format_http_date(timestamp: int) -> str:
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str | None, last_modified: int | None) -> bool:
+    """Check the conditional request headers, `If-None-Match` takes precedence over `If-Modified-Since`."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        return if_none_match.strip() == "*" or etag in (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        )
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified <= since.timestamp()
@@ -0,0 +1,40 @@
+import re
+
+# leading bytes of the supported image formats, WebP is a RIFF container with the format at the offset 8
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", 0, "image/png"),
+    (b"\xff\xd8\xff", 0, "image/jpeg"),
+    (b"WEBP", 8, "image/webp"),
+)
+IMAGE_HEADER_SIZE = 12
+
+
+def sniff_image_type(header: bytes) -> str | None:
+    """Get the MIME type of the image by its first `IMAGE_HEADER_SIZE` bytes, `None` if it is not supported."""
+    for signature, offset, mime_type in _IMAGE_SIGNATURES:
+        if header[offset : offset + len(signature)] == signature and (offset == 0 or header.startswith(b"RIFF")):
+            return mime_type
+    return None
+
+
+DERIVATIVES_FOLDER = "derivatives"
+# the uploaded images are named by the SHA-256 of their content, the derivatives by the name of the original
+_CONTENT_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def get_derivative_names(
+    object_name: str, *, widths: list[int], image_format: str, thumbnail_size: int
+) -> dict[str, str]:
+    """Get the object names of the derivatives of the image by their srcset descriptors (e.g. `640w`).
+
+    The names are derived from the name of the original, so they are known without looking them up.
+    """
+    names = {f"{width}w": f"{DERIVATIVES_FOLDER}/{object_name}/{width}w.{image_format}" for width in widths}
+    if thumbnail_size > 0:
+        names["thumbnail"] = f"{DERIVATIVES_FOLDER}/{object_name}/thumbnail.{image_format}"
+    return names
+
+
+def get_image_hashes(*texts: str | None) -> set[str]:
+    """Get the content hashes of the uploaded images referenced in the texts, e.g. by the URLs in an article."""
+    return {match for text in texts if text for match in _CONTENT_HASH_PATTERN.findall(text)}
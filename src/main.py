@@ -1,10 +1,9 @@
-import asyncio
 import logging
 
 from fastapi import FastAPI
 
 from src.app import create_app
-from src.core import config, persistence
+from src.core import config
 from src.injected import AppEnvironment
 from src.lib import errors
 from src.lib import logger as logger_pkg
@@ -23,34 +22,24 @@ def api() -> FastAPI:
         sentry.init_sentry_sdk(dsn=settings.sentry.dsn, traces_sample_rate=settings.sentry.traces_sample_rate)
     logger.debug(f"Config: {settings.model_dump()}")
 
-    logger.debug("Running migrations...")
-    asyncio.create_task(
-        persistence.run_pg_migrations(
-            db_url=settings.db.pg_connection_url,
-            migrations_path=settings.db.migrations_path,
-        )
-    )
-    asyncio.create_task(
-        persistence.sync_redis_graph(
-            connection_url=settings.redis.connection_url,
-            graph_data_path=settings.redis.graph_data_path,
-        )
-    )
-    logger.debug("Migrations ran successfully!")
-
     # Create app
     app: FastAPI = create_app(is_production=settings.environment.is_production)
 
     # Create Environment
     app_environment: AppEnvironment = AppEnvironment.create(settings=settings)
+    app.add_event_handler("startup", app_environment.startup)
+    app.add_event_handler("shutdown", app_environment.shutdown)
 
     # Setup routers
-    routers.setup_routers(app=app, domain_holder=app_environment.domain_holder)
+    routers.setup_routers(
+        app=app, domain_holder=app_environment.domain_holder, startup_pipeline=app_environment.startup_pipeline
+    )
 
     # Setup middlewares
     middlewares.setup_middlewares(
         app=app,
         settings=settings,
+        startup_pipeline=app_environment.startup_pipeline,
     )
 
     # Setup providers
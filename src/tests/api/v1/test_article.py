@@ -1,10 +1,11 @@
+from src.lib.providers.dummies import get_domain_holder
 from src.tests.conftest import clean_results
 
 
 class TestGetArticles:
     @staticmethod
     def test_valid_params(client, curr_timestamp):
-        response = client.get("/v1/articles/?limit=1&page=1&offset_type=first")
+        response = client.get("/v1/articles/?limit=1&offset_type=first")
         assert response.json()["items"][0]["slug"].startswith("test-article")
         assert len(response.json()["items"][0]["language_variants"]) == 1
         expected = {
@@ -46,13 +47,6 @@ class TestGetArticles:
                     "input": None,
                     "url": "https://errors.pydantic.dev/2.4/v/missing",
                 },
-                {
-                    "type": "missing",
-                    "loc": ["query", "page"],
-                    "msg": "Field required",
-                    "input": None,
-                    "url": "https://errors.pydantic.dev/2.4/v/missing",
-                },
                 {
                     "type": "missing",
                     "loc": ["query", "offset_type"],
@@ -66,7 +60,7 @@ class TestGetArticles:
 
     @staticmethod
     def test_valid_params_non_default_lang(client):
-        response = client.get("/v1/articles/?limit=1&page=1&offset_type=first", headers={"Accept-Language": "ru"})
+        response = client.get("/v1/articles/?limit=1&offset_type=first", headers={"Accept-Language": "ru"})
         assert response.json()["items"][0]["slug"].startswith("test-statia")
         assert len(response.json()["items"][0]["language_variants"]) == 1
         expected = {
@@ -123,11 +117,29 @@ class TestGetArticles:
         assert result == expected
         assert response.status_code == 200
 
+    @staticmethod
+    def test_list_not_cached_if_item_invalidated_during_build(client, monkeypatch):
+        domain = client.app.dependency_overrides[get_domain_holder]().article
+        db_repo = domain.controller._db_repo
+        get_all = db_repo.get_all
+
+        async def get_all_and_like(**kwargs):
+            result = await get_all(**kwargs)
+            # e.g. a like of a listed article committed while the list is built
+            await domain.response_cache.invalidate(f"article:{result.items[0].slug}")
+            return result
+
+        monkeypatch.setattr(db_repo, "get_all", get_all_and_like)
+        for _ in range(2):
+            response = client.get("/v1/articles/?limit=13&offset_type=first")
+            assert response.status_code == 200
+            assert response.headers["X-Cache"] == "MISS"
+
 
 class TestGetArticlesAdmin:
     @staticmethod
     def test_valid_params(client, curr_timestamp, admin_auth_headers):
-        response = client.get("/v1/admin/articles/?limit=1&page=1&offset_type=first", headers=admin_auth_headers)
+        response = client.get("/v1/admin/articles/?limit=1&offset_type=first", headers=admin_auth_headers)
         expected = {
             "items": [
                 {
@@ -165,13 +177,6 @@ class TestGetArticlesAdmin:
                     "input": None,
                     "url": "https://errors.pydantic.dev/2.4/v/missing",
                 },
-                {
-                    "type": "missing",
-                    "loc": ["query", "page"],
-                    "msg": "Field required",
-                    "input": None,
-                    "url": "https://errors.pydantic.dev/2.4/v/missing",
-                },
                 {
                     "type": "missing",
                     "loc": ["query", "offset_type"],
@@ -309,7 +314,7 @@ class TestCreateArticle:
 class TestArticleRetrieve:
     @staticmethod
     def test_valid_slug(client, curr_timestamp):
-        response = client.get("/v1/articles/?limit=1&page=1&offset_type=first")
+        response = client.get("/v1/articles/?limit=1&offset_type=first")
         response = client.get(
             f"/v1/articles/{response.json()['items'][0]['language_variants']['ru']}/", headers={"Accept-Language": "ru"}
         )
@@ -345,7 +350,7 @@ class TestArticleRetrieve:
 
     @staticmethod
     def test_draft_article_with_no_access(client, admin_auth_headers):
-        response = client.get("/v1/admin/articles/?limit=2&page=1&offset_type=first", headers=admin_auth_headers)
+        response = client.get("/v1/admin/articles/?limit=2&offset_type=first", headers=admin_auth_headers)
         response = client.get(f"/v1/articles/{response.json()['items'][1]['slug']}/")
         assert response.json() == {
             "ok": False,
@@ -355,11 +360,59 @@ class TestArticleRetrieve:
         }
         assert response.status_code == 404
 
+    @staticmethod
+    def test_cached_response_invalidated_by_like(client, user_auth_headers):
+        slug = client.get("/v1/articles/?limit=1&offset_type=first").json()["items"][0]["slug"]
+        likes = client.get(f"/v1/articles/{slug}/").json()["likes"]
+        response = client.get(f"/v1/articles/{slug}/")
+        assert response.headers["X-Cache"] == "HIT"
+        assert response.json()["likes"] == likes
+
+        client.post(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        response = client.get(f"/v1/articles/{slug}/")
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.json()["likes"] == likes + 1
+        client.delete(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+
+    @staticmethod
+    def test_conditional_request(client, user_auth_headers):
+        slug = client.get("/v1/articles/?limit=1&offset_type=first").json()["items"][0]["slug"]
+        etag = client.get(f"/v1/articles/{slug}/").headers["ETag"]
+        response = client.get(f"/v1/articles/{slug}/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+        client.post(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        response = client.get(f"/v1/articles/{slug}/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        client.delete(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+
+    @staticmethod
+    def test_conditional_request_buffered_likes(client, user_auth_headers, monkeypatch):
+        like_buffer = client.app.dependency_overrides[get_domain_holder]().article.like_buffer
+        slug = client.get("/v1/articles/?limit=1&offset_type=first").json()["items"][0]["slug"]
+        client.delete(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        response = client.get(f"/v1/articles/{slug}/")
+        etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+        list_etag = client.get("/v1/articles/?limit=1&offset_type=first").headers["ETag"]
+
+        monkeypatch.setattr(like_buffer, "is_enabled", True)
+        client.post(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        response = client.get(f"/v1/articles/{slug}/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        response = client.get(f"/v1/articles/{slug}/", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 200
+        response = client.get("/v1/articles/?limit=1&offset_type=first", headers={"If-None-Match": list_etag})
+        assert response.status_code == 200
+        client.delete(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+
 
 class TestArticleUpdate:
     @staticmethod
     def test_valid_params(client, admin_auth_headers):
-        response = client.get("/v1/articles/?limit=1&page=1&offset_type=first")
+        response = client.get("/v1/articles/?limit=1&offset_type=first")
         article_data = {
             "title": "Test Article2",
             "subtitle": "Test Subtitle2",
@@ -384,7 +437,7 @@ class TestArticleUpdate:
 
     @staticmethod
     def test_missing_params(client, admin_auth_headers):
-        response = client.get("/v1/articles/?limit=1&page=1&offset_type=first")
+        response = client.get("/v1/articles/?limit=1&offset_type=first")
         article_data = {}
         response = client.patch(
             f"/v1/admin/articles/{response.json()['items'][0]['slug']}/", json=article_data, headers=admin_auth_headers
@@ -414,7 +467,7 @@ class TestArticleUpdate:
 
     @staticmethod
     def test_not_admin(client, user_auth_headers):
-        response = client.get("/v1/articles/?limit=1&page=1&offset_type=first")
+        response = client.get("/v1/articles/?limit=1&offset_type=first")
         article_data = {
             "title": "Test Article2",
             "subtitle": "Test Subtitle2",
@@ -434,7 +487,7 @@ class TestArticleUpdate:
 class TestArticleDelete:
     @staticmethod
     def test_not_admin(client, user_auth_headers):
-        response = client.get("/v1/articles/?limit=1&page=1&offset_type=first")
+        response = client.get("/v1/articles/?limit=1&offset_type=first")
         response = client.delete(
             f"/v1/admin/articles/{response.json()['items'][0]['slug']}/", headers=user_auth_headers
         )
@@ -450,7 +503,7 @@ class TestArticleDelete:
 class TestArticleLike:
     @staticmethod
     def get_article_slug(client) -> str:
-        return client.get("/v1/articles/?limit=1&page=1&offset_type=first").json()["items"][0]["slug"]
+        return client.get("/v1/articles/?limit=1&offset_type=first").json()["items"][0]["slug"]
 
     def test_valid_params(self, client, user_auth_headers):
         response = client.post(f"/v1/articles/{self.get_article_slug(client)}/like/", headers=user_auth_headers)
@@ -478,6 +531,33 @@ class TestArticleLike:
         }
         assert response.status_code == 401
 
+    def test_likes_counter(self, client, user_auth_headers):
+        slug = self.get_article_slug(client)
+        client.delete(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        likes = client.get(f"/v1/articles/{slug}/").json()["likes"]
+
+        client.post(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        client.post(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        assert client.get(f"/v1/articles/{slug}/").json()["likes"] == likes + 1
+        client.post(f"/v1/articles/{slug}/like/?is_positive=false", headers=user_auth_headers)
+        assert client.get(f"/v1/articles/{slug}/").json()["likes"] == likes - 1
+        client.delete(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        assert client.get(f"/v1/articles/{slug}/").json()["likes"] == likes
+
+    def test_buffered_likes(self, client, user_auth_headers, monkeypatch):
+        like_buffer = client.app.dependency_overrides[get_domain_holder]().article.like_buffer
+        slug = self.get_article_slug(client)
+        client.delete(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        likes = client.get(f"/v1/articles/{slug}/").json()["likes"]
+
+        monkeypatch.setattr(like_buffer, "is_enabled", True)
+        response = client.post(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        assert response.status_code == 201
+        client.post(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        assert client.get(f"/v1/articles/{slug}/").json()["likes"] == likes + 1
+        client.delete(f"/v1/articles/{slug}/like/", headers=user_auth_headers)
+        assert client.get(f"/v1/articles/{slug}/").json()["likes"] == likes
+
     def test_delete_valid_params(self, client, user_auth_headers):
         response = client.delete(f"/v1/articles/{self.get_article_slug(client)}/like/", headers=user_auth_headers)
         assert response.status_code == 204
@@ -525,6 +605,63 @@ class TestArticleCommentAnswersList:
         pass
 
 
+class TestArticleCommentThreads:
+    @staticmethod
+    def test_valid_params(client, user_auth_headers):
+        def create_comment(parent_comment_id=None) -> int:
+            response = client.post(
+                "/v1/articles/1/comments/",
+                json={"content": "Test comment", "parent_comment_id": parent_comment_id},
+                headers=user_auth_headers,
+            )
+            return response.json()["id"]
+
+        root_id = create_comment()
+        reply_id = create_comment(parent_comment_id=root_id)
+        create_comment(parent_comment_id=reply_id)
+        create_comment(parent_comment_id=root_id)
+
+        response = client.get("/v1/articles/1/comments/threads/?limit=100&offset_type=first&replies_limit=2")
+        assert response.status_code == 200
+        thread = next(item for item in response.json()["items"] if item["id"] == root_id)
+        assert thread["replies_count"] == 2
+        assert thread["author_username"] == "testuser"
+        # the first two replies of the thread in the order of creation
+        assert [reply["id"] for reply in thread["replies"]] == [reply_id]
+        assert thread["replies"][0]["replies_count"] == 1
+        assert len(thread["replies"][0]["replies"]) == 1
+
+        response = client.get("/v1/articles/1/comments/?limit=100&offset_type=first")
+        assert all(item["parent_comment_id"] is None for item in response.json()["items"])
+        response = client.get(f"/v1/articles/1/comments/{root_id}/answers/?limit=100&offset_type=first")
+        assert response.json()["total_items"] == 2
+
+    @staticmethod
+    def test_replies_limit(client, user_auth_headers):
+        parent_comment_id = None
+        ids = []
+        for _ in range(4):
+            response = client.post(
+                "/v1/articles/1/comments/",
+                json={"content": "Test comment", "parent_comment_id": parent_comment_id},
+                headers=user_auth_headers,
+            )
+            parent_comment_id = response.json()["id"]
+            ids.append(parent_comment_id)
+
+        # the new root is the last one, the backward page has the extra root before it
+        response = client.get("/v1/articles/1/comments/threads/?limit=1&offset_type=last&replies_limit=2")
+        assert response.status_code == 200
+        [thread] = response.json()["items"]
+        assert thread["id"] == ids[0]
+        assert [reply["id"] for reply in thread["replies"]] == [ids[1]]
+        assert [reply["id"] for reply in thread["replies"][0]["replies"]] == [ids[2]]
+        assert thread["replies"][0]["replies"][0]["replies"] == []
+
+        response = client.get("/v1/articles/1/comments/threads/?limit=1&offset_type=last&replies_limit=0")
+        assert response.json()["items"][0]["replies"] == []
+
+
 class TestArticleCommentCreate:
     @staticmethod
     def test_valid_params():
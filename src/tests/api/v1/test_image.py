@@ -0,0 +1,259 @@
+import datetime
+import io
+import uuid
+
+import botocore.auth
+import pytest
+from PIL import Image
+
+from src.core.persistence import (
+    S3UrlSigner,
+    create_new_pg_session_maker,
+    create_s3_client,
+)
+from src.domains.image.controller import ImageController
+from src.domains.image.derivatives import create_derivatives
+from src.domains.image.repository import ImageDBRepository
+from src.lib import schemas, utils
+from src.lib.providers.dummies import get_domain_holder
+
+
+class TestUploadImage:
+    @staticmethod
+    def test_not_image_content(client, admin_auth_headers):
+        response = client.post(
+            "/v1/admin/images/upload/",
+            headers=admin_auth_headers,
+            data={"folder": "tests"},
+            files={"file": ("image.png", b"<svg xmlns='http://www.w3.org/2000/svg'/>", "image/png")},
+        )
+        assert response.json() == {
+            "detail": "Image type is not supported (supported: png, jpg/jpeg, webp)",
+            "error": "NotSupportedImageMimeTypeError",
+            "ok": False,
+            "status_code": 400,
+        }
+        assert response.status_code == 400
+
+    @staticmethod
+    def test_incorrect_access_level(client, user_auth_headers):
+        response = client.post(
+            "/v1/admin/images/upload/",
+            headers=user_auth_headers,
+            data={"folder": "tests"},
+            files={"file": ("image.png", b"\x89PNG\r\n\x1a\n", "image/png")},
+        )
+        assert response.status_code == 422
+
+
+class TestDuplicateUpload:
+    content = b"\x89PNG\r\n\x1a\n" + uuid.uuid4().bytes
+
+    @pytest.fixture
+    def s3_repo(self, client, monkeypatch):
+        s3_repo = client.app.dependency_overrides[get_domain_holder]().image.controller._s3_repo
+        s3_repo.uploaded, s3_repo.deleted = [], []
+
+        async def upload_stream(chunks, bucket, object_name, content_type):
+            s3_repo.uploaded.append(object_name)
+            return True
+
+        async def delete_objects(bucket, object_names):
+            s3_repo.deleted.extend(object_names)
+            return set()
+
+        monkeypatch.setattr(s3_repo, "upload_stream", upload_stream)
+        monkeypatch.setattr(s3_repo, "delete_objects", delete_objects)
+        return s3_repo
+
+    def upload(self, client, headers, folder):
+        return client.post(
+            "/v1/admin/images/upload/",
+            headers=headers,
+            data={"folder": folder},
+            files={"file": ("image.png", self.content, "image/png")},
+        )
+
+    def test_repeated_upload(self, client, admin_auth_headers, s3_repo):
+        tag = self.upload(client, admin_auth_headers, folder="tests").json()["tag"]
+        response = self.upload(client, admin_auth_headers, folder="tests/other")
+        assert response.status_code == 201
+        assert response.json()["tag"] == tag
+        assert s3_repo.uploaded == [tag]
+        assert s3_repo.deleted == []
+
+    def test_concurrent_upload(self, client, admin_auth_headers, s3_repo, monkeypatch):
+        tag = self.upload(client, admin_auth_headers, folder="tests").json()["tag"]
+
+        async def use(*, session, content_hash):
+            # the image is indexed by the concurrent upload after it is looked up
+            return None
+
+        monkeypatch.setattr(client.app.dependency_overrides[get_domain_holder]().image.controller._db_repo, "use", use)
+        response = self.upload(client, admin_auth_headers, folder="tests/concurrent")
+        assert response.json()["tag"] == tag
+        assert s3_repo.deleted == [f"tests/concurrent/{tag.split('/')[-1]}"]
+
+
+class TestCollectGarbage:
+    class S3Repo:
+        def __init__(self):
+            self.deleted = []
+
+        async def delete_objects(self, bucket, object_names):
+            self.deleted.extend(object_names)
+            return set()
+
+    async def test_collect_garbage(self, settings):
+        db_repo = ImageDBRepository(session_manager=create_new_pg_session_maker(db_url=settings.db.pg_connection_url))
+        s3_repo = self.S3Repo()
+        controller = ImageController(s3_repo=s3_repo, db_repo=db_repo)
+        now = utils.get_current_timestamp()
+        unused, recent = (
+            schemas.ImageObject(
+                content_hash=uuid.uuid4().hex * 2,
+                object_name=f"tests/gc/{uuid.uuid4().hex}.png",
+                content_type="image/png",
+                size=1,
+                used_at=used_at,
+                derivatives={"50w": "derivatives/unused/320w.webp"},
+            )
+            for used_at in (now - 3600, now)
+        )
+        async with db_repo.get_session() as session, session.begin():
+            for image in (unused, recent):
+                await db_repo.create(session=session, item=image)
+
+        assert unused.object_name in await controller.collect_garbage(settings=settings, grace_period=60, dry_run=True)
+        assert s3_repo.deleted == []
+
+        collected = await controller.collect_garbage(settings=settings, grace_period=60)
+        assert unused.object_name in collected
+        assert recent.object_name not in collected
+        assert {unused.object_name, "derivatives/unused/320w.webp"} <= set(s3_repo.deleted)
+        assert recent.object_name not in s3_repo.deleted
+        async with db_repo.get_session() as session:
+            stored = await db_repo.get_derivatives(
+                session=session, object_names=[unused.object_name, recent.object_name]
+            )
+        assert list(stored) == [recent.object_name]
+
+    async def test_referenced_image_not_collected(self, client, admin_auth_headers, settings):
+        db_repo = ImageDBRepository(session_manager=create_new_pg_session_maker(db_url=settings.db.pg_connection_url))
+        controller = ImageController(s3_repo=self.S3Repo(), db_repo=db_repo)
+        image = schemas.ImageObject(
+            content_hash=uuid.uuid4().hex * 2,
+            object_name=f"tests/gc/{uuid.uuid4().hex}.png",
+            content_type="image/png",
+            size=1,
+            used_at=utils.get_current_timestamp() - 3600,
+        )
+        async with db_repo.get_session() as session, session.begin():
+            image = await db_repo.create(session=session, item=image)
+        response = client.post(
+            "/v1/admin/articles/",
+            json={
+                "title": "Test Article",
+                "subtitle": "Test Subtitle",
+                "cover_image": "test.jpg",
+                "tags": ["tag1"],
+                "author_id": 1,
+                "content": f"![image](https://bucket.s3.example.com/{image.object_name})",
+                "language": "en",
+                "label": "News",
+            },
+            headers=admin_auth_headers,
+        )
+        slug = response.json()["slug"]
+        assert image.object_name not in await controller.collect_garbage(
+            settings=settings, grace_period=60, dry_run=True
+        )
+
+        client.delete(f"/v1/admin/articles/{slug}/", headers=admin_auth_headers)
+        assert image.object_name in await controller.collect_garbage(settings=settings, grace_period=60, dry_run=True)
+
+
+class TestGetImages:
+    @staticmethod
+    def test_valid_response(client, admin_auth_headers):
+        response = client.post(
+            "/v1/admin/images/batch/",
+            headers=admin_auth_headers,
+            json={"tags": ["tests/a.png", "tests/b.png", "tests/a.png"]},
+        )
+        assert response.status_code == 200
+        assert [image["tag"] for image in response.json()["images"]] == ["tests/a.png", "tests/b.png"]
+        assert all("X-Amz-Signature=" in image["url"] for image in response.json()["images"])
+
+    @staticmethod
+    def test_cached_url(client, admin_auth_headers):
+        first = client.get("/v1/admin/images/", headers=admin_auth_headers, params={"tag": "tests/a.png"})
+        second = client.get("/v1/admin/images/", headers=admin_auth_headers, params={"tag": "tests/a.png"})
+        assert first.status_code == second.status_code == 200
+        assert first.json()["url"] == second.json()["url"]
+
+    @staticmethod
+    def test_empty_tags(client, admin_auth_headers):
+        response = client.post("/v1/admin/images/batch/", headers=admin_auth_headers, json={"tags": []})
+        assert response.status_code == 422
+
+    @staticmethod
+    def test_derivatives_not_stored(client, admin_auth_headers):
+        # the derivatives are returned once the task has stored them
+        response = client.get("/v1/admin/images/", headers=admin_auth_headers, params={"tag": "tests/a.png"})
+        assert response.status_code == 200
+        assert response.json()["derivatives"] == {}
+
+
+class TestCreateDerivatives:
+    @staticmethod
+    def create_image(width: int, height: int) -> bytes:
+        output = io.BytesIO()
+        Image.new("RGB", (width, height), "red").save(output, format="PNG")
+        return output.getvalue()
+
+    def test_widths(self):
+        derivatives = create_derivatives(
+            self.create_image(800, 400), widths=[1280, 320, 640], image_format="webp", quality=80, thumbnail_size=64
+        )
+        assert {descriptor: srcset for descriptor, (srcset, _) in derivatives.items()} == {
+            "320w": "320w",
+            "640w": "640w",
+            "1280w": "800w",
+            "thumbnail": "thumbnail",
+        }
+        with Image.open(io.BytesIO(derivatives["640w"][1])) as image:
+            assert image.format == "WEBP"
+            assert image.size == (640, 320)
+
+    def test_small_image(self):
+        derivatives = create_derivatives(
+            self.create_image(50, 50), widths=[320, 640, 1280], image_format="webp", quality=80, thumbnail_size=0
+        )
+        assert list(derivatives) == ["320w"]
+        assert derivatives["320w"][0] == "50w"
+
+
+class TestS3UrlSigner:
+    now = datetime.datetime(2024, 2, 29, 23, 59, 30, tzinfo=datetime.timezone.utc)
+    options = {"region": "ru-central1", "endpoint": "storage.test", "access_key": "test", "secret_key": "test"}
+
+    @pytest.mark.parametrize(
+        "key", ["tests/a.png", "tests/a b+c=d&e;(1).png", "tests/ä/~tilde!*'.webp", "tests//a/", "tests/%41.png"]
+    )
+    def test_matches_boto(self, monkeypatch, key):
+        now = self.now.replace(tzinfo=None)
+
+        class FrozenDatetime(datetime.datetime):
+            @classmethod
+            def utcnow(cls):
+                return now
+
+        # the older botocore reads the time by `datetime.datetime.utcnow`, the newer one by `get_current_datetime`
+        monkeypatch.setattr(botocore.auth.datetime, "datetime", FrozenDatetime)
+        monkeypatch.setattr(botocore.auth, "get_current_datetime", lambda: now, raising=False)
+        expected = create_s3_client(**self.options).generate_presigned_url(
+            "get_object", Params={"Bucket": "bucket", "Key": key}, ExpiresIn=3600
+        )
+        url = S3UrlSigner(**self.options).presign_get(bucket="bucket", key=key, expiration=3600, now=self.now)
+        assert url == expected
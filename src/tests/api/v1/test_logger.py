@@ -0,0 +1,32 @@
+import io
+import logging
+import queue
+
+from src.lib.logger.handlers import BatchingQueueListener, StructuredQueueHandler
+
+
+class TestBatchingQueueListener:
+    @staticmethod
+    def test_stop_writes_queued_records():
+        stream = io.StringIO()
+        records_queue: queue.SimpleQueue[logging.LogRecord | None] = queue.SimpleQueue()
+        listener = BatchingQueueListener(records_queue, logging.StreamHandler(stream), batch_size=2)
+        logger = logging.getLogger("tests.batching")
+        logger.propagate = False
+        logger.addHandler(StructuredQueueHandler(records_queue))
+        try:
+            for index in range(5):
+                logger.warning("record %s", index)
+            listener.start()
+            listener.stop()
+        finally:
+            logger.handlers.clear()
+
+        assert stream.getvalue().splitlines() == [f"record {index}" for index in range(5)]
+        # the records put after the stop are kept for the next start
+        logger.addHandler(StructuredQueueHandler(records_queue))
+        logger.warning("record 5")
+        logger.handlers.clear()
+        listener.start()
+        listener.stop()
+        assert stream.getvalue().splitlines()[-1] == "record 5"
@@ -1,5 +1,9 @@
+import logging
+
 from fastapi.testclient import TestClient
 
+from src.lib.middlewares.logger import LoggingMiddleware
+
 
 def test_rotate_token_success(client: TestClient):
     payload = {"username": "testuser", "password": "testpassword"}
@@ -64,3 +68,29 @@ def test_refresh_token_using_access(client: TestClient, user_tokens):
     response = client.post("/v1/oauth/refresh-token/", headers=headers)
     assert response.status_code == 401
     assert response.json()["detail"] == "Refresh token is not provided or not valid"
+
+
+async def test_token_body_not_logged(caplog):
+    body = b'{"access_token": "secret-access-token", "refresh_token": "secret-refresh-token"}'
+
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+
+    async def receive():
+        return {"type": "http.request", "body": b"username=testuser&password=testpassword"}
+
+    async def send(message):
+        pass
+
+    middleware = LoggingMiddleware(app, sample_rate=1.0, body_excluded_paths=("/v1/oauth",))
+    scope = {"type": "http", "method": "POST", "path": "/v1/oauth/rotate-token/", "query_string": b"", "headers": []}
+    with caplog.at_level(logging.DEBUG, logger="src.lib.middlewares.logger"):
+        await middleware(scope, receive, send)
+
+    assert [record.msg["response_body_size"] for record in caplog.records if "response_body" in record.msg] == [
+        len(body)
+    ]
+    assert "secret" not in caplog.text
+    assert "testpassword" not in caplog.text
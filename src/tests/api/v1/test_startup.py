@@ -0,0 +1,48 @@
+from src.core.startup import StartupPhase, StartupPipeline
+
+
+class TestReadiness:
+    @staticmethod
+    def test_not_ready(client):
+        # the test client does not run the startup events
+        response = client.get("/ready/")
+        assert response.status_code == 503
+        assert response.json() == {
+            "ready": False,
+            "is_leader": None,
+            "seconds": None,
+            "phases": [
+                {"name": "lock", "state": "pending", "seconds": None},
+                {"name": "migrations", "state": "pending", "seconds": None},
+                {"name": "graph_sync", "state": "pending", "seconds": None},
+            ],
+        }
+
+
+class TestStartupPipeline:
+    @staticmethod
+    async def test_failed_phase(settings, redis_conn_pool):
+        runs, failures = [], []
+
+        async def fail() -> None:
+            runs.append(True)
+            raise RuntimeError("Phase failed")
+
+        startup_pipeline = StartupPipeline(
+            db_url=settings.db.pg_connection_url,
+            redis_connection_pool=redis_conn_pool,
+            phases=[StartupPhase(name="broken", run=fail)],
+            # another key than the one of the application, so the test does not wait for it
+            lock_key=settings.startup.lock_key + 1,
+            max_attempts=2,
+            retry_delay=0,
+            on_failure=lambda: failures.append(True),
+        )
+        startup_pipeline.start()
+        await startup_pipeline._task
+
+        assert len(runs) == 2
+        assert failures == [True]
+        status = startup_pipeline.get_status()
+        assert status.ready is False
+        assert [(phase.name, phase.state) for phase in status.phases] == [("lock", "done"), ("broken", "failed")]
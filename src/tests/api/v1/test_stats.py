@@ -0,0 +1,51 @@
+class TestRedisPoolMetrics:
+    @staticmethod
+    def test_valid_response(client, admin_auth_headers):
+        response = client.get("/v1/admin/stats/redis-pool/", headers=admin_auth_headers)
+        assert response.status_code == 200
+        assert response.json()["checkouts"] >= response.json()["created_connections"] > 0
+        assert set(response.json()) == {
+            "max_connections",
+            "connections",
+            "in_use_connections",
+            "checkouts",
+            "created_connections",
+        }
+
+    @staticmethod
+    def test_incorrect_access_level(client, user_auth_headers):
+        response = client.get("/v1/admin/stats/redis-pool/", headers=user_auth_headers)
+        assert response.json() == {
+            "detail": "User not found or have no required rights to access the endpoint.",
+            "error": "AccessTokenProvideUserWithNoAccessRightsError",
+            "ok": False,
+            "status_code": 422,
+        }
+        assert response.status_code == 422
+
+
+class TestDBPoolMetrics:
+    @staticmethod
+    def test_valid_response(client, admin_auth_headers):
+        response = client.get("/v1/admin/stats/db-pools/", headers=admin_auth_headers)
+        assert response.status_code == 200
+        # the test database sessions are not pooled
+        assert response.json() == []
+
+    @staticmethod
+    def test_incorrect_access_level(client, user_auth_headers):
+        response = client.get("/v1/admin/stats/db-pools/", headers=user_auth_headers)
+        assert response.status_code == 422
+
+
+class TestS3Metrics:
+    @staticmethod
+    def test_valid_response(client, admin_auth_headers):
+        response = client.get("/v1/admin/stats/s3/", headers=admin_auth_headers)
+        assert response.status_code == 200
+        assert response.json()["failed_uploads"] <= response.json()["uploads"]
+
+    @staticmethod
+    def test_incorrect_access_level(client, user_auth_headers):
+        response = client.get("/v1/admin/stats/s3/", headers=user_auth_headers)
+        assert response.status_code == 422
@@ -1,10 +1,10 @@
 class TestGetUsers:
     @staticmethod
     def test_valid_params(client, admin_auth_headers):
-        response = client.get("/v1/admin/users/?limit=1&page=1&offset_type=first", headers=admin_auth_headers)
+        response = client.get("/v1/admin/users/?limit=1&offset_type=first", headers=admin_auth_headers)
         assert response.json() == {
             "prev_page_url_params": None,
-            "next_page_url_params": "?limit=1&offset_id=1&offset_type=next&page=2",
+            "next_page_url_params": "?limit=1&offset_type=next&cursor=WzFd",
             "total_items": 2,
             "total_pages": 2,
             "items": [
@@ -13,6 +13,36 @@ class TestGetUsers:
         }
         assert response.status_code == 200
 
+    @staticmethod
+    def test_next_and_prev_pages(client, admin_auth_headers):
+        response = client.get("/v1/admin/users/?limit=1&offset_type=first", headers=admin_auth_headers)
+        response = client.get(f"/v1/admin/users/{response.json()['next_page_url_params']}", headers=admin_auth_headers)
+        assert [item["id"] for item in response.json()["items"]] == [2]
+        assert response.json()["next_page_url_params"] is None
+        response = client.get(f"/v1/admin/users/{response.json()['prev_page_url_params']}", headers=admin_auth_headers)
+        assert [item["id"] for item in response.json()["items"]] == [1]
+        assert response.json()["prev_page_url_params"] is None
+        assert response.status_code == 200
+
+    @staticmethod
+    def test_last_page(client, admin_auth_headers):
+        response = client.get("/v1/admin/users/?limit=1&offset_type=last", headers=admin_auth_headers)
+        assert [item["id"] for item in response.json()["items"]] == [2]
+        assert response.json()["prev_page_url_params"] == "?limit=1&offset_type=prev&cursor=WzJd"
+        assert response.json()["next_page_url_params"] is None
+        assert response.status_code == 200
+
+    @staticmethod
+    def test_invalid_cursor(client, admin_auth_headers):
+        response = client.get("/v1/admin/users/?limit=1&offset_type=next&cursor=invalid", headers=admin_auth_headers)
+        assert response.json() == {
+            "ok": False,
+            "status_code": 400,
+            "error": "InvalidPaginationCursorError",
+            "detail": "Cursor is malformed or does not belong to this list",
+        }
+        assert response.status_code == 400
+
     @staticmethod
     def test_missing_args(client, admin_auth_headers):
         response = client.get("/v1/admin/users/?kwargs=value2", headers=admin_auth_headers)
@@ -25,13 +55,6 @@ class TestGetUsers:
                     "input": None,
                     "url": "https://errors.pydantic.dev/2.4/v/missing",
                 },
-                {
-                    "type": "missing",
-                    "loc": ["query", "page"],
-                    "msg": "Field required",
-                    "input": None,
-                    "url": "https://errors.pydantic.dev/2.4/v/missing",
-                },
                 {
                     "type": "missing",
                     "loc": ["query", "offset_type"],
@@ -45,7 +68,7 @@ class TestGetUsers:
 
     @staticmethod
     def test_incorrect_access_level(client, user_auth_headers):
-        response = client.get("/v1/admin/users/?limit=1&page=1&offset_type=first", headers=user_auth_headers)
+        response = client.get("/v1/admin/users/?limit=1&offset_type=first", headers=user_auth_headers)
         assert response.json() == {
             "detail": "User not found or have no required rights to access the endpoint.",
             "error": "AccessTokenProvideUserWithNoAccessRightsError",
@@ -299,3 +322,24 @@ class TestGetUserGroups:
             "status_code": 422,
         }
         assert response.status_code == 422
+
+
+class TestPermissionCache:
+    @staticmethod
+    def test_group_change_invalidates_cache(client, testuser, admin_auth_headers, user_auth_headers):
+        assert client.get("/v1/admin/users/groups/", headers=user_auth_headers).status_code == 422
+
+        group_data = {"user_group": "superadmin"}
+        client.patch(f"/v1/admin/users/{testuser.id}/add-group/", json=group_data, headers=admin_auth_headers)
+        assert client.get("/v1/admin/users/groups/", headers=user_auth_headers).status_code == 200
+
+        client.patch(f"/v1/admin/users/{testuser.id}/remove-group/", json=group_data, headers=admin_auth_headers)
+        assert client.get("/v1/admin/users/groups/", headers=user_auth_headers).status_code == 422
+
+    @staticmethod
+    def test_metrics(client, admin_auth_headers):
+        client.get("/v1/admin/users/groups/", headers=admin_auth_headers)
+        response = client.get("/v1/admin/users/permission-cache/", headers=admin_auth_headers)
+        assert response.status_code == 200
+        assert response.json()["hits"] > 0
+        assert set(response.json()) == {"hits", "misses", "size", "max_size", "ttl"}
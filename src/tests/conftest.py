@@ -83,7 +83,9 @@ def wrong_sub_auth_headers(user_tokens) -> dict:
 def client(settings) -> TestClient:
     app: FastAPI = create_app(is_production=settings.environment.is_production)
     app_environment = AppEnvironment.mock(settings=settings)
-    routers.setup_routers(app=app, domain_holder=app_environment.domain_holder)
+    routers.setup_routers(
+        app=app, domain_holder=app_environment.domain_holder, startup_pipeline=app_environment.startup_pipeline
+    )
     middlewares.setup_middlewares(
         app=app,
         settings=settings,
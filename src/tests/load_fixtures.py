@@ -1,7 +1,7 @@
 import asyncio
 
 from src.core.config import TestSettings, create_test_settings
-from src.core.persistence import db, redis
+from src.core.persistence import db
 from src.injected import AppEnvironment
 from src.tests.fixtures.load_articles import load_articles
 from src.tests.fixtures.load_users import load_users
@@ -12,6 +12,8 @@ async def load_fixtures(settings: TestSettings) -> None:
 
     await load_users(domain_holder)
     await load_articles(domain_holder, settings=settings)
+    # the responses cached before the database was reloaded are stale
+    await domain_holder.article.response_cache.invalidate("articles")
 
 
 if __name__ == "__main__":
@@ -21,7 +23,7 @@ if __name__ == "__main__":
         db.run_pg_migrations(db_url=settings.db.pg_connection_url, migrations_path=settings.db.migrations_path)
     )
     loop.run_until_complete(
-        redis.sync_redis_graph(
+        AppEnvironment.mock(settings=settings).sync_redis_graph(
             connection_url=settings.redis.connection_url,
             graph_data_path=settings.redis.graph_data_path,
         )